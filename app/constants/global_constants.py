@@ -15,10 +15,22 @@ MAX_LOGIN_ATTEMPTS = int(os.getenv("MAX_LOGIN_ATTEMPTS", 5))
 LOGIN_ATTEMPT_WINDOW_SECONDS = int(os.getenv("LOGIN_ATTEMPT_WINDOW_SECONDS", 900))
 STATUS_PAGE_TOKEN = os.getenv("STATUS_PAGE_TOKEN")
 
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 64))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", 10))
+TYPING_MIN_INTERVAL_SECONDS = float(os.getenv("TYPING_MIN_INTERVAL_SECONDS", 3))
+TYPING_IDLE_SECONDS = float(os.getenv("TYPING_IDLE_SECONDS", 5))
+
 APPLICATION_KEY_ID = os.environ.get("APPLICATION_KEY_ID")
 APPLICATION_KEY = os.environ.get("APPLICATION_KEY")
 BUCKET_NAME = os.environ.get("BUCKET_NAME")
 B2_ENDPOINT = os.environ.get("B2_ENDPOINT")
+# External clients are built lazily; a failed init is retried after this long
+CLIENT_INIT_RETRY_SECONDS = int(os.getenv("CLIENT_INIT_RETRY_SECONDS", 5))
+CLIENT_WARM_UP_TIMEOUT_SECONDS = int(os.getenv("CLIENT_WARM_UP_TIMEOUT_SECONDS", 10))
+# Legacy B2 download authorizations are issued per media/<user_id>/ prefix
+# for this long and reused until too close to expiry for the URL asked for.
+B2_AUTHORIZATION_TTL_SECONDS = int(os.getenv("B2_AUTHORIZATION_TTL_SECONDS", 6 * 3600))
+B2_AUTHORIZATION_CACHE_SIZE = int(os.getenv("B2_AUTHORIZATION_CACHE_SIZE", 1024))
 
 IMAGEKIT_PUBLIC_KEY = os.environ.get("IMAGEKIT_PUBLIC_KEY")
 IMAGEKIT_PRIVATE_KEY = os.environ.get("IMAGEKIT_PRIVATE_KEY")
@@ -28,9 +40,103 @@ SEAWEEDFS_S3_ENDPOINT = os.environ.get("SEAWEEDFS_S3_ENDPOINT", "http://seaweedf
 SEAWEEDFS_ACCESS_KEY = os.environ.get("SEAWEEDFS_ACCESS_KEY")
 SEAWEEDFS_SECRET_KEY = os.environ.get("SEAWEEDFS_SECRET_KEY")
 SEAWEEDFS_BUCKET = os.environ.get("SEAWEEDFS_BUCKET", "linkup-media")
+# The S3 endpoint as clients reach it, for presigned direct uploads
+SEAWEEDFS_PUBLIC_S3_ENDPOINT = os.environ.get("SEAWEEDFS_PUBLIC_S3_ENDPOINT") or SEAWEEDFS_S3_ENDPOINT
+
+# Where uploads are written from the app: "s3" (SeaweedFS, async), or
+# "memory" / "local" (files under STORAGE_LOCAL_ROOT) for tests and dev.
+# The S3 backend keeps a pool of keep-alive connections and switches to
+# parallel multipart uploads above the threshold.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", "storage")
+STORAGE_MAX_CONNECTIONS = int(os.getenv("STORAGE_MAX_CONNECTIONS", 64))
+STORAGE_KEEPALIVE_CONNECTIONS = int(os.getenv("STORAGE_KEEPALIVE_CONNECTIONS", 32))
+STORAGE_KEEPALIVE_SECONDS = float(os.getenv("STORAGE_KEEPALIVE_SECONDS", 30))
+STORAGE_TIMEOUT_SECONDS = float(os.getenv("STORAGE_TIMEOUT_SECONDS", 30))
+STORAGE_MULTIPART_THRESHOLD_BYTES = int(os.getenv("STORAGE_MULTIPART_THRESHOLD_BYTES", 16 * 1024 * 1024))
+STORAGE_MULTIPART_PART_BYTES = int(os.getenv("STORAGE_MULTIPART_PART_BYTES", 8 * 1024 * 1024))
+STORAGE_MULTIPART_CONCURRENCY = int(os.getenv("STORAGE_MULTIPART_CONCURRENCY", 4))
 
 IMGPROXY_PUBLIC_URL = os.environ.get("IMGPROXY_PUBLIC_URL")
 IMGPROXY_KEY = os.environ.get("IMGPROXY_KEY")
 IMGPROXY_SALT = os.environ.get("IMGPROXY_SALT")
 
+# Image work (decode/resize/encode/blurhash/face detection) runs in a
+# dedicated process pool: workers, extra jobs allowed to wait before uploads
+# are shed with 503, per-job timeout, and jobs per worker before recycling.
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", os.cpu_count() or 2))
+IMAGE_QUEUE_SIZE = int(os.getenv("IMAGE_QUEUE_SIZE", 2 * (os.cpu_count() or 2)))
+IMAGE_JOB_TIMEOUT_SECONDS = int(os.getenv("IMAGE_JOB_TIMEOUT_SECONDS", 30))
+IMAGE_WORKER_MAX_TASKS = int(os.getenv("IMAGE_WORKER_MAX_TASKS", 200))
+
+# Multipart uploads: largest accepted file, and the slack allowed on top of
+# it for boundaries and the other form fields before the request body is cut
+# off mid-stream with 413.
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 5 * 1024 * 1024))
+UPLOAD_FORM_OVERHEAD_BYTES = int(os.getenv("UPLOAD_FORM_OVERHEAD_BYTES", 64 * 1024))
+
+# Most pixels an uploaded image may have. Checked from the header before
+# decoding: a few MB of PNG can otherwise expand to GBs of pixels.
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 50_000_000))
+
+# Blurhash placeholders: components as XxY, the side of the thumbnail
+# they're computed from (more pixels don't change a 4x3 hash), and how long
+# a blurhash stays cached in Redis under its uploader and content hash.
+BLURHASH_X_COMPONENTS, BLURHASH_Y_COMPONENTS = (int(n) for n in os.getenv("BLURHASH_COMPONENTS", "4x3").split("x"))
+BLURHASH_SOURCE_SIDE = int(os.getenv("BLURHASH_SOURCE_SIDE", 32))
+BLURHASH_CACHE_TTL_SECONDS = int(os.getenv("BLURHASH_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+
+# Voice notes (media_type=voice on /upload/media) are transcoded by ffmpeg
+# to mono Ogg Opus at this sample rate and bitrate. Longer notes are
+# refused; the waveform sent back for drawing has this many bars.
+VOICE_MAX_SECONDS = int(os.getenv("VOICE_MAX_SECONDS", 300))
+VOICE_SAMPLE_RATE = int(os.getenv("VOICE_SAMPLE_RATE", 16000))
+VOICE_OPUS_BITRATE = os.getenv("VOICE_OPUS_BITRATE", "24k")
+VOICE_WAVEFORM_BARS = int(os.getenv("VOICE_WAVEFORM_BARS", 64))
+
+# WebP renditions generated at upload time next to each image, as
+# name:longest side in px. Reads pick the smallest one that covers the
+# size being displayed.
+IMAGE_RENDITIONS = {
+    name: int(side)
+    for name, side in (item.split(":") for item in os.getenv("IMAGE_RENDITIONS", "thumb:160,card:640,full:1280").split(","))
+}
+
+# Deferred uploads (deferred=true on /upload/media and /upload/media-user):
+# job workers per process, jobs allowed in flight before new ones get 503,
+# and how long a job may sit claimed before another process takes it over.
+MEDIA_JOB_WORKERS = int(os.getenv("MEDIA_JOB_WORKERS", 4))
+MEDIA_JOB_QUEUE_SIZE = int(os.getenv("MEDIA_JOB_QUEUE_SIZE", 200))
+MEDIA_JOB_STALE_SECONDS = int(os.getenv("MEDIA_JOB_STALE_SECONDS", 300))
+# A job that hits a busy/timed-out image pool (503) is retried after
+# MEDIA_JOB_RETRY_SECONDS, doubling each time, up to this many attempts.
+MEDIA_JOB_MAX_ATTEMPTS = int(os.getenv("MEDIA_JOB_MAX_ATTEMPTS", 5))
+MEDIA_JOB_RETRY_SECONDS = float(os.getenv("MEDIA_JOB_RETRY_SECONDS", 5))
+
+# How long a presigned direct-upload URL (POST /upload/presign) stays valid
+PRESIGNED_UPLOAD_EXPIRY_SECONDS = int(os.getenv("PRESIGNED_UPLOAD_EXPIRY_SECONDS", 600))
+
+# Face detection for profile pictures: backend name (see
+# face_detection_utilities) and the longest side it runs at.
+FACE_DETECTOR_BACKEND = os.getenv("FACE_DETECTOR_BACKEND", "haar")
+FACE_DETECTION_MAX_SIDE = int(os.getenv("FACE_DETECTION_MAX_SIDE", 640))
+
+# /upload/media-user-pfp-from-url fetches: timeouts, byte cap, redirect
+# limit. Private/loopback targets are refused unless explicitly allowed.
+REMOTE_FETCH_CONNECT_TIMEOUT_SECONDS = float(os.getenv("REMOTE_FETCH_CONNECT_TIMEOUT_SECONDS", 5))
+REMOTE_FETCH_READ_TIMEOUT_SECONDS = float(os.getenv("REMOTE_FETCH_READ_TIMEOUT_SECONDS", 10))
+REMOTE_FETCH_TOTAL_TIMEOUT_SECONDS = float(os.getenv("REMOTE_FETCH_TOTAL_TIMEOUT_SECONDS", 20))
+REMOTE_FETCH_MAX_BYTES = int(os.getenv("REMOTE_FETCH_MAX_BYTES", 10 * 1024 * 1024))
+REMOTE_FETCH_MAX_REDIRECTS = int(os.getenv("REMOTE_FETCH_MAX_REDIRECTS", 3))
+REMOTE_FETCH_ALLOW_PRIVATE_HOSTS = os.getenv("REMOTE_FETCH_ALLOW_PRIVATE_HOSTS", "false").lower() == "true"
+
+# GET /chats/sync keeps each client's per-chat sync state in Redis under
+# the cursor it hands out, for this long after the sync that issued it.
+SYNC_CURSOR_TTL_SECONDS = int(os.getenv("SYNC_CURSOR_TTL_SECONDS", 7 * 24 * 3600))
+
+# Signed URL expiries are rounded up to these buckets so repeat renders
+# produce identical (cacheable) URLs; signatures are memoized per bucket.
+SIGNED_URL_BUCKET_SECONDS = int(os.getenv("SIGNED_URL_BUCKET_SECONDS", 600))
+SIGNED_URL_CACHE_SIZE = int(os.getenv("SIGNED_URL_CACHE_SIZE", 4096))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
\ No newline at end of file
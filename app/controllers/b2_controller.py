@@ -1,7 +1,12 @@
 from app.constants.global_constants import APPLICATION_KEY, APPLICATION_KEY_ID, BUCKET_NAME
+from app.controllers.client_controller import LazyClient
 from b2sdk.v2 import InMemoryAccountInfo, B2Api
 
-info = InMemoryAccountInfo()
-b2_api = B2Api(info)
-b2_api.authorize_account("production", APPLICATION_KEY_ID, APPLICATION_KEY)
-bucket = b2_api.get_bucket_by_name(BUCKET_NAME)
\ No newline at end of file
+
+def _create_bucket():
+    info = InMemoryAccountInfo()
+    b2_api = B2Api(info)
+    b2_api.authorize_account("production", APPLICATION_KEY_ID, APPLICATION_KEY)
+    return b2_api.get_bucket_by_name(BUCKET_NAME)
+
+bucket = LazyClient("b2", _create_bucket)
\ No newline at end of file
@@ -2,11 +2,16 @@ import os
 import brevo_python
 from dotenv import load_dotenv
 
+from app.controllers.client_controller import LazyClient
+
 load_dotenv() 
 
 BREVO_API_KEY = os.getenv("BREVO_API_KEY")
 FROM_EMAIL = os.getenv("FROM_EMAIL", "LinkUp OTP")
 
-configuration = brevo_python.Configuration()
-configuration.api_key['api-key'] = BREVO_API_KEY
-client = brevo_python.TransactionalEmailsApi(brevo_python.ApiClient(configuration))
\ No newline at end of file
+def _create_client():
+    configuration = brevo_python.Configuration()
+    configuration.api_key['api-key'] = BREVO_API_KEY
+    return brevo_python.TransactionalEmailsApi(brevo_python.ApiClient(configuration))
+
+client = LazyClient("brevo", _create_client)
\ No newline at end of file
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable
+
+from app.constants.global_constants import CLIENT_INIT_RETRY_SECONDS, CLIENT_WARM_UP_TIMEOUT_SECONDS
+from app.controllers.logger_controller import logger_controller
+
+
+class LazyClient:
+    """
+    Builds an external client (B2, ImageKit, Brevo, S3, Postgres pool) on
+    first use instead of at import, so importing the app never touches the
+    network. Attribute access is proxied to the real client, so existing
+    `bucket.get_download_url(...)`-style call sites keep working unchanged.
+
+    Construction is single-flight; a failed attempt is remembered and
+    re-raised for `retry_after` seconds instead of hammering a dead service
+    on every request.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], retry_after: float = CLIENT_INIT_RETRY_SECONDS):
+        # Set via __dict__ so they never collide with proxied attributes
+        self.__dict__.update(
+            _name=name,
+            _factory=factory,
+            _retry_after=retry_after,
+            _client=None,
+            _error=None,
+            _failed_at=None,
+            _init_seconds=None,
+            _lock=threading.Lock(),
+        )
+        _registry.append(self)
+
+    # Method names are deliberately unlike anything on the wrapped clients
+    # (a b2 Bucket has .name, for one), since those are proxied.
+
+    def get_client(self) -> Any:
+        if self._client is not None:
+            return self._client
+
+        with self._lock:
+            if self._client is not None:
+                return self._client
+            if self._error is not None and time.monotonic() - self._failed_at < self._retry_after:
+                raise self._error
+
+            started = time.monotonic()
+            try:
+                client = self._factory()
+            except Exception as e:
+                self.__dict__.update(_error=e, _failed_at=time.monotonic())
+                logger_controller.warning(f"Failed to initialize {self._name} client: {e!r}")
+                raise
+
+            self.__dict__.update(_client=client, _error=None, _failed_at=None, _init_seconds=time.monotonic() - started)
+            return client
+
+    async def get_client_async(self) -> Any:
+        if self._client is not None:
+            return self._client
+        return await asyncio.to_thread(self.get_client)
+
+    def client_health(self) -> dict:
+        if self._client is not None:
+            state = "ready"
+        elif self._error is not None:
+            state = "error"
+        else:
+            state = "uninitialized"
+        return {
+            "status": state,
+            "error": repr(self._error) if self._error is not None else None,
+            "init_seconds": round(self._init_seconds, 3) if self._init_seconds is not None else None,
+        }
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr.startswith("__"):
+            # copy/pickle/introspection probes shouldn't trigger a connect
+            raise AttributeError(attr)
+        return getattr(self.get_client(), attr)
+
+
+_registry: list[LazyClient] = []
+
+
+async def warm_up_clients(timeout: float = CLIENT_WARM_UP_TIMEOUT_SECONDS) -> dict:
+    """
+    Initializes every registered client in parallel (used from lifespan).
+    Failures are logged and left for the next use to retry - an offline
+    boot still comes up, just with those clients reported unhealthy.
+    """
+    async def _warm(client: LazyClient):
+        try:
+            await asyncio.wait_for(client.get_client_async(), timeout=timeout)
+        except Exception as e:
+            logger_controller.warning(f"{client._name} client not ready at startup: {e!r}")
+
+    await asyncio.gather(*(_warm(client) for client in _registry))
+    return clients_health()
+
+
+def clients_health() -> dict:
+    return {client._name: client.client_health() for client in _registry}
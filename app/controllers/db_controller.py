@@ -2,25 +2,25 @@ import asyncpg
 import psycopg2
 from psycopg2 import pool
 from app.constants.db_constants import DB_HOST, DB_NAME, DB_PASSWORD, DB_PORT, DB_USER
+from app.controllers.client_controller import LazyClient
 
 # Create a ThreadedConnectionPool instead of a single connection
-try:
-    db_pool = psycopg2.pool.ThreadedConnectionPool(
-        1, 20,
-        host=DB_HOST, 
-        database=DB_NAME, 
-        user=DB_USER, 
-        password=DB_PASSWORD, 
-        port=DB_PORT
-    )
-except Exception as error:
-    print("Error while connecting to PostgreSQL", error)
+# (lazily, on first getconn - importing the app shouldn't need Postgres)
+db_pool = LazyClient("postgres", lambda: psycopg2.pool.ThreadedConnectionPool(
+    1, 20,
+    host=DB_HOST, 
+    database=DB_NAME, 
+    user=DB_USER, 
+    password=DB_PASSWORD, 
+    port=DB_PORT
+))
 
-async def create_pool():
+async def create_pool(min_size: int = 10):
     return await asyncpg.create_pool(
         host=DB_HOST,
         database=DB_NAME,
         user=DB_USER,
         password=DB_PASSWORD,
-        port=DB_PORT
+        port=DB_PORT,
+        min_size=min_size
     )
\ No newline at end of file
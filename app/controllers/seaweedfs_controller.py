@@ -7,13 +7,16 @@ from app.constants.global_constants import (
     SEAWEEDFS_SECRET_KEY,
     SEAWEEDFS_BUCKET,
 )
+from app.controllers.client_controller import LazyClient
 
-s3_client = boto3.client(
+# Synchronous boto3 client for scripts (migrate_media.py). The app itself
+# writes through storage_controller's async backend.
+s3_client = LazyClient("seaweedfs", lambda: boto3.client(
     "s3",
     endpoint_url=SEAWEEDFS_S3_ENDPOINT,
     aws_access_key_id=SEAWEEDFS_ACCESS_KEY,
     aws_secret_access_key=SEAWEEDFS_SECRET_KEY,
-)
+))
 
 _bucket_ready = False
 
@@ -29,11 +32,18 @@ def _ensure_bucket():
     _bucket_ready = True
 
 
-def upload_bytes(content: bytes, file_key: str):
+def upload_stream(fileobj, file_key: str, content_type: str | None = None):
+    # Multipart under the hood, so memory stays bounded whatever the size
     _ensure_bucket()
-    s3_client.put_object(Bucket=SEAWEEDFS_BUCKET, Key=file_key, Body=content)
+    extra_args = {"ContentType": content_type} if content_type else None
+    s3_client.upload_fileobj(fileobj, SEAWEEDFS_BUCKET, file_key, ExtraArgs=extra_args)
 
 
-def upload_file(file_path: str, file_key: str):
-    _ensure_bucket()
-    s3_client.upload_file(file_path, SEAWEEDFS_BUCKET, file_key)
+def object_exists(file_key: str) -> bool:
+    try:
+        s3_client.head_object(Bucket=SEAWEEDFS_BUCKET, Key=file_key)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
@@ -0,0 +1,419 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+import httpx
+from botocore.auth import S3SigV4Auth, S3SigV4QueryAuth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+from app.constants.global_constants import (
+    SEAWEEDFS_ACCESS_KEY,
+    SEAWEEDFS_BUCKET,
+    SEAWEEDFS_PUBLIC_S3_ENDPOINT,
+    SEAWEEDFS_S3_ENDPOINT,
+    SEAWEEDFS_SECRET_KEY,
+    STORAGE_BACKEND,
+    STORAGE_KEEPALIVE_CONNECTIONS,
+    STORAGE_KEEPALIVE_SECONDS,
+    STORAGE_LOCAL_ROOT,
+    STORAGE_MAX_CONNECTIONS,
+    STORAGE_MULTIPART_CONCURRENCY,
+    STORAGE_MULTIPART_PART_BYTES,
+    STORAGE_MULTIPART_THRESHOLD_BYTES,
+    STORAGE_TIMEOUT_SECONDS,
+)
+from app.controllers.logger_controller import logger_controller
+
+Buffer = bytes | bytearray | memoryview
+
+
+class StorageError(Exception):
+    def __init__(self, detail: str, status_code: int | None = None):
+        super().__init__(detail)
+        self.status_code = status_code
+
+
+class StorageMetrics:
+    """Counts, bytes and latency percentiles of recent storage calls per operation."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._latencies: dict[str, deque] = {}
+        self._counts: dict[str, int] = {}
+        self._errors: dict[str, int] = {}
+        self._bytes: dict[str, int] = {}
+
+    def observe(self, operation: str, seconds: float, nbytes: int = 0, ok: bool = True) -> None:
+        self._latencies.setdefault(operation, deque(maxlen=self.window)).append(seconds)
+        self._counts[operation] = self._counts.get(operation, 0) + 1
+        self._bytes[operation] = self._bytes.get(operation, 0) + nbytes
+        if not ok:
+            self._errors[operation] = self._errors.get(operation, 0) + 1
+
+    def snapshot(self) -> dict:
+        snapshot = {}
+        for operation, latencies in self._latencies.items():
+            ordered = sorted(latencies)
+            snapshot[operation] = {
+                "count": self._counts[operation],
+                "errors": self._errors.get(operation, 0),
+                "bytes": self._bytes[operation],
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                "max_ms": round(ordered[-1] * 1000, 1),
+            }
+        return snapshot
+
+
+class StorageBackend(ABC):
+    """
+    Where the app writes uploads. Backends implement _put/get/exists/size/
+    delete; put() is timed into `metrics` for every backend alike.
+    """
+
+    name = ""
+
+    def __init__(self):
+        self.metrics = StorageMetrics()
+
+    async def put(self, file_key: str, content: Buffer, content_type: str | None = None) -> None:
+        view = memoryview(content)
+        started = time.perf_counter()
+        ok = False
+        try:
+            await self._put(file_key, view, content_type)
+            ok = True
+        finally:
+            self.metrics.observe("put", time.perf_counter() - started, view.nbytes, ok)
+
+    @abstractmethod
+    async def _put(self, file_key: str, content: memoryview, content_type: str | None) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, file_key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    async def exists(self, file_key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def size(self, file_key: str) -> int | None:
+        """Stored size of the object in bytes, None if there is none."""
+
+    @abstractmethod
+    async def delete(self, file_key: str) -> None:
+        ...
+
+    async def presign_put(
+        self, file_key: str, content_type: str, content_length: int, expire_seconds: int
+    ) -> tuple[str, dict[str, str]]:
+        """
+        A URL a client can PUT exactly `content_length` bytes of
+        `content_type` to, and the headers it must send with them.
+        """
+        raise StorageError(f"The {self.name} storage backend can't issue presigned uploads")
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryStorageBackend(StorageBackend):
+    name = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self.objects: dict[str, tuple[bytes, str | None]] = {}
+
+    async def _put(self, file_key: str, content: memoryview, content_type: str | None) -> None:
+        self.objects[file_key] = (content.tobytes(), content_type)
+
+    async def get(self, file_key: str) -> bytes:
+        if file_key not in self.objects:
+            raise StorageError(f"No such object: {file_key}", 404)
+        return self.objects[file_key][0]
+
+    async def exists(self, file_key: str) -> bool:
+        return file_key in self.objects
+
+    async def size(self, file_key: str) -> int | None:
+        return len(self.objects[file_key][0]) if file_key in self.objects else None
+
+    async def delete(self, file_key: str) -> None:
+        self.objects.pop(file_key, None)
+
+
+class LocalFileStorageBackend(StorageBackend):
+    name = "local"
+
+    def __init__(self, root: str | Path = STORAGE_LOCAL_ROOT):
+        super().__init__()
+        self.root = Path(root).resolve()
+
+    def _path(self, file_key: str) -> Path:
+        path = (self.root / file_key).resolve()
+        if not path.is_relative_to(self.root):
+            raise StorageError(f"Key escapes the storage root: {file_key}")
+        return path
+
+    def _write(self, path: Path, content: memoryview) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".partial")
+        partial.write_bytes(content)
+        os.replace(partial, path)
+
+    async def _put(self, file_key: str, content: memoryview, content_type: str | None) -> None:
+        await asyncio.to_thread(self._write, self._path(file_key), content)
+
+    async def get(self, file_key: str) -> bytes:
+        path = self._path(file_key)
+        if not path.is_file():
+            raise StorageError(f"No such object: {file_key}", 404)
+        return await asyncio.to_thread(path.read_bytes)
+
+    async def exists(self, file_key: str) -> bool:
+        return self._path(file_key).is_file()
+
+    async def size(self, file_key: str) -> int | None:
+        path = self._path(file_key)
+        return path.stat().st_size if path.is_file() else None
+
+    async def delete(self, file_key: str) -> None:
+        await asyncio.to_thread(self._path(file_key).unlink, missing_ok=True)
+
+
+class _UnsignedPayloadAuth(S3SigV4Auth):
+    # Sign headers only (UNSIGNED-PAYLOAD): hashing a multi-MB body would
+    # be CPU work on the event loop for no gain on our own network.
+    def _should_sha256_sign_payload(self, request):
+        return False
+
+
+def _body(content: memoryview):
+    # httpx only takes bytes or an iterator of chunks; streaming the view
+    # as one chunk sends it without copying it into a bytes object.
+    async def chunks():
+        yield content
+
+    return chunks()
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    SeaweedFS over its S3 API on a pooled httpx client, so uploads are
+    awaited on the event loop instead of tying up executor threads and a
+    10-connection urllib3 pool. Objects past `multipart_threshold` go up
+    as parallel multipart uploads, at most `concurrency` parts in flight.
+    Presigned PUT URLs are signed for `public_endpoint`, the host clients
+    upload to directly.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        endpoint: str = SEAWEEDFS_S3_ENDPOINT,
+        bucket: str = SEAWEEDFS_BUCKET,
+        access_key: str | None = SEAWEEDFS_ACCESS_KEY,
+        secret_key: str | None = SEAWEEDFS_SECRET_KEY,
+        region: str = "us-east-1",
+        multipart_threshold: int = STORAGE_MULTIPART_THRESHOLD_BYTES,
+        part_size: int = STORAGE_MULTIPART_PART_BYTES,
+        concurrency: int = STORAGE_MULTIPART_CONCURRENCY,
+        transport: httpx.AsyncBaseTransport | None = None,
+        public_endpoint: str = SEAWEEDFS_PUBLIC_S3_ENDPOINT,
+    ):
+        super().__init__()
+        self.endpoint = endpoint.rstrip("/")
+        self.public_endpoint = public_endpoint.rstrip("/")
+        self.region = region
+        self.bucket = bucket
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self.concurrency = concurrency
+        self._credentials = Credentials(access_key or "", secret_key or "")
+        self._auth = _UnsignedPayloadAuth(self._credentials, "s3", region)
+        self._transport = transport
+
+        self._client: httpx.AsyncClient | None = None
+        self._client_loop: asyncio.AbstractEventLoop | None = None
+        self._bucket_lock: asyncio.Lock | None = None
+        self._bucket_ready = False
+
+    def _http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # Pooled connections belong to the loop that opened them, so a
+            # caller on another loop (TestClient, scripts) gets its own pool
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=STORAGE_MAX_CONNECTIONS,
+                    max_keepalive_connections=STORAGE_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=STORAGE_KEEPALIVE_SECONDS,
+                ),
+                timeout=STORAGE_TIMEOUT_SECONDS,
+                transport=self._transport,
+            )
+            self._client_loop = loop
+            self._bucket_lock = asyncio.Lock()
+        return self._client
+
+    def _url(self, file_key: str | None = None, query: str = "", endpoint: str | None = None) -> str:
+        url = f"{endpoint or self.endpoint}/{self.bucket}"
+        if file_key:
+            url += "/" + quote(file_key, safe="/~")
+        return f"{url}?{query}" if query else url
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        content: memoryview | bytes | None = None,
+        headers: dict | None = None,
+        expected: tuple[int, ...] = (200,),
+    ) -> httpx.Response:
+        headers = dict(headers or {})
+        if content is not None:
+            headers["Content-Length"] = str(len(content) if isinstance(content, bytes) else content.nbytes)
+            if isinstance(content, memoryview):
+                content = _body(content)
+
+        request = AWSRequest(method=method, url=url, headers=headers)
+        self._auth.add_auth(request)
+
+        try:
+            response = await self._http().request(method, url, content=content, headers=dict(request.headers.items()))
+        except httpx.HTTPError as e:
+            raise StorageError(f"{method} {url} failed: {e!r}") from e
+        if response.status_code not in expected:
+            raise StorageError(f"{method} {url} failed: {response.status_code} {response.text[:200]}", response.status_code)
+        return response
+
+    async def _ensure_bucket(self) -> None:
+        if self._bucket_ready:
+            return
+        self._http()
+        async with self._bucket_lock:
+            if self._bucket_ready:
+                return
+            response = await self._request("HEAD", self._url(), expected=(200, 404))
+            if response.status_code == 404:
+                await self._request("PUT", self._url(), expected=(200, 409))
+            self._bucket_ready = True
+
+    async def _put(self, file_key: str, content: memoryview, content_type: str | None) -> None:
+        await self._ensure_bucket()
+        headers = {"Content-Type": content_type} if content_type else {}
+        if content.nbytes >= self.multipart_threshold:
+            await self._put_multipart(file_key, content, headers)
+        else:
+            await self._request("PUT", self._url(file_key), content=content, headers=headers)
+
+    async def _put_multipart(self, file_key: str, content: memoryview, headers: dict) -> None:
+        response = await self._request("POST", self._url(file_key, "uploads"), headers=headers)
+        upload_id = ET.fromstring(response.content).findtext(".//{*}UploadId")
+        if not upload_id:
+            raise StorageError(f"No UploadId in multipart response for {file_key}")
+        upload_query = f"uploadId={quote(upload_id, safe='')}"
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def upload_part(number: int, part: memoryview) -> str:
+            async with semaphore:
+                started = time.perf_counter()
+                ok = False
+                try:
+                    response = await self._request(
+                        "PUT", self._url(file_key, f"partNumber={number}&{upload_query}"), content=part
+                    )
+                    ok = True
+                    return response.headers["ETag"]
+                finally:
+                    self.metrics.observe("part", time.perf_counter() - started, part.nbytes, ok)
+
+        parts = [content[offset:offset + self.part_size] for offset in range(0, content.nbytes, self.part_size)]
+        tasks = [asyncio.ensure_future(upload_part(number, part)) for number, part in enumerate(parts, start=1)]
+        try:
+            etags = await asyncio.gather(*tasks)
+            body = "<CompleteMultipartUpload>" + "".join(
+                f"<Part><PartNumber>{number}</PartNumber><ETag>{escape(etag)}</ETag></Part>"
+                for number, etag in enumerate(etags, start=1)
+            ) + "</CompleteMultipartUpload>"
+            response = await self._request("POST", self._url(file_key, upload_query), content=body.encode())
+            # S3 can report a failed complete as a 200 with an <Error> body
+            if ET.fromstring(response.content).tag.endswith("Error"):
+                raise StorageError(f"Completing multipart upload of {file_key} failed: {response.text[:200]}")
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            try:
+                await self._request("DELETE", self._url(file_key, upload_query), expected=(200, 204, 404))
+            except Exception as e:
+                logger_controller.warning(f"Failed to abort multipart upload of {file_key}: {e!r}")
+            raise
+
+    async def get(self, file_key: str) -> bytes:
+        response = await self._request("GET", self._url(file_key), expected=(200, 404))
+        if response.status_code == 404:
+            raise StorageError(f"No such object: {file_key}", 404)
+        return response.content
+
+    async def exists(self, file_key: str) -> bool:
+        response = await self._request("HEAD", self._url(file_key), expected=(200, 404))
+        return response.status_code == 200
+
+    async def size(self, file_key: str) -> int | None:
+        response = await self._request("HEAD", self._url(file_key), expected=(200, 404))
+        if response.status_code == 404:
+            return None
+        return int(response.headers.get("Content-Length", 0))
+
+    async def delete(self, file_key: str) -> None:
+        await self._request("DELETE", self._url(file_key), expected=(200, 204, 404))
+
+    async def presign_put(
+        self, file_key: str, content_type: str, content_length: int, expire_seconds: int
+    ) -> tuple[str, dict[str, str]]:
+        # The client's PUT lands in the bucket directly, so it has to exist
+        await self._ensure_bucket()
+        # Content-Type and Content-Length are signed: a PUT of anything
+        # else than was asked for fails the signature check
+        headers = {"Content-Type": content_type, "Content-Length": str(content_length)}
+        request = AWSRequest(method="PUT", url=self._url(file_key, endpoint=self.public_endpoint), headers=headers)
+        S3SigV4QueryAuth(self._credentials, "s3", self.region, expires=expire_seconds).add_auth(request)
+        return request.url, headers
+
+    async def close(self) -> None:
+        if self._client is not None and self._client_loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+
+
+_BACKENDS: dict[str, Callable[[], StorageBackend]] = {
+    "s3": S3StorageBackend,
+    "memory": MemoryStorageBackend,
+    "local": LocalFileStorageBackend,
+}
+
+
+def register_storage_backend(name: str, factory: Callable[[], StorageBackend]) -> None:
+    _BACKENDS[name] = factory
+    get_storage.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def get_storage(backend: str = STORAGE_BACKEND) -> StorageBackend:
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unknown storage backend {backend!r} (have: {', '.join(_BACKENDS)})")
+    return _BACKENDS[backend]()
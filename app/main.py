@@ -8,7 +8,13 @@ from pytz import timezone
 from contextlib import asynccontextmanager
 import os
 
+from app.controllers.client_controller import warm_up_clients
+from app.controllers.storage_controller import get_storage
 from app.controllers.db_controller import create_pool
+from app.controllers.logger_controller import logger_controller
+from app.utilities.media.image_pool_utilities import image_pool
+from app.utilities.media.media_job_utilities import media_jobs
+from app.utilities.media.upload_stream_utilities import UploadSizeLimitMiddleware
 from app.routes.chats.chats_endpoints import chats_router
 from app.routes.actions.swipe_endpoint import swipe_route
 from app.routes.actions.likes_endpoint import likes_route
@@ -33,8 +39,20 @@ def start_meet_at_8_sync():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Create asyncpg pool
-    app.state.db_pool = await create_pool()
+    # Create asyncpg pool; if Postgres isn't reachable yet, boot anyway with
+    # an empty pool that connects on first acquire
+    try:
+        app.state.db_pool = await create_pool()
+    except Exception as e:
+        logger_controller.warning(f"Postgres not reachable at startup, connecting on demand: {e!r}")
+        app.state.db_pool = await create_pool(min_size=0)
+
+    # Bring up the lazy clients (B2, ImageKit, S3, ...) in the background
+    warm_up_task = asyncio.create_task(warm_up_clients())
+
+    # Image worker processes, and the deferred upload workers that feed them
+    image_pool.start()
+    await media_jobs.start()
 
     # Setup APScheduler job
     trigger = CronTrigger(hour=20, minute=0, timezone=ist)
@@ -44,6 +62,10 @@ async def lifespan(app: FastAPI):
     yield
 
     # Shutdown scheduler and close pool
+    warm_up_task.cancel()
+    await media_jobs.stop()
+    image_pool.shutdown()
+    await get_storage().close()
     scheduler.shutdown()
     await app.state.db_pool.close()
     
@@ -53,6 +75,9 @@ app = FastAPI(lifespan=lifespan)
 # All REST API endpoints are now prefixed with /api/v1
 api_v1_prefix = "/api/v1"
 
+# Cut oversized uploads off while they're still arriving
+app.add_middleware(UploadSizeLimitMiddleware, path_prefix=f"{api_v1_prefix}/upload")
+
 app.include_router(auth_router, prefix=api_v1_prefix)
 app.include_router(user_router, prefix=api_v1_prefix)
 app.include_router(swipe_route, prefix=api_v1_prefix)
@@ -6,7 +6,7 @@ from matplotlib.dates import relativedelta
 from pydantic import BaseModel, EmailStr, field_validator, model_validator
 from datetime import date, datetime
 
-from app.utilities.common.common_utilites import get_signed_imagekit
+from app.utilities.common.common_utilites import CARD_DISPLAY_SIZE, get_signed_imagekit_batch
 
 class MatchCandidateModel(BaseModel):
     #Core
@@ -55,19 +55,25 @@ def build_candidate_model(user_metadata: dict, core_data: tuple) -> MatchCandida
         value = str(value).strip()
         return None if value.lower() == "none" or value == "" else value
 
+    # Profile picture + photos signed together in one pass
+    profile_picture, *photos = get_signed_imagekit_batch(
+        [json.loads(core_data[4]), *ast.literal_eval(user_metadata.get("photos", "[]"))],
+        size=CARD_DISPLAY_SIZE,
+    )
+
     typed_data = {
         "id": core_data[0],
         "username": core_data[1],
         "gender": core_data[2],
         "university_id": int(core_data[3]),
-        "profile_picture": get_signed_imagekit(json.loads(core_data[4])),
+        "profile_picture": profile_picture,
 
         "dob": datetime.strptime(user_metadata["dob"], "%Y-%m-%d").date(),
 
         "university_major": sanitize(user_metadata["university_major"]),
         "university_year": int(user_metadata["university_year"]),
 
-        "photos": [get_signed_imagekit(image_metadata=img) for img in ast.literal_eval(user_metadata.get("photos", "[]"))],
+        "photos": photos,
         "about": sanitize(user_metadata["about"]),
         "currently_staying": sanitize(user_metadata["currently_staying"]),
         "hometown": sanitize(user_metadata["hometown"]),
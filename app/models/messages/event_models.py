@@ -22,6 +22,9 @@ class SeenEvent(BaseModel):
     from_ : int
     message_id: str
 
+    # Seen watermark: everything up to and including this seq has been seen
+    seq: Optional[int] = None
+
 # {
 #     "type": "chats",
 #     "chats_type": "typing",
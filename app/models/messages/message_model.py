@@ -19,6 +19,9 @@ class ChatMessage(BaseModel):
     chat_room_id: int
     is_seen: Optional[bool] = False
 
+    # Per-chat sequence number, assigned by the DB on insert
+    seq: Optional[int] = None
+
     timestamp: Optional[datetime] = datetime.now()
 
     type: Literal["chats"]
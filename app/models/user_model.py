@@ -5,7 +5,7 @@ from matplotlib.dates import relativedelta
 from pydantic import BaseModel, EmailStr, field_validator, model_validator
 from datetime import date, datetime
 
-from app.utilities.common.common_utilites import get_signed_imagekit
+from app.utilities.common.common_utilites import get_signed_imagekit, get_signed_imagekit_batch
 
 
 class UserModel(BaseModel):
@@ -95,7 +95,7 @@ def build_user_model(user_metadata: list, core_data: list, hashed_password: str,
         "university_year": parse_optional_int(metadata_dict.get("university_year")),
         "university_id": university_id,
         "profile_picture": profile_picture,
-        "photos": [get_signed_imagekit(image_metadata=img) for img in ast.literal_eval(metadata_dict.get("photos", "[]"))],
+        "photos": get_signed_imagekit_batch(ast.literal_eval(metadata_dict.get("photos", "[]"))),
         "about": parse_optional_str(metadata_dict.get("about")),
         "currently_staying": validate_literal(metadata_dict.get("currently_staying"), ["Campus Hostel", "PG", "Home", "Flat", "Other"]),
         "hometown": parse_optional_str(metadata_dict.get("hometown")),
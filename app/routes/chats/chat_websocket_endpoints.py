@@ -6,40 +6,41 @@ from pydantic import TypeAdapter
 from app.models.messages.event_models import SeenEvent, TypingEvent
 from app.models.messages.message_model import ChatMessage
 from app.utilities.chat.chat_utilities import add_to_unseen_and_last_message, insert_message_to_db
+from app.utilities.chat.typing_utilities import TypingAggregator, typing_chat_room_id
 from app.utilities.token.token_utilities import decode_token
+from app.utilities.websocket.websocket_utilities import ConnectionSender
 
 
 chatsocket_router = APIRouter(prefix="/ws")
-active_connections_chats: Dict[int, WebSocket] = {}
+active_connections_chats: Dict[int, ConnectionSender] = {}
 
 ChatEvent = Union[ChatMessage, TypingEvent, SeenEvent]
 chat_event_adapter = TypeAdapter(ChatEvent)
+typing_aggregator = TypingAggregator()
 
 
 async def send_event_to_user_chat(event: ChatEvent):
-    websocket = active_connections_chats.get(event.to)
-    if websocket:
-        try:
-            data_json = event.model_dump_json()
-            await websocket.send_text(data_json)
-            if isinstance(event, ChatMessage):
-                add_to_unseen_and_last_message(
-                    receiver_id=event.to,
-                    chat_room_id = event.chat_room_id,
-                    message_id = event.message_id
-                )
-
-        except Exception as e:
-            print(f"Error sending event to user {event.to}: {e}")
+    sender = active_connections_chats.get(event.to)
+    if sender:
+        data_json = event.model_dump_json()
+        if isinstance(event, TypingEvent):
+            # Only the latest typing state matters and it's safe to lose.
+            sender.enqueue_text(data_json, coalesce_key=("typing", event.chat_room_id, event.from_), ephemeral=True)
+        elif isinstance(event, SeenEvent):
+            # Seen is a watermark, a newer one supersedes any still queued.
+            sender.enqueue_text(data_json, coalesce_key=("seen", event.from_))
+        else:
+            sender.enqueue_text(data_json)
     else:
-        if isinstance(event, ChatMessage):
-            add_to_unseen_and_last_message(
-                receiver_id=event.to,
-                chat_room_id = event.chat_room_id,
-                message_id = event.message_id
-            )
         print(f"No active connection for user {event.to}.")
 
+    if isinstance(event, ChatMessage):
+        add_to_unseen_and_last_message(
+            receiver_id=event.to,
+            chat_room_id = event.chat_room_id,
+            message_id = event.message_id
+        )
+
 
 @chatsocket_router.websocket("/chat")
 async def websocket_endpoint(websocket: WebSocket):
@@ -57,16 +58,24 @@ async def websocket_endpoint(websocket: WebSocket):
 
     user_id = decode_token(token)
     await websocket.accept()
-    active_connections_chats[user_id] = websocket
+    sender = ConnectionSender(websocket)
+    active_connections_chats[user_id] = sender
     print(f"User {user_id} ({websocket.client.host}) connected.")
 
-    await websocket.send_text(json.dumps({"message": "Connected to chat websocket."}))
+    sender.enqueue_json({"message": "Connected to chat websocket."})
 
     try:
         while True:
             raw_data = await websocket.receive_text()
             data = json.loads(raw_data)
 
+            # Throttle typing bursts on the raw payload, before paying for
+            # validation - suppressed repeats are neither parsed nor logged.
+            # Keyed on the authenticated user, not the client-supplied from_.
+            typing_room = typing_chat_room_id(data)
+            if typing_room is not None and not typing_aggregator.should_forward(typing_room, user_id):
+                continue
+
             try:
                 event = chat_event_adapter.validate_python(data)
             except Exception as e:
@@ -78,6 +87,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 print(f"Received message from {user_id} to {event.to}: {event.message}")
                 inserted_id = insert_message_to_db(event)
                 event.message_id = inserted_id  # assign the DB id to the event
+                typing_aggregator.stop(event.chat_room_id, user_id)
                 await send_event_to_user_chat(event)
 
             elif isinstance(event, TypingEvent):
@@ -90,4 +100,8 @@ async def websocket_endpoint(websocket: WebSocket):
 
     except WebSocketDisconnect:
         print(f"User {user_id} disconnected.")
-        active_connections_chats.pop(user_id, None)
\ No newline at end of file
+    finally:
+        # A reconnect may already have replaced this entry with a new sender.
+        if active_connections_chats.get(user_id) is sender:
+            active_connections_chats.pop(user_id, None)
+        sender.stop()
\ No newline at end of file
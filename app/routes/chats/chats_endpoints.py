@@ -11,7 +11,13 @@ from app.models.messages.event_models import SeenEvent
 from app.routes.chats.chat_websocket_endpoints import send_event_to_user_chat
 from app.routes.matches.connections_websocket_endpoints import DataModel, send_event_to_user_connection
 
-from app.utilities.chat.chat_utilities import process_msg
+from app.utilities.chat.chat_utilities import (
+    decode_message_cursor,
+    encode_message_cursor,
+    load_sync_state,
+    process_msgs,
+    save_sync_state,
+)
 from app.utilities.exception.swipe.swipe_exceptions import handle_db_errors
 from app.utilities.token.token_utilities import decode_token
 from app.controllers.db_controller import db_pool
@@ -20,6 +26,9 @@ from app.controllers.logger_controller import logger_controller
 
 chats_router = APIRouter(prefix="/chats")
 
+CHAT_PAGE_SIZE = 20
+SYNC_MAX_MESSAGES_PER_CHAT = 50
+
 class ChatRequest(BaseModel):
     id: int
 
@@ -104,6 +113,7 @@ class ChatRoomRequest(BaseModel):
     chat_room_id: int 
     last_message_id: Optional[str] = None
     last_message_timestamp: Optional[datetime] = None
+    cursor: Optional[str] = None
     
 @chats_router.post("/get/chat")
 @handle_db_errors
@@ -126,21 +136,23 @@ async def fetch_chats(request: Request, body: ChatRoomRequest, token: str = Depe
 
         # Last message lookup
         row = await async_conn.fetchrow("""
-            SELECT id, sender_id FROM messages
+            SELECT id, sender_id, seq FROM messages
             WHERE chat_id = $1
-            ORDER BY timestamp DESC
+            ORDER BY seq DESC
             LIMIT 1;
         """, body.chat_room_id)
 
         last_message_id = row['id'] if row else None
         last_message_sender = row['sender_id'] if row else None
+        last_message_seq = row['seq'] if row else None
 
         if last_message_id and last_message_sender != requesting_user_id:
             await async_conn.execute("""
                 UPDATE chat_participants
-                SET last_seen_message_id = $1, unseen_count = 0, last_seen_at = NOW()
+                SET last_seen_message_id = $1, unseen_count = 0, last_seen_at = NOW(),
+                    last_seen_seq = GREATEST(last_seen_seq, $4)
                 WHERE user_id = $2 AND chat_id = $3;
-            """, last_message_id, requesting_user_id, body.chat_room_id)
+            """, last_message_id, requesting_user_id, body.chat_room_id, last_message_seq)
 
             await send_event_to_user_chat(
                 SeenEvent(
@@ -148,7 +160,8 @@ async def fetch_chats(request: Request, body: ChatRoomRequest, token: str = Depe
                     chats_type="seen",
                     to=last_message_sender,
                     from_=requesting_user_id,
-                    message_id=str(last_message_id)
+                    message_id=str(last_message_id),
+                    seq=last_message_seq
                 )
             )
 
@@ -161,7 +174,8 @@ async def fetch_chats(request: Request, body: ChatRoomRequest, token: str = Depe
                 m.message,
                 m.reply_id,
                 m.timestamp,
-                (m.id = cp.last_seen_message_id OR m.timestamp <= cp.last_seen_at) AS is_seen,
+                m.seq,
+                (m.seq <= cp.last_seen_seq) AS is_seen,
                 mf.file_key,
                 mf.media_type,
                 mf.size_bytes,
@@ -170,18 +184,26 @@ async def fetch_chats(request: Request, body: ChatRoomRequest, token: str = Depe
             LEFT JOIN chat_participants cp ON m.chat_id = cp.chat_id AND cp.user_id = $1
             LEFT JOIN media_files mf ON m.id = mf.message_id
             WHERE m.chat_id = $2
-            ORDER BY m.timestamp DESC
-            LIMIT 20;
-        """, requesting_user_id, body.chat_room_id)
+            ORDER BY m.seq DESC
+            LIMIT $3;
+        """, requesting_user_id, body.chat_room_id, CHAT_PAGE_SIZE + 1)
 
+        has_more = len(messages_rows) > CHAT_PAGE_SIZE
+        messages_rows = messages_rows[:CHAT_PAGE_SIZE]
         messages_rows.reverse()
 
         # Construct ChatMessage list
-        messages = await asyncio.gather(*(process_msg(msg) for msg in messages_rows))
+        messages = await process_msgs(messages_rows)
+
+        # Hand back a cursor so the client can continue straight into
+        # /get/chat-paginated from the oldest message on this page.
+        next_page_cursor = encode_message_cursor(messages_rows[0]['seq']) if has_more else None
 
     return {
         "user_id": requesting_user_id,
-        "messages": messages
+        "messages": messages,
+        "has_more": has_more,
+        "next_page_cursor": next_page_cursor
     }
 
 
@@ -189,6 +211,16 @@ async def fetch_chats(request: Request, body: ChatRoomRequest, token: str = Depe
 @handle_db_errors
 async def fetch_paginated_chats(request: Request, body: ChatRoomRequest, token: str = Depends(oauth2_scheme)):
     requesting_user_id = decode_token(token)
+
+    # Keyset position: the opaque cursor from a previous page. Older clients
+    # send the oldest message they hold instead, resolved to its seq below.
+    before_seq = None
+    if body.cursor:
+        try:
+            before_seq = decode_message_cursor(body.cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
     try:
         async with request.app.state.db_pool.acquire() as async_conn:
             # Validate participation
@@ -201,21 +233,35 @@ async def fetch_paginated_chats(request: Request, body: ChatRoomRequest, token:
             if not is_participant:
                 raise HTTPException(status_code=403, detail="User is not a participant of this chat")
 
-            # Use a very large number as default pagination ID if none provided (means fetch latest)
-            pagination_message_id : str = body.last_message_id
-            pagination_timestamp : datetime = body.last_message_timestamp
-
-            logger_controller.info(f"Pagination message ID received: {pagination_message_id}")
-
-            # Fetch messages older than pagination_message_id (strictly less)
-            messages_rows = await async_conn.fetch("""
+            if before_seq is None and body.last_message_id:
+                before_seq = await async_conn.fetchval("""
+                    SELECT seq FROM messages
+                    WHERE id = $1::uuid AND chat_id = $2;
+                """, body.last_message_id, body.chat_room_id)
+                if before_seq is None:
+                    raise HTTPException(status_code=400, detail="Unknown pagination message")
+
+            logger_controller.info(f"Pagination cursor received: seq < {before_seq}")
+
+            # No cursor means start from the newest message
+            keyset_filter = ""
+            params = [requesting_user_id, body.chat_room_id, CHAT_PAGE_SIZE + 1]
+            if before_seq is not None:
+                keyset_filter = "AND m.seq < $4"
+                params.append(before_seq)
+
+            # Walks uq_messages_chat_seq backwards; one extra row tells us
+            # whether another page exists.
+            messages_rows = await async_conn.fetch(f"""
                 SELECT
                     m.id,
                     m.chat_id,
                     m.sender_id,
                     m.message,
+                    m.reply_id,
                     m.timestamp,
-                    (m.id = cp.last_seen_message_id OR m.timestamp <= cp.last_seen_at) AS is_seen,
+                    m.seq,
+                    (m.seq <= cp.last_seen_seq) AS is_seen,
                     mf.file_key,
                     mf.media_type,
                     mf.size_bytes,
@@ -224,30 +270,22 @@ async def fetch_paginated_chats(request: Request, body: ChatRoomRequest, token:
                 LEFT JOIN chat_participants cp ON m.chat_id = cp.chat_id AND cp.user_id = $1
                 LEFT JOIN media_files mf ON m.id = mf.message_id
                 WHERE m.chat_id = $2
-                AND (m.timestamp, m.id) < ($3::timestamp, $4::uuid)
-                ORDER BY m.timestamp DESC, m.id DESC
-                LIMIT 20;
-            """, requesting_user_id, body.chat_room_id, pagination_timestamp, pagination_message_id)
+                {keyset_filter}
+                ORDER BY m.seq DESC
+                LIMIT $3;
+            """, *params)
+
+            has_more = len(messages_rows) > CHAT_PAGE_SIZE
+            messages_rows = messages_rows[:CHAT_PAGE_SIZE]
 
             # Reverse to get ascending order (oldest first) for UI display
             messages_rows.reverse()
             logger_controller.info(f"Fetched message IDs: {[msg['id'] for msg in messages_rows]}")
-            
-            # Process messages concurrently
-            messages = await asyncio.gather(*(process_msg(msg) for msg in messages_rows))
-
-            # Determine if more messages exist before the oldest fetched message
-            has_more = False
-            next_page_cursor = None
-            if messages_rows:
-                oldest_id = messages_rows[0]['id']
-                has_more = await async_conn.fetchval("""
-                    SELECT EXISTS (
-                        SELECT 1 FROM messages
-                        WHERE chat_id = $1 AND id < $2
-                    );
-                """, body.chat_room_id, oldest_id)
-                next_page_cursor = oldest_id
+
+            # Build the page with one batch signing pass
+            messages = await process_msgs(messages_rows)
+
+            next_page_cursor = encode_message_cursor(messages_rows[0]['seq']) if has_more else None
 
         return {
             "user_id": requesting_user_id,
@@ -256,6 +294,140 @@ async def fetch_paginated_chats(request: Request, body: ChatRoomRequest, token:
             "next_page_cursor": next_page_cursor
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger_controller.error(f"Error fetching chats: {e}")
-        raise HTTPException(status_code=500, detail="Failed to fetch chat messages")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to fetch chat messages")
+
+
+@chats_router.get("/sync")
+@handle_db_errors
+async def sync_chats(request: Request, since: Optional[str] = None, token: str = Depends(oauth2_scheme)):
+    """
+    Delta sync for reconnecting clients. Returns, across all of the user's
+    chats, only what changed since `since`: new messages, the peer's seen
+    watermark and the user's own unseen count / watermark. Without `since`
+    it returns just the current state and a cursor to sync from. Cursors
+    expire (410) after SYNC_CURSOR_TTL_SECONDS; sync again without one.
+    """
+    requesting_user_id = decode_token(token)
+
+    known_state = {}
+    if since:
+        try:
+            known_state = await asyncio.to_thread(load_sync_state, requesting_user_id, since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid sync cursor")
+        if known_state is None:
+            raise HTTPException(status_code=410, detail="Sync cursor expired, sync again without it")
+
+    async with request.app.state.db_pool.acquire() as async_conn:
+        # Current state of every chat the user is in (idx_chat_participants_user_id),
+        # one row per chat: in group chats the peer is whoever has read furthest
+        chat_rows = await async_conn.fetch("""
+            SELECT
+                cp.chat_id,
+                cp.unseen_count,
+                cp.last_seen_seq,
+                c.last_seq,
+                peer.user_id AS peer_id,
+                COALESCE(peer.last_seen_seq, 0) AS peer_seen_seq
+            FROM chat_participants cp
+            JOIN chats c ON c.id = cp.chat_id
+            LEFT JOIN LATERAL (
+                SELECT p.user_id, p.last_seen_seq
+                FROM chat_participants p
+                WHERE p.chat_id = cp.chat_id AND p.user_id <> cp.user_id
+                ORDER BY p.last_seen_seq DESC NULLS LAST
+                LIMIT 1
+            ) peer ON true
+            WHERE cp.user_id = $1;
+        """, requesting_user_id)
+
+        new_state = {}
+        fetch_chat_ids, fetch_after_seqs = [], []
+        seen_changes, unseen_changes = [], []
+
+        for row in chat_rows:
+            chat_id = row['chat_id']
+            new_state[chat_id] = (row['last_seq'], row['peer_seen_seq'], row['last_seen_seq'])
+
+            if not since:
+                continue
+
+            # Chats missing from the cursor are new since the last sync
+            known_seq, known_peer_seen, known_own_seen = known_state.get(chat_id, (0, 0, 0))
+
+            if row['last_seq'] > known_seq:
+                fetch_chat_ids.append(chat_id)
+                fetch_after_seqs.append(known_seq)
+
+            if row['peer_seen_seq'] > known_peer_seen:
+                seen_changes.append({
+                    "chat_room_id": chat_id,
+                    "user_id": row['peer_id'],
+                    "last_seen_seq": row['peer_seen_seq'],
+                })
+
+            if row['last_seq'] > known_seq or row['last_seen_seq'] != known_own_seen:
+                unseen_changes.append({
+                    "chat_room_id": chat_id,
+                    "unseen_count": row['unseen_count'],
+                    "last_seen_seq": row['last_seen_seq'],
+                })
+
+        messages_rows = []
+        if fetch_chat_ids:
+            # One range scan per changed chat on uq_messages_chat_seq, capped
+            # so a long offline gap can't produce an unbounded response.
+            messages_rows = await async_conn.fetch("""
+                SELECT
+                    m.id,
+                    m.chat_id,
+                    m.sender_id,
+                    m.message,
+                    m.reply_id,
+                    m.timestamp,
+                    m.seq,
+                    (m.seq <= cp.last_seen_seq) AS is_seen,
+                    mf.file_key,
+                    mf.media_type,
+                    mf.size_bytes,
+                    mf.metadata
+                FROM unnest($2::int[], $3::bigint[]) AS k(chat_id, after_seq)
+                JOIN chat_participants cp ON cp.chat_id = k.chat_id AND cp.user_id = $1
+                CROSS JOIN LATERAL (
+                    SELECT * FROM messages
+                    WHERE messages.chat_id = k.chat_id AND messages.seq > k.after_seq
+                    ORDER BY messages.seq
+                    LIMIT $4
+                ) m
+                LEFT JOIN media_files mf ON m.id = mf.message_id
+                ORDER BY m.chat_id, m.seq;
+            """, requesting_user_id, fetch_chat_ids, fetch_after_seqs, SYNC_MAX_MESSAGES_PER_CHAT)
+
+        # Advance each chat's cursor to exactly what was returned: a capped
+        # chat resumes where it stopped on the next call, and rows inserted
+        # since the state query above aren't sent twice.
+        returned = {}
+        for msg in messages_rows:
+            count, _ = returned.get(msg['chat_id'], (0, 0))
+            returned[msg['chat_id']] = (count + 1, msg['seq'])
+
+        has_more = False
+        for chat_id, (count, returned_seq) in returned.items():
+            _, peer_seen_seq, own_seen_seq = new_state[chat_id]
+            new_state[chat_id] = (returned_seq, peer_seen_seq, own_seen_seq)
+            has_more = has_more or count == SYNC_MAX_MESSAGES_PER_CHAT
+
+        messages = await process_msgs(messages_rows)
+
+    return {
+        "user_id": requesting_user_id,
+        "messages": messages,
+        "seen": seen_changes,
+        "unseen_counts": unseen_changes,
+        "has_more": has_more,
+        "cursor": await asyncio.to_thread(save_sync_state, requesting_user_id, new_state),
+    }
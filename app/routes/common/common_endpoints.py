@@ -1,6 +1,4 @@
 import asyncio
-import tempfile
-import cv2
 from fastapi import APIRouter, Depends, File, Form, UploadFile, HTTPException, BackgroundTasks
 from enum import Enum
 import uuid
@@ -8,13 +6,35 @@ from io import BytesIO
 from PIL import Image
 import time
 
-import requests
-
-from app.constants.global_constants import oauth2_scheme
-from app.utilities.media.media_utilities import generate_blurhash
-from app.utilities.media.imgproxy_utilities import build_signed_url
+from app.constants.global_constants import PRESIGNED_UPLOAD_EXPIRY_SECONDS, UPLOAD_MAX_BYTES, oauth2_scheme
+from app.utilities.media.imgproxy_utilities import build_signed_url, rendition_key
+from app.utilities.media.image_pool_utilities import ImagePoolBusy, image_pool
+from app.utilities.media.remote_fetch_utilities import RemoteFetchError, fetch_remote_image
+from app.utilities.media.upload_stream_utilities import UploadTooLarge, read_upload
+from app.utilities.media.media_dedup_utilities import find_duplicate, hash_content, record_upload
+from app.utilities.media.blurhash_cache_utilities import cache_blurhash, get_cached_blurhash
+from app.utilities.media.profile_picture_utilities import delete_replaced_profile_picture
+from app.utilities.media.media_job_utilities import (
+    MediaJobQueueFull,
+    get_job,
+    media_jobs,
+    register_media_job_handler,
+)
+from app.utilities.media.audio_processing_utilities import (
+    AudioTooLongError,
+    AudioUnavailableError,
+    InvalidAudioError,
+    process_voice_note,
+)
+from app.utilities.media.image_processing_utilities import (
+    ImageTooLargeError,
+    InvalidImageError,
+    process_profile_picture,
+    process_upload_image,
+    provisional_blurhash,
+)
 from app.utilities.token.token_utilities import decode_token
-from app.controllers import seaweedfs_controller
+from app.controllers.storage_controller import StorageError, get_storage
 from app.controllers.logger_controller import logger_controller
 
 common_router = APIRouter(prefix="/upload")
@@ -23,77 +43,174 @@ class MediaTypeEnum(str, Enum):
     IMAGE = "image"
     VOICE = "voice"
 
-MAX_FILE_SIZE_MB = 5
-MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024  # 5 MB
+MAX_FILE_SIZE_BYTES = UPLOAD_MAX_BYTES
+MAX_FILE_SIZE_MB = MAX_FILE_SIZE_BYTES // (1024 * 1024)
+
+async def read_upload_file(file: UploadFile) -> memoryview:
+    try:
+        return await read_upload(file, MAX_FILE_SIZE_BYTES)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"File too large. Max {MAX_FILE_SIZE_MB}MB")
 
-async def upload_file_async_chat(webp_content: bytes, file_key: str):
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, seaweedfs_controller.upload_bytes, webp_content, file_key)
+async def upload_file_async_chat(webp_content: bytes | memoryview, file_key: str, content_type: str | None = "image/webp"):
+    await get_storage().put(file_key, webp_content, content_type)
 
-async def upload_file_async_user(file_path: str, file_key: str) -> tuple[str, str]:
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, seaweedfs_controller.upload_file, file_path, file_key)
+async def upload_file_async_user(content: bytes | memoryview, file_key: str, content_type: str | None = "image/webp") -> tuple[str, str]:
+    await upload_file_async_chat(content, file_key, content_type)
 
     return file_key, build_signed_url(file_key)
 
-def process_image_half_and_convert_webp(content: bytes) -> tuple[bytes, int, int]:
-    image = Image.open(BytesIO(content))
-    original_width, original_height = image.size
-    width, height = original_width // 2, original_height // 2
-    image = image.resize((width, height), Image.Resampling.LANCZOS)
-
-    webp_buffer = BytesIO()
-    image.save(webp_buffer, format="WEBP", quality=75)
-    return webp_buffer.getvalue(), width, height
-
-def process_image_to_webp_file(content: bytes) -> tuple[str, bytes, int, int]:
-    image = Image.open(BytesIO(content))
-    original_width, original_height = image.size
-    width, height = original_width // 2, original_height // 2
-    image = image.resize((width, height), Image.Resampling.LANCZOS)
-
-    with tempfile.NamedTemporaryFile(suffix=".webp", delete=False) as temp_file:
-        image.save(temp_file, format="WEBP", quality=75)
-        temp_file_path = temp_file.name
-
-    with open(temp_file_path, "rb") as f:
-        webp_content = f.read()
-
-    return temp_file_path, webp_content, width, height
-
-def extract_face(image_path, save_path, PADDING = 50):
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-    
-    # Read image
-    img = cv2.imread(image_path)
-    if img is None:
-        print("Image not found.")
-        return False
-    
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    
-    # Detect faces
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
-    
-    if len(faces) == 0:
-        print("No face detected.")
-        return False
-    
-    # Take first face only
-    x, y, w, h = faces[0]
-    
-    # Apply padding and ensure bounds
-    x1 = max(0, x - PADDING)
-    y1 = max(0, y - PADDING)
-    x2 = min(img.shape[1], x + w + PADDING)
-    y2 = min(img.shape[0], y + h + PADDING)
-    
-    # Crop and save
-    face_img = img[y1:y2, x1:x2]
-    pil_image = Image.fromarray(cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB))
-    pil_image.save(save_path)
-    
-    return True
+async def upload_renditions(file_key: str, renditions: dict[str, tuple[bytes, int]]) -> dict[str, int]:
+    """Stores renditions next to file_key; returns the name -> longest side map kept in the image metadata."""
+    await asyncio.gather(*(
+        upload_file_async_chat(webp_content, rendition_key(file_key, name))
+        for name, (webp_content, _) in renditions.items()
+    ))
+    return {name: side for name, (_, side) in renditions.items()}
+
+async def run_image_job(fn, *args):
+    try:
+        return await image_pool.run(fn, *args)
+    except ImagePoolBusy:
+        raise HTTPException(status_code=503, detail="Image processing is busy, try again shortly.")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Image processing timed out.")
+    except ImageTooLargeError:
+        raise HTTPException(status_code=413, detail="Image dimensions too large.")
+
+async def store_upload_image(user_id: int, content: memoryview) -> dict:
+    """
+    /upload/media and /upload/media-user: the processed, stored image for
+    an upload (file_key, width, height, blurhash, renditions, size_bytes).
+    If this user already uploaded these exact bytes, the earlier result is
+    reused and both the image job and the storage writes are skipped.
+    """
+    content_hash = await asyncio.to_thread(hash_content, content)
+    existing = await asyncio.to_thread(find_duplicate, user_id, content_hash)
+    if existing is not None:
+        logger_controller.info(f"Duplicate upload from user {user_id}, reusing {existing['file_key']}")
+        return existing
+
+    return await process_and_store_upload(user_id, content, content_hash, new_media_key(user_id))
+
+def new_media_key(user_id: int) -> str:
+    return f"sw/media/{user_id}/{uuid.uuid4()}.webp"
+
+def profile_picture_key(user_id: int, webp_content: bytes) -> str:
+    """
+    Versioned by content. Signed URLs stay byte-identical for a whole
+    SIGNED_URL_BUCKET_SECONDS window and are cached downstream, so a new
+    picture under the previous key would keep being served the old one.
+    """
+    return f"sw/profile_pictures/{user_id}/pfp-{hash_content(webp_content).hex()[:16]}.webp"
+
+async def process_and_store_upload(user_id: int, content: memoryview, content_hash: bytes, file_key: str) -> dict:
+    """The image job, storage writes and dedup index entry behind store_upload_image."""
+    webp_content, width, height, blurhash, renditions = await run_image_job(process_upload_image, content)
+
+    if len(webp_content) > MAX_FILE_SIZE_BYTES:
+        raise HTTPException(status_code=413, detail="Converted file too large.")
+
+    start_time = time.time()
+    _, rendition_sizes = await asyncio.gather(
+        upload_file_async_chat(webp_content, file_key),
+        upload_renditions(file_key, renditions),
+    )
+    logger_controller.info(f"Upload time for {file_key}: {time.time() - start_time:.2f} sec")
+
+    stored = {
+        "file_key": file_key,
+        "width": width,
+        "height": height,
+        "blurhash": blurhash,
+        "renditions": rendition_sizes,
+        "size_bytes": len(webp_content),
+    }
+    stored_bytes = len(webp_content) + sum(len(rendition) for rendition, _ in renditions.values())
+    await asyncio.to_thread(record_upload, user_id, content_hash, stored, stored_bytes)
+    await asyncio.to_thread(cache_blurhash, user_id, content_hash, blurhash)
+    return stored
+
+async def store_voice_note(user_id: int, content: memoryview) -> dict:
+    """
+    /upload/media with media_type=voice: the note transcoded to Opus in the
+    image pool (see process_voice_note) and stored. Nothing here decodes
+    the bytes as an image. Returns file_key, duration (seconds), waveform
+    and size_bytes.
+    """
+    try:
+        opus_content, duration, waveform = await run_image_job(process_voice_note, content)
+    except AudioTooLongError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidAudioError:
+        raise HTTPException(status_code=400, detail="Invalid audio file.")
+    except AudioUnavailableError as e:
+        logger_controller.error(f"Voice note processing unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Voice note processing is unavailable, try again shortly.")
+
+    file_key = f"sw/media/{user_id}/{uuid.uuid4()}.ogg"
+    await upload_file_async_chat(opus_content, file_key, content_type="audio/ogg")
+    return {
+        "file_key": file_key,
+        "duration": duration,
+        "waveform": waveform,
+        "size_bytes": len(opus_content),
+    }
+
+async def defer_upload_image(user_id: int, content: memoryview) -> dict:
+    """
+    deferred=true on /upload/media and /upload/media-user: queues the upload
+    (see MediaJobQueue) and returns straight away with the job id, the
+    file_key the image will be stored under and a provisional blurhash
+    (None unless the upload is a JPEG). The final metadata arrives as a
+    "media-job" event on /ws/connections, or from GET /upload/jobs/{job_id}.
+    A duplicate upload needs no job; it comes back with status "done".
+    """
+    content_hash = await asyncio.to_thread(hash_content, content)
+    existing = await asyncio.to_thread(find_duplicate, user_id, content_hash)
+    if existing is not None:
+        return {"status": "done", "job_id": None, **existing}
+
+    file_key = new_media_key(user_id)
+    blurhash = (
+        await asyncio.to_thread(get_cached_blurhash, user_id, content_hash)
+        or await asyncio.to_thread(provisional_blurhash, content)
+    )
+    try:
+        job_id = await media_jobs.submit(
+            "upload_image",
+            user_id,
+            content,
+            {"file_key": file_key, "content_hash": content_hash.hex()},
+        )
+    except MediaJobQueueFull:
+        raise HTTPException(status_code=503, detail="Upload queue is full, try again shortly.")
+
+    return {"status": "pending", "job_id": job_id, "file_key": file_key, "blurhash": blurhash}
+
+async def process_upload_job(job: dict, content: memoryview) -> dict:
+    params = job["params"]
+    stored = await process_and_store_upload(
+        job["user_id"], content, bytes.fromhex(params["content_hash"]), params["file_key"]
+    )
+    return {**stored, "file_url": build_signed_url(stored["file_key"], expire_seconds=600)}
+
+register_media_job_handler("upload_image", process_upload_job)
+
+def presigned_upload_key(user_id: int, upload_id: str) -> str:
+    """Where a direct upload lands: under the user's own media prefix, named by its upload id."""
+    return f"sw/media/{user_id}/raw/{upload_id}"
+
+async def process_presigned_image_job(job: dict, content: memoryview) -> dict:
+    stored = await store_upload_image(job["user_id"], content)
+    return {**stored, "file_url": build_signed_url(stored["file_key"], expire_seconds=600)}
+
+async def process_presigned_voice_job(job: dict, content: memoryview) -> dict:
+    stored = await store_voice_note(job["user_id"], content)
+    return {**stored, "format": "opus", "file_url": build_signed_url(stored["file_key"], expire_seconds=600)}
+
+register_media_job_handler("presigned_image", process_presigned_image_job)
+register_media_job_handler("presigned_voice", process_presigned_voice_job)
 
 
 @common_router.post("/media")
@@ -101,40 +218,57 @@ async def upload_media(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     media_type: MediaTypeEnum = Form(...),
+    deferred: bool = Form(False),
     token: str = Depends(oauth2_scheme),
 ):
     try:
         user_id = decode_token(token)
-        content = await file.read()
-
-        if len(content) > MAX_FILE_SIZE_BYTES:
-            raise HTTPException(status_code=413, detail=f"File too large. Max {MAX_FILE_SIZE_MB}MB")
-
-        loop = asyncio.get_event_loop()
-        webp_content, width, height = await loop.run_in_executor(None, process_image_half_and_convert_webp, content)
-
-        if len(webp_content) > MAX_FILE_SIZE_BYTES:
-            raise HTTPException(status_code=413, detail="Converted file too large.")
-
-        file_key = f"sw/media/{user_id}/{uuid.uuid4()}.webp"
-        blurhash = generate_blurhash(webp_content)
-
-        start_time = time.time()
-        await upload_file_async_chat(webp_content, file_key)
-        logger_controller.info(f"Upload time for {file_key}: {time.time() - start_time:.2f} sec")
-
-        signed_url = build_signed_url(file_key, expire_seconds=600)
+        content = await read_upload_file(file)
+
+        if media_type == MediaTypeEnum.VOICE:
+            # Quick enough to answer inline, deferred or not
+            stored = await store_voice_note(user_id, content)
+            # This metadata is what the chat message carries into media_files.metadata
+            return {
+                "file_key": stored["file_key"],
+                "media_type": media_type,
+                "metadata": {
+                    "file_url": build_signed_url(stored["file_key"], expire_seconds=600),
+                    "format": "opus",
+                    "duration": stored["duration"],
+                    "waveform": stored["waveform"],
+                    "size_bytes": stored["size_bytes"],
+                },
+            }
+
+        if deferred:
+            queued = await defer_upload_image(user_id, content)
+            if queued["status"] == "pending":
+                return {
+                    "file_key": queued["file_key"],
+                    "media_type": media_type,
+                    "job_id": queued["job_id"],
+                    "status": "pending",
+                    "metadata": {"blurhash": queued["blurhash"], "format": "webp"},
+                }
+            stored = queued
+        else:
+            stored = await store_upload_image(user_id, content)
+
+        signed_url = build_signed_url(stored["file_key"], expire_seconds=600)
 
         return {
-            "file_key": file_key,
+            "file_key": stored["file_key"],
             "media_type": media_type,
+            **({"job_id": None, "status": "done"} if deferred else {}),
             "metadata": {
                 "file_url": signed_url,
-                "width": float(width),
-                "height": float(height),
-                "blurhash": blurhash,
+                "width": float(stored["width"]),
+                "height": float(stored["height"]),
+                "blurhash": stored["blurhash"],
                 "format": "webp",
-                "size_bytes": len(webp_content),
+                "size_bytes": stored["size_bytes"],
+                "renditions": stored["renditions"],
             },
         }
 
@@ -149,34 +283,38 @@ async def upload_media(
 async def upload_media_user(
     file: UploadFile = File(...),
     media_type: MediaTypeEnum = Form(...),
+    deferred: bool = Form(False),
     token: str = Depends(oauth2_scheme),
 ):
     try:
         user_id = decode_token(token)
-        content = await file.read()
+        content = await read_upload_file(file)
         try:
             Image.open(BytesIO(content)).verify()
         except Exception:
             raise HTTPException(status_code=400, detail="Invalid image file.")
-        
-        loop = asyncio.get_event_loop()
-        temp_file_path, webp_content, width, height = await loop.run_in_executor(None, process_image_to_webp_file, content)
-
-        if len(webp_content) > MAX_FILE_SIZE_BYTES:
-            raise HTTPException(status_code=413, detail="Converted file too large.")
 
-        blurhash = generate_blurhash(webp_content)
-
-        file_key = f"sw/media/{user_id}/{uuid.uuid4()}.webp"
-        start_time = time.time()
-        file_key_remote, signed_url = await upload_file_async_user(temp_file_path, file_key)
-        logger_controller.info(f"Upload time for {file_key}: {time.time() - start_time:.2f}s")
+        if deferred:
+            queued = await defer_upload_image(user_id, content)
+            return {
+                "media_type": media_type,
+                "job_id": queued["job_id"],
+                "status": queued["status"],
+                "metadata": {
+                    "file_key": queued["file_key"],
+                    "blurhash": queued["blurhash"],
+                    "renditions": queued.get("renditions", {}),
+                },
+            }
+
+        stored = await store_upload_image(user_id, content)
 
         return {
             "media_type": media_type,
             "metadata": {
-                "file_key": file_key_remote, 
-                "blurhash" : blurhash,
+                "file_key": stored["file_key"], 
+                "blurhash" : stored["blurhash"],
+                "renditions": stored["renditions"],
             },
         }
 
@@ -190,60 +328,52 @@ async def upload_media_user(
 
 @common_router.post("/media-user-pfp")
 async def generate_profile_picture(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     media_type: MediaTypeEnum = Form(...),
     token: str = Depends(oauth2_scheme),
 ):
     try:
         user_id = decode_token(token)
-        content = await file.read()
+        content = await read_upload_file(file)
+
+        # The original's blurhash is skipped when these bytes were hashed before
+        content_hash = await asyncio.to_thread(hash_content, content)
+        cached_blurhash = await asyncio.to_thread(get_cached_blurhash, user_id, content_hash)
 
-        # Validate image
+        # Decode once: validation, face crop, webp and both blurhashes
         try:
-            Image.open(BytesIO(content)).verify()
-        except Exception:
+            processed = await run_image_job(process_profile_picture, content, cached_blurhash is None)
+        except InvalidImageError:
             raise HTTPException(status_code=400, detail="Invalid image file.")
 
-        # Save original image to temp file
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as temp_input_file:
-            temp_input_file.write(content)
-            input_path = temp_input_file.name
-
-        # Upload original image
-        original_file_key = f"sw/media/{user_id}/{uuid.uuid4()}.jpg"
-        original_file_key_remote, original_signed_url = await upload_file_async_user(input_path, original_file_key)
-
-        # Temp file for cropped face
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as temp_face_file:
-            face_path = temp_face_file.name
-
-        if not extract_face(input_path, face_path):
+        if processed is None:
             raise HTTPException(status_code=422, detail="No face detected in the image.")
 
-        # Read cropped face image bytes
-        with open(face_path, "rb") as f:
-            face_bytes = f.read()
-
-        # Convert face image to webp
-        loop = asyncio.get_event_loop()
-        temp_file_path, webp_content, width, height = await loop.run_in_executor(
-            None, process_image_to_webp_file, face_bytes
-        )
+        webp_content, width, height, blurhash_pfp, blurhash_original_image, renditions = processed
+        if cached_blurhash is None:
+            await asyncio.to_thread(cache_blurhash, user_id, content_hash, blurhash_original_image)
+        else:
+            blurhash_original_image = cached_blurhash
 
         if len(webp_content) > MAX_FILE_SIZE_BYTES:
             raise HTTPException(status_code=413, detail="Converted file too large.")
 
-        # Upload profile picture (webp)
-        profile_file_key = f"sw/profile_pictures/{user_id}/pfp.webp"
-        blurhash_pfp = generate_blurhash(webp_content)
-        blurhash_original_image = generate_blurhash(content)
+        # Upload original image and profile picture (webp)
+        original_file_key = f"sw/media/{user_id}/{uuid.uuid4()}.jpg"
+        profile_file_key = profile_picture_key(user_id, webp_content)
 
         start_time = time.time()
-        profile_file_key_remote, profile_signed_url = await upload_file_async_user(temp_file_path, profile_file_key)
+        (original_file_key_remote, original_signed_url), (profile_file_key_remote, profile_signed_url), rendition_sizes = await asyncio.gather(
+            upload_file_async_user(content, original_file_key, content_type=file.content_type),
+            upload_file_async_user(webp_content, profile_file_key),
+            upload_renditions(profile_file_key, renditions),
+        )
         logger_controller.info(f"PFP Upload time for {profile_file_key}: {time.time() - start_time:.2f}s")
+        background_tasks.add_task(delete_replaced_profile_picture, user_id, profile_file_key)
 
         return {
-            "profile_metadata" : {"file_key": profile_file_key_remote, "blurhash" : blurhash_pfp},
+            "profile_metadata" : {"file_key": profile_file_key_remote, "blurhash" : blurhash_pfp, "renditions": rendition_sizes},
             "original_image_metadata" : {"file_key": original_file_key_remote, "blurhash" : blurhash_original_image},
 
             "original_image_url": original_signed_url,
@@ -259,6 +389,7 @@ async def generate_profile_picture(
 
 @common_router.post("/media-user-pfp-from-url")
 async def generate_profile_picture_from_url(
+    background_tasks: BackgroundTasks,
     image_url: str = Form(...),
     token: str = Depends(oauth2_scheme),
 ):
@@ -266,55 +397,41 @@ async def generate_profile_picture_from_url(
         user_id = decode_token(token)
 
         # Download image from URL
-        response = requests.get(image_url)
-        if response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Unable to fetch image from URL")
-
-        content = response.content
+        try:
+            content = await fetch_remote_image(image_url)
+        except RemoteFetchError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-        # Validate image
+        # Decode once: validation, face crop, webp and blurhash
         try:
-            Image.open(BytesIO(content)).verify()
-        except Exception:
+            processed = await run_image_job(process_profile_picture, content, False)
+        except InvalidImageError:
             raise HTTPException(status_code=400, detail="Invalid image file.")
 
-        # Save original image to temp file
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as temp_input_file:
-            temp_input_file.write(content)
-            input_path = temp_input_file.name
-
-        # Temp file for cropped face
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as temp_face_file:
-            face_path = temp_face_file.name
-
-        if not extract_face(input_path, face_path):
+        if processed is None:
             raise HTTPException(status_code=422, detail="No face detected in the image.")
 
-        # Read cropped face image bytes
-        with open(face_path, "rb") as f:
-            face_bytes = f.read()
-
-        # Convert face image to webp
-        loop = asyncio.get_event_loop()
-        temp_file_path, webp_content, width, height = await loop.run_in_executor(
-            None, process_image_to_webp_file, face_bytes
-        )
+        webp_content, width, height, blurhash_pfp, _, renditions = processed
 
         if len(webp_content) > MAX_FILE_SIZE_BYTES:
             raise HTTPException(status_code=413, detail="Converted file too large.")
 
         # Upload profile picture (webp)
-        profile_file_key = f"sw/profile_pictures/{user_id}/pfp.webp"
-        blurhash_pfp = generate_blurhash(webp_content)
+        profile_file_key = profile_picture_key(user_id, webp_content)
 
         start_time = time.time()
-        profile_file_key_remote, profile_signed_url = await upload_file_async_user(temp_file_path, profile_file_key)
+        (profile_file_key_remote, profile_signed_url), rendition_sizes = await asyncio.gather(
+            upload_file_async_user(webp_content, profile_file_key),
+            upload_renditions(profile_file_key, renditions),
+        )
         logger_controller.info(f"PFP Upload time from URL for {profile_file_key}: {time.time() - start_time:.2f}s")
+        background_tasks.add_task(delete_replaced_profile_picture, user_id, profile_file_key)
 
         return {
             "profile_metadata": {
                 "file_key": profile_file_key_remote,
                 "blurhash": blurhash_pfp,
+                "renditions": rendition_sizes,
             },
             "profile_picture_url": profile_signed_url,
         }
@@ -324,4 +441,110 @@ async def generate_profile_picture_from_url(
         raise
     except Exception as e:
         logger_controller.warning(f"Unhandled PFP upload from URL error: {e}")
-        raise HTTPException(status_code=500, detail="Something went wrong while processing the image URL.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Something went wrong while processing the image URL.")
+
+
+@common_router.get("/jobs/{job_id}")
+async def get_upload_job(job_id: str, token: str = Depends(oauth2_scheme)):
+    """Status of a deferred upload, for clients that missed its /ws/connections event."""
+    user_id = decode_token(token)
+    try:
+        uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Upload job not found.")
+
+    job = await asyncio.to_thread(get_job, job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Upload job not found.")
+    return with_fresh_file_url(job)
+
+def with_fresh_file_url(job: dict) -> dict:
+    if job["status"] == "done":
+        # The URL recorded with the result has long expired by now
+        job["result"]["file_url"] = build_signed_url(job["result"]["file_key"], expire_seconds=600)
+    return job
+
+
+@common_router.post("/presign")
+async def presign_upload(
+    media_type: MediaTypeEnum = Form(...),
+    content_type: str = Form(...),
+    size_bytes: int = Form(...),
+    token: str = Depends(oauth2_scheme),
+):
+    """
+    Direct-to-storage upload, step 1: a presigned PUT URL for exactly
+    `size_bytes` of `content_type`, under sw/media/<user_id>/. The bytes
+    go straight to the S3 endpoint instead of through this server; then
+    POST /upload/presign/{upload_id}/complete.
+    """
+    user_id = decode_token(token)
+
+    if not 0 < size_bytes <= MAX_FILE_SIZE_BYTES:
+        raise HTTPException(status_code=413, detail=f"File too large. Max {MAX_FILE_SIZE_MB}MB")
+    expected_type = "audio/" if media_type == MediaTypeEnum.VOICE else "image/"
+    if not content_type.startswith(expected_type):
+        raise HTTPException(status_code=400, detail=f"Content type must be {expected_type}*")
+
+    upload_id = str(uuid.uuid4())
+    try:
+        upload_url, headers = await get_storage().presign_put(
+            presigned_upload_key(user_id, upload_id), content_type, size_bytes, PRESIGNED_UPLOAD_EXPIRY_SECONDS
+        )
+    except StorageError as e:
+        logger_controller.warning(f"Presigned upload unavailable: {e}")
+        raise HTTPException(status_code=501, detail="Direct uploads are not available.")
+
+    return {
+        "upload_id": upload_id,
+        "upload_url": upload_url,
+        "method": "PUT",
+        "headers": headers,
+        "expires_in": PRESIGNED_UPLOAD_EXPIRY_SECONDS,
+    }
+
+
+@common_router.post("/presign/{upload_id}/complete")
+async def complete_presigned_upload(
+    upload_id: str,
+    media_type: MediaTypeEnum = Form(...),
+    token: str = Depends(oauth2_scheme),
+):
+    """
+    Direct-to-storage upload, step 2, once the PUT has succeeded: queues the
+    uploaded object for the usual processing (see MediaJobQueue). The job id
+    is the upload id; the result arrives as a "media-job" event on
+    /ws/connections or from GET /upload/jobs/{job_id}. Completing the same
+    upload again doesn't queue it twice: it answers with the job as it
+    stands, even once processing has deleted the uploaded object.
+    """
+    user_id = decode_token(token)
+    try:
+        uuid.UUID(upload_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Upload not found.")
+
+    job = await asyncio.to_thread(get_job, upload_id, user_id)
+    if job is not None:
+        return with_fresh_file_url(job)
+
+    raw_key = presigned_upload_key(user_id, upload_id)
+    storage = get_storage()
+    size = await storage.size(raw_key)
+    if size is None:
+        raise HTTPException(status_code=404, detail="Upload not found.")
+    if size > MAX_FILE_SIZE_BYTES:
+        await storage.delete(raw_key)
+        raise HTTPException(status_code=413, detail=f"File too large. Max {MAX_FILE_SIZE_MB}MB")
+
+    kind = "presigned_voice" if media_type == MediaTypeEnum.VOICE else "presigned_image"
+    try:
+        queued = await media_jobs.submit_stored(upload_id, kind, user_id, raw_key, {})
+    except MediaJobQueueFull:
+        raise HTTPException(status_code=503, detail="Upload queue is full, try again shortly.")
+
+    if not queued:
+        # A concurrent completion got there first
+        job = await asyncio.to_thread(get_job, upload_id, user_id)
+        return with_fresh_file_url(job) if job else {"job_id": upload_id, "status": "pending"}
+    return {"job_id": upload_id, "status": "pending", "result": None, "error": None}
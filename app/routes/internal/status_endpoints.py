@@ -3,9 +3,13 @@ import time
 
 from fastapi import APIRouter, Header, HTTPException
 
-from app.constants.global_constants import STATUS_PAGE_TOKEN
+from app.constants.global_constants import STATUS_PAGE_TOKEN, STORAGE_BACKEND
+from app.controllers.client_controller import clients_health
 from app.controllers.db_controller import db_pool
 from app.controllers.redis_controller import redis_client
+from app.controllers.storage_controller import get_storage
+from app.utilities.media.media_dedup_utilities import dedup_stats
+from app.utilities.media.media_job_utilities import media_jobs
 
 status_router = APIRouter()
 
@@ -17,8 +21,9 @@ _STARTED_AT = time.time()
 
 
 def _check_database() -> str:
-    conn = db_pool.getconn()
+    conn = None
     try:
+        conn = db_pool.getconn()
         cursor = conn.cursor()
         cursor.execute("SELECT 1;")
         cursor.close()
@@ -26,7 +31,8 @@ def _check_database() -> str:
     except Exception:
         return "error"
     finally:
-        db_pool.putconn(conn)
+        if conn is not None:
+            db_pool.putconn(conn)
 
 
 def _check_redis() -> str:
@@ -56,5 +62,9 @@ async def get_status(x_status_token: str = Header(default=None)):
         "uptime_seconds": int(time.time() - _STARTED_AT),
         "database": _check_database(),
         "redis": _check_redis(),
+        "clients": clients_health(),
+        "media_dedup": dedup_stats.snapshot(),
+        "media_jobs": {"in_flight": media_jobs.in_flight},
+        "storage": {"backend": STORAGE_BACKEND, "latency": get_storage().metrics.snapshot()},
         "recent_logs": _tail_log(LOG_FILE_PATH, LOG_TAIL_LINES),
     }
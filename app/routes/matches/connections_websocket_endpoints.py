@@ -6,12 +6,13 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
 
 from app.utilities.token.token_utilities import decode_token
 from app.controllers.logger_controller import logger_controller
+from app.utilities.websocket.websocket_utilities import ConnectionSender
 
 # Step 1: Create the router with /ws prefix
 connectionsocket_router = APIRouter(prefix="/ws")
 
 # Step 2: Maintain active WebSocket connections by user ID
-active_connections_connections: Dict[int, WebSocket] = {}
+active_connections_connections: Dict[int, ConnectionSender] = {}
 
 # Step 3: Define the data model for sending messages to users
 class DataModel(BaseModel):
@@ -23,14 +24,13 @@ class DataModel(BaseModel):
 
 # Step 4: Function to push events to a specific user's active socket
 async def send_event_to_user_connection(event: DataModel):
-    websocket = active_connections_connections.get(event.to)
-    if websocket:
-        try:
-            data_json = event.model_dump_json()
-            await websocket.send_text(data_json)
-            logger_controller.info(f"Sent event to user {event.to}: {data_json}")
-        except Exception as e:
-            print(f"Error sending event to user {event.to}: {e}")
+    sender = active_connections_connections.get(event.to)
+    if sender:
+        data_json = event.model_dump_json()
+        if sender.enqueue_text(data_json):
+            logger_controller.info(f"Queued event for user {event.to}: {data_json}")
+        else:
+            logger_controller.warning(f"Dropped event for user {event.to}, connection closed or backed up.")
     else:
         print(f"No active connection for user {event.to}.")
 
@@ -57,12 +57,13 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
 
     # Step 5.4: Accept the WebSocket connection
     await websocket.accept()
-    active_connections_connections[user_id] = websocket
+    sender = ConnectionSender(websocket)
+    active_connections_connections[user_id] = sender
 
     logger_controller.info(f"User {user_id} ({websocket.client.host}) connected to connections websocket.")
 
     # Step 5.5: Notify the client that connection is established
-    await websocket.send_text(json.dumps({"message": "Connected to connections websocket."}))
+    sender.enqueue_json({"message": "Connected to connections websocket."})
 
     try:
         # Step 5.6: Listen for messages in a loop
@@ -71,5 +72,9 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
             data: Dict = json.loads(raw_data)
     except WebSocketDisconnect:
         # Step 5.7: Handle disconnection
-        active_connections_connections.pop(user_id, None)
         logger_controller.info(f"User {user_id} disconnected from connections websocket.")
+    finally:
+        # Step 5.8: Release the writer, unless a reconnect already replaced it
+        if active_connections_connections.get(user_id) is sender:
+            active_connections_connections.pop(user_id, None)
+        sender.stop()
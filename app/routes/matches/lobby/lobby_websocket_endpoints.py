@@ -11,6 +11,7 @@ from app.controllers.db_controller import db_pool
 from app.models.connection_user_model import ConnectionMatchModel
 from app.utilities.token.token_utilities import decode_token
 from app.controllers.logger_controller import logger_controller 
+from app.utilities.websocket.websocket_utilities import ConnectionSender
 
 # Event tracking flags 
 event_active = False
@@ -18,7 +19,7 @@ event_end_time: datetime | None = None
  
 # WebSocket router and connection store
 lobbysocket_router = APIRouter(prefix="/ws")
-active_connections: Dict[int, WebSocket] = {}
+active_connections: Dict[int, ConnectionSender] = {}
 
 # Retrieves users currently in the lobby and attempts matchmaking
 async def get_lobby_users() -> Dict:
@@ -133,13 +134,13 @@ async def send_event_to_user(
 
     # Notify users who were not matched
     for uid in not_matched:
-        ws = active_connections.get(uid)
-        if ws:
-            await ws.send_text(json.dumps({
+        sender = active_connections.get(uid)
+        if sender:
+            sender.enqueue_json({
                 "type": "lobby",
                 "event": "match-event",
                 "matched": False,
-            }))
+            })
             logger_controller.info(f"Sent not-matched event to user: {uid}")
 
     # Construct user detail model for matched users
@@ -152,10 +153,10 @@ async def send_event_to_user(
 
     # Notify matched users and save match in DB
     for uid_1, uid_2 in matches:
-        uid1_ws: WebSocket = active_connections.get(user_details[uid_1].id)
-        uid2_ws: WebSocket = active_connections.get(user_details[uid_2].id)
+        uid1_sender: ConnectionSender = active_connections.get(user_details[uid_1].id)
+        uid2_sender: ConnectionSender = active_connections.get(user_details[uid_2].id)
 
-        if uid1_ws and uid2_ws:
+        if uid1_sender and uid2_sender:
             # Insert new match record
             cursor.execute("""
                 INSERT INTO matches (user1_id, user2_id)
@@ -180,8 +181,8 @@ async def send_event_to_user(
                 "candidate": json.loads(user_details[uid_1].model_dump_json())
             }
 
-            await uid1_ws.send_text(json.dumps(data_1))
-            await uid2_ws.send_text(json.dumps(data_2))
+            uid1_sender.enqueue_json(data_1)
+            uid2_sender.enqueue_json(data_2)
 
             logger_controller.info(f"Sent matched event to users: {uid_1}, {uid_2}")
 
@@ -193,9 +194,10 @@ async def start_waiting_period():
     event_active = True
     event_end_time = datetime.now() + timedelta(minutes=5)
 
-    # Notify all users that event has started
-    for _, ws in active_connections.items():
-        await ws.send_json({
+    # Notify all users that event has started (queued per connection, so one
+    # slow client can't hold up the broadcast)
+    for _, sender in active_connections.items():
+        sender.enqueue_json({
             "type": "lobby",
             "event": "event-start"
         })
@@ -227,14 +229,15 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
     user_id: int = decode_token(token)
 
     await websocket.accept()
-    active_connections[user_id] = websocket
+    sender = ConnectionSender(websocket)
+    active_connections[user_id] = sender
 
     logger_controller.info(f"User {user_id} ({websocket.client.host}) connected to lobby websocket.")
 
-    await websocket.send_text(json.dumps({"message": "Connected to lobby websocket."}))
+    sender.enqueue_json({"message": "Connected to lobby websocket."})
 
     # Send current event status
-    await websocket.send_json({
+    sender.enqueue_json({
         "type": "lobby",
         "event": "event-start" if event_active else "event-end"
     })
@@ -245,5 +248,8 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
             raw_data: str = await websocket.receive_text()
             data: Dict = json.loads(raw_data)
     except WebSocketDisconnect:
-        active_connections.pop(user_id, None)
-        logger_controller.info(f"User {user_id} disconnected from lobby websocket.")
\ No newline at end of file
+        logger_controller.info(f"User {user_id} disconnected from lobby websocket.")
+    finally:
+        if active_connections.get(user_id) is sender:
+            active_connections.pop(user_id, None)
+        sender.stop()
\ No newline at end of file
@@ -9,7 +9,7 @@ from app.controllers.logger_controller import logger_controller
 from app.constants.global_constants import oauth2_scheme
 
 from app.models.connection_user_model import ConnectionChatModel, ConnectionMatchModel
-from app.utilities.common.common_utilites import get_signed_imagekit
+from app.utilities.common.common_utilites import THUMB_DISPLAY_SIZE, get_signed_imagekit_batch
 from app.utilities.exception.swipe.swipe_exceptions import handle_db_errors
 from app.utilities.matches.matches_utilities import get_last_message_timestamp, get_matches
 from app.utilities.token.token_utilities import decode_token
@@ -124,14 +124,20 @@ async def return_connections(token: str = Depends(oauth2_scheme)):
         matches_users = []
         chats_users = []
 
+        # Handle potentially NULL profile picture for deleted users, and sign
+        # every picture in the list in one pass
+        profile_pictures = {
+            user_row[0]: json.loads(user_row[2])
+            for user_row in user_rows
+            if user_row[2]
+        }
+        get_signed_imagekit_batch(list(profile_pictures.values()), size=THUMB_DISPLAY_SIZE)
+
         for user_row in user_rows:
             # CHANGE: Unpack 6 values instead of 5
             id, username, profile_picture, gender, university_id, is_deleted = user_row
-            
-            # Handle potentially NULL profile picture for deleted users
-            profile_picture_dict = json.loads(profile_picture) if profile_picture else None
-            if profile_picture_dict:
-                profile_picture_dict = get_signed_imagekit(profile_picture_dict)
+
+            profile_picture_dict = profile_pictures.get(id)
 
             if id in matches:
                 matches_users.append(
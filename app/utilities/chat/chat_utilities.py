@@ -1,10 +1,15 @@
 import asyncio
+import base64
 import json
+import re
+import secrets
 from app.models.messages.message_model import ChatMessage, MediaMessageData
+from app.constants.global_constants import SYNC_CURSOR_TTL_SECONDS
 from app.controllers.db_controller import db_pool
+from app.controllers.redis_controller import redis_client
 from psycopg2.extras import Json
 
-from app.utilities.media.media_utilities import generate_signed_url
+from app.utilities.media.media_utilities import generate_signed_url, generate_signed_urls
 
 def add_to_unseen_and_last_message(
         receiver_id: int, 
@@ -67,11 +72,11 @@ def insert_message_to_db(message: ChatMessage):
                 """
                 INSERT INTO messages (id, chat_id, sender_id, message, reply_id, timestamp)
                 VALUES (%s, %s, %s, %s, %s, NOW())
-                RETURNING id
+                RETURNING id, seq
                 """,
                 (message.message_id, message.chat_room_id, message.from_, message.message, message.reply_id)
             )
-            inserted_id = cur.fetchone()[0]
+            inserted_id, message.seq = cur.fetchone()  # seq comes from trg_messages_assign_seq
 
             # If media exists, insert it too
             if message.media:
@@ -99,11 +104,10 @@ async def generate_signed_url_async(file_key: str) -> str:
     loop = asyncio.get_running_loop()
     return await loop.run_in_executor(None, generate_signed_url, file_key)
 
-async def process_msg(msg):
+def build_chat_message(msg, signed_url: str | None) -> ChatMessage:
     metadata = json.loads(msg['metadata']) if msg['metadata'] else {}
     media_data = None
     if msg['file_key'] and msg['media_type']:
-        signed_url = await generate_signed_url_async(msg['file_key'])
         metadata["file_url"] = signed_url
         media_data = MediaMessageData(
             file_key=msg['file_key'],
@@ -121,6 +125,94 @@ async def process_msg(msg):
         chat_room_id=msg['chat_id'],
         message=msg['message'],
         timestamp=msg['timestamp'],
+        seq=msg.get('seq'),
         is_seen=msg['is_seen'],
         media=media_data,
-    )
\ No newline at end of file
+    )
+
+async def process_msg(msg):
+    signed_url = None
+    if msg['file_key'] and msg['media_type']:
+        signed_url = await generate_signed_url_async(msg['file_key'])
+    return build_chat_message(msg, signed_url)
+
+async def process_msgs(msgs) -> list[ChatMessage]:
+    """
+    Builds a whole page of messages with one batch signing pass. Pure-HMAC
+    sw/ keys are signed inline; the executor is only used when legacy B2
+    keys need a (per-prefix) remote authorization.
+    """
+    file_keys = {msg['file_key'] for msg in msgs if msg['file_key'] and msg['media_type']}
+
+    signed_urls = {}
+    if any(not file_key.startswith("sw/") for file_key in file_keys):
+        loop = asyncio.get_running_loop()
+        signed_urls = await loop.run_in_executor(None, generate_signed_urls, file_keys)
+    elif file_keys:
+        signed_urls = generate_signed_urls(file_keys)
+
+    return [build_chat_message(msg, signed_urls.get(msg['file_key'])) for msg in msgs]
+
+def encode_message_cursor(seq: int) -> str:
+    """
+    Opaque keyset cursor for chat history paging - clients hand it back
+    as-is, so the underlying sort key can change without breaking them.
+    """
+    payload = json.dumps({"seq": seq}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).rstrip(b"=").decode()
+
+def decode_message_cursor(cursor: str) -> int:
+    """Raises ValueError on anything that isn't a cursor we issued."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        seq = json.loads(base64.urlsafe_b64decode(padded.encode()))["seq"]
+    except Exception as e:
+        raise ValueError(f"Invalid message cursor: {cursor!r}") from e
+    if not isinstance(seq, int) or isinstance(seq, bool) or seq < 1:
+        raise ValueError(f"Invalid message cursor: {cursor!r}")
+    return seq
+
+_SYNC_CURSOR_RE = re.compile(r"[A-Za-z0-9_-]{22}")
+
+def encode_sync_state(chat_state: dict[int, tuple[int, int, int]]) -> str:
+    """
+    chat_state: chat_id -> (last message seq, peer seen seq, own seen seq)
+    as of this sync. Per-chat seqs are committed in order (they're assigned
+    under the chat row lock), so resuming from them can't skip a message
+    the way a global timestamp or counter could.
+    """
+    return json.dumps({"c": {str(chat_id): list(state) for chat_id, state in chat_state.items()}}, separators=(",", ":"))
+
+def decode_sync_state(payload: str | bytes) -> dict[int, tuple[int, int, int]]:
+    """Raises ValueError on anything encode_sync_state didn't produce."""
+    try:
+        chats = json.loads(payload)["c"]
+        chat_state = {int(chat_id): tuple(int(v) for v in state) for chat_id, state in chats.items()}
+    except Exception as e:
+        raise ValueError("Invalid sync state") from e
+    if any(len(state) != 3 for state in chat_state.values()):
+        raise ValueError("Invalid sync state")
+    return chat_state
+
+def _sync_state_key(user_id: int, cursor: str) -> str:
+    return f"chat-sync:{user_id}:{cursor}"
+
+def save_sync_state(user_id: int, chat_state: dict[int, tuple[int, int, int]]) -> str:
+    """
+    Stores the user's sync state server-side and returns the opaque cursor
+    for it. The state has an entry per chat, so a cursor carrying it would
+    grow with the user's chat count; this one is a fixed 22 characters.
+    """
+    cursor = secrets.token_urlsafe(16)
+    redis_client.setex(_sync_state_key(user_id, cursor), SYNC_CURSOR_TTL_SECONDS, encode_sync_state(chat_state))
+    return cursor
+
+def load_sync_state(user_id: int, cursor: str) -> dict[int, tuple[int, int, int]] | None:
+    """
+    The state saved under `cursor` for this user, or None once it has
+    expired. Raises ValueError on anything that isn't a cursor we issued.
+    """
+    if not _SYNC_CURSOR_RE.fullmatch(cursor):
+        raise ValueError(f"Invalid sync cursor: {cursor!r}")
+    stored = redis_client.get(_sync_state_key(user_id, cursor))
+    return decode_sync_state(stored) if stored is not None else None
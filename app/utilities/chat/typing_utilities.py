@@ -0,0 +1,86 @@
+import time
+from typing import Callable, Dict, Tuple
+
+from app.constants.global_constants import TYPING_IDLE_SECONDS, TYPING_MIN_INTERVAL_SECONDS
+
+
+class TypingAggregator:
+    """
+    Collapses bursts of typing events per (chat_room_id, from_) into a small
+    start/stop state machine:
+
+    - idle -> typing: the first event is forwarded straight away.
+    - typing: repeats are swallowed, except one keep-alive every
+      `min_interval` so the receiver's indicator doesn't time out.
+    - typing -> idle: after `idle_timeout` with no events, or as soon as the
+      sender actually posts a message in that chat.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = TYPING_MIN_INTERVAL_SECONDS,
+        idle_timeout: float = TYPING_IDLE_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_interval = min_interval
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+
+        # (chat_room_id, from_) -> (last_forwarded_at, last_seen_at)
+        self._state: Dict[Tuple[int, int], Tuple[float, float]] = {}
+        self._last_sweep = clock()
+
+        self.forwarded = 0
+        self.suppressed = 0
+
+    def should_forward(self, chat_room_id: int, from_: int) -> bool:
+        now = self._clock()
+        self._sweep(now)
+
+        key = (chat_room_id, from_)
+        state = self._state.get(key)
+
+        if state is None or now - state[1] >= self.idle_timeout:
+            self._state[key] = (now, now)
+            self.forwarded += 1
+            return True
+
+        last_forwarded, _ = state
+        if now - last_forwarded >= self.min_interval:
+            self._state[key] = (now, now)
+            self.forwarded += 1
+            return True
+
+        self._state[key] = (last_forwarded, now)
+        self.suppressed += 1
+        return False
+
+    def stop(self, chat_room_id: int, from_: int) -> None:
+        self._state.pop((chat_room_id, from_), None)
+
+    def _sweep(self, now: float) -> None:
+        # Drop idle entries every so often so the map only holds people
+        # who are actually typing right now.
+        if now - self._last_sweep < self.idle_timeout:
+            return
+        self._last_sweep = now
+        for key in [k for k, (_, seen) in self._state.items() if now - seen >= self.idle_timeout]:
+            del self._state[key]
+
+
+def typing_chat_room_id(data) -> int | None:
+    """
+    The chat_room_id of a raw (not yet validated) typing event, or None if
+    `data` isn't one or the id isn't an int / digit string - those go
+    through validation, which rejects them, without touching the throttle.
+    """
+    if not isinstance(data, dict) or data.get("chats_type") != "typing":
+        return None
+    chat_room_id = data.get("chat_room_id")
+    if isinstance(chat_room_id, bool):
+        return None
+    if isinstance(chat_room_id, int):
+        return chat_room_id
+    if isinstance(chat_room_id, str) and chat_room_id.isascii() and chat_room_id.isdigit():
+        return int(chat_room_id)
+    return None
@@ -1,16 +1,53 @@
+import time
+from functools import lru_cache
+
+from app.constants.global_constants import SIGNED_URL_CACHE_SIZE
 from app.controllers.imagekit_controller import imagekit
-from app.utilities.media.imgproxy_utilities import build_signed_url
+from app.utilities.media.imgproxy_utilities import best_fit_key, build_signed_url, build_signed_urls, bucketed_expiry
+
+# Longest side (px) images are displayed at, for picking a rendition
+THUMB_DISPLAY_SIZE = 160
+CARD_DISPLAY_SIZE = 640
+
+@lru_cache(maxsize=SIGNED_URL_CACHE_SIZE)
+def _signed_imagekit_url(file_key: str, expires_at: int) -> str:
+    # ImageKit only takes a relative expiry; memoizing per bucket is what
+    # keeps the URL identical for the rest of the bucket.
+    return imagekit.url({
+        "path": file_key,
+        "signed": True,
+        "expire_seconds": max(1, expires_at - int(time.time()))
+    })
 
-def get_signed_imagekit(image_metadata : dict, expire_seconds : int = 7200):
+def get_signed_imagekit(image_metadata : dict, expire_seconds : int = 7200, size : int | None = None):
+    """
+    Signs image_metadata['file_key'] into image_metadata['url']. With `size`,
+    sw/ images get the best-fit rendition listed in the metadata instead
+    of the full image.
+    """
     file_key = image_metadata['file_key']
 
     if file_key.startswith("sw/"):
+        file_key = best_fit_key(file_key, size, image_metadata.get('renditions'))
         image_metadata['url'] = build_signed_url(file_key, expire_seconds=expire_seconds)
         return image_metadata
 
-    image_metadata['url'] = imagekit.url({
-        "path": file_key,
-        "signed": True,
-        "expire_seconds": expire_seconds
-    })
-    return image_metadata
\ No newline at end of file
+    image_metadata['url'] = _signed_imagekit_url(file_key, bucketed_expiry(expire_seconds))
+    return image_metadata
+
+def get_signed_imagekit_batch(images : list[dict], expire_seconds : int = 7200, size : int | None = None) -> list[dict]:
+    """
+    get_signed_imagekit for every image in a response (deck card, profile,
+    connections list) against one expiry bucket, with sw/ keys signed in a
+    single pass.
+    """
+    sw_keys = [
+        best_fit_key(image['file_key'], size, image.get('renditions')) if image['file_key'].startswith("sw/") else None
+        for image in images
+    ]
+    sw_urls = build_signed_urls({file_key for file_key in sw_keys if file_key}, expire_seconds=expire_seconds)
+    expires_at = bucketed_expiry(expire_seconds)
+
+    for image, sw_key in zip(images, sw_keys):
+        image['url'] = sw_urls[sw_key] if sw_key else _signed_imagekit_url(image['file_key'], expires_at)
+    return images
\ No newline at end of file
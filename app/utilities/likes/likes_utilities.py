@@ -1,7 +1,7 @@
 import json
 
 from app.models.match_canidate_model import build_candidate_model
-from app.utilities.common.common_utilites import get_signed_imagekit
+from app.utilities.common.common_utilites import CARD_DISPLAY_SIZE, get_signed_imagekit
 
 
 def get_pending_liker_ids(user_id: int, cursor) -> list[int]:
@@ -72,4 +72,4 @@ def build_full_profile(user_id: int, cursor) -> dict:
 def build_first_photo(user_id: int, cursor) -> dict:
     cursor.execute("SELECT profile_picture::text FROM users WHERE id = %s;", (user_id,))
     profile_picture = cursor.fetchone()[0]
-    return get_signed_imagekit(json.loads(profile_picture))
+    return get_signed_imagekit(json.loads(profile_picture), size=CARD_DISPLAY_SIZE)
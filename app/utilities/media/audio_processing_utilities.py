@@ -0,0 +1,101 @@
+import subprocess
+import tempfile
+
+import numpy as np
+
+from app.constants.global_constants import (
+    IMAGE_JOB_TIMEOUT_SECONDS,
+    VOICE_MAX_SECONDS,
+    VOICE_OPUS_BITRATE,
+    VOICE_SAMPLE_RATE,
+    VOICE_WAVEFORM_BARS,
+)
+
+# Runs inside the image worker processes (see image_pool_utilities) like
+# image_processing_utilities: module-level functions only, plain picklable
+# arguments and results. Decoding and encoding is done by ffmpeg.
+
+
+class InvalidAudioError(ValueError):
+    """The upload couldn't be decoded as audio."""
+
+
+class AudioTooLongError(InvalidAudioError):
+    """The voice note runs past VOICE_MAX_SECONDS."""
+
+
+class AudioUnavailableError(RuntimeError):
+    """ffmpeg is missing or didn't finish in time - nothing wrong with the upload."""
+
+
+def process_voice_note(content: bytes) -> tuple[bytes, float, list[int]]:
+    """
+    A voice note as (Ogg Opus, duration in seconds, waveform). The upload
+    is decoded exactly once, to mono PCM at VOICE_SAMPLE_RATE; the waveform
+    is computed from that PCM and the Opus encode reads the same PCM, so
+    there is no second decode of the original. Decoding stops just past
+    VOICE_MAX_SECONDS, so an hour-long file costs no more than a long note.
+    """
+    # From a file rather than a pipe: m4a/mp4 keep their index at the end
+    # and ffmpeg needs to seek to it
+    with tempfile.NamedTemporaryFile(suffix=".voice") as source:
+        source.write(content)
+        source.flush()
+        pcm = _ffmpeg(
+            ["-i", source.name, "-vn", "-ac", "1", "-ar", str(VOICE_SAMPLE_RATE),
+             "-t", str(VOICE_MAX_SECONDS + 1), "-f", "s16le", "pipe:1"],
+        )
+
+    samples = np.frombuffer(pcm, dtype="<i2")
+    if samples.size == 0:
+        raise InvalidAudioError("No audio in the upload")
+    duration = samples.size / VOICE_SAMPLE_RATE
+    if duration > VOICE_MAX_SECONDS:
+        raise AudioTooLongError(f"Voice note is over {VOICE_MAX_SECONDS} seconds")
+
+    opus = _ffmpeg(
+        ["-f", "s16le", "-ar", str(VOICE_SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+         "-c:a", "libopus", "-b:a", VOICE_OPUS_BITRATE, "-application", "voip", "-f", "ogg", "pipe:1"],
+        stdin=pcm,
+    )
+    return opus, round(duration, 2), waveform_envelope(samples)
+
+
+def waveform_envelope(samples: np.ndarray, bars: int = VOICE_WAVEFORM_BARS) -> list[int]:
+    """
+    RMS loudness of `bars` equal slices of 16-bit PCM, 0-100 relative to
+    the loudest slice: enough for the client to draw the note before it
+    has downloaded a byte of audio.
+    """
+    if samples.size == 0:
+        return [0] * bars
+
+    squares = samples.astype(np.float64) ** 2
+    edges = np.linspace(0, samples.size, bars + 1).astype(np.int64)
+    # With fewer samples than bars some slices are empty; reduceat gives
+    # those the next sample, which is as good as anything for a drawing
+    rms = np.sqrt(np.add.reduceat(squares, edges[:-1]) / np.maximum(np.diff(edges), 1))
+
+    loudest = rms.max()
+    if loudest == 0:
+        return [0] * bars
+    return np.round(rms / loudest * 100).astype(int).tolist()
+
+
+def _ffmpeg(args: list[str], stdin: bytes | None = None) -> bytes:
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", *args],
+            input=stdin,
+            stdin=None if stdin is not None else subprocess.DEVNULL,
+            capture_output=True,
+            timeout=IMAGE_JOB_TIMEOUT_SECONDS,
+        )
+    except FileNotFoundError:
+        raise AudioUnavailableError("ffmpeg is not installed") from None
+    except subprocess.TimeoutExpired:
+        raise AudioUnavailableError(f"ffmpeg took longer than {IMAGE_JOB_TIMEOUT_SECONDS}s") from None
+    if result.returncode != 0:
+        raise InvalidAudioError(result.stderr.decode(errors="replace").strip()[-500:] or "ffmpeg failed")
+    return result.stdout
+
@@ -0,0 +1,30 @@
+from app.constants.global_constants import BLURHASH_CACHE_TTL_SECONDS, BLURHASH_X_COMPONENTS, BLURHASH_Y_COMPONENTS
+from app.controllers.logger_controller import logger_controller
+from app.controllers.redis_controller import redis_client
+
+
+def _cache_key(user_id: int, content_hash: bytes) -> str:
+    # Keyed by component count too, so changing it doesn't serve old-shape hashes
+    return f"blurhash:{BLURHASH_X_COMPONENTS}x{BLURHASH_Y_COMPONENTS}:{user_id}:{content_hash.hex()}"
+
+
+def get_cached_blurhash(user_id: int, content_hash: bytes) -> str | None:
+    """
+    The blurhash already computed for an upload of these bytes (see
+    hash_content) by this user, on any endpoint, or None. Per user like
+    the dedup index, so a hit never confirms what anyone else uploaded.
+    Only an optimization: a failed lookup is logged and is a miss.
+    """
+    try:
+        cached = redis_client.get(_cache_key(user_id, content_hash))
+    except Exception as e:
+        logger_controller.warning(f"Blurhash cache lookup failed, computing it: {e!r}")
+        return None
+    return cached.decode() if cached else None
+
+
+def cache_blurhash(user_id: int, content_hash: bytes, blurhash: str) -> None:
+    try:
+        redis_client.setex(_cache_key(user_id, content_hash), BLURHASH_CACHE_TTL_SECONDS, blurhash)
+    except Exception as e:
+        logger_controller.warning(f"Failed to cache blurhash: {e!r}")
@@ -0,0 +1,74 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Callable
+
+import cv2
+import numpy as np
+
+from app.constants.global_constants import FACE_DETECTION_MAX_SIDE, FACE_DETECTOR_BACKEND
+
+# (x, y, w, h) in the coordinates of the image that was passed in
+FaceBox = tuple[int, int, int, int]
+
+
+class FaceDetector(ABC):
+    """Backend interface: find faces in a single-channel (grayscale) image."""
+
+    @abstractmethod
+    def detect(self, gray: np.ndarray) -> list[FaceBox]:
+        ...
+
+
+class HaarFaceDetector(FaceDetector):
+    def __init__(self, cascade_file: str = "haarcascade_frontalface_default.xml", scale_factor: float = 1.1, min_neighbors: int = 5):
+        # Parsing the cascade XML is the expensive part - done once per
+        # instance, and get_face_detector keeps one instance per process.
+        self.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + cascade_file)
+        if self.cascade.empty():
+            raise RuntimeError(f"Failed to load Haar cascade {cascade_file}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def detect(self, gray: np.ndarray) -> list[FaceBox]:
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors)
+        return [tuple(int(v) for v in face) for face in faces]
+
+
+_BACKENDS: dict[str, Callable[[], FaceDetector]] = {
+    "haar": HaarFaceDetector,
+}
+
+
+def register_face_detector(name: str, factory: Callable[[], FaceDetector]) -> None:
+    _BACKENDS[name] = factory
+    get_face_detector.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def get_face_detector(backend: str = FACE_DETECTOR_BACKEND) -> FaceDetector:
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unknown face detector backend {backend!r} (have: {', '.join(_BACKENDS)})")
+    return _BACKENDS[backend]()
+
+
+def detect_faces(rgb: np.ndarray, max_side: int = FACE_DETECTION_MAX_SIDE, detector: FaceDetector | None = None) -> list[FaceBox]:
+    """
+    Runs detection on a grayscale copy downscaled so its longest side is at
+    most `max_side` (a profile photo's face is never small enough to need
+    more), then maps the boxes back to `rgb`'s coordinates. max_side <= 0
+    detects at full resolution.
+    """
+    detector = detector or get_face_detector()
+    height, width = rgb.shape[:2]
+    scale = max_side / max(height, width) if max_side > 0 else 1.0
+
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+    else:
+        scale = 1.0
+
+    return [
+        (round(x / scale), round(y / scale), round(w / scale), round(h / scale))
+        for x, y, w, h in detector.detect(gray)
+    ]
@@ -0,0 +1,119 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from app.constants.global_constants import (
+    IMAGE_JOB_TIMEOUT_SECONDS,
+    IMAGE_QUEUE_SIZE,
+    IMAGE_WORKER_MAX_TASKS,
+    IMAGE_WORKERS,
+)
+from app.controllers.logger_controller import logger_controller
+
+
+class ImagePoolBusy(Exception):
+    """Every worker is busy and the wait queue is full - shed the upload."""
+
+
+class ImageWorkerPool:
+    """
+    Dedicated process pool for CPU-bound image work (decode, resize, WebP
+    encode, blurhash, face detection), so uploads scale with cores instead of
+    serializing on the GIL, and the event loop only does I/O.
+
+    - Bounded: at most `workers + queue_size` jobs in flight; beyond that
+      `run` raises ImagePoolBusy straight away instead of queueing forever.
+    - Per-job timeout: a job that overruns has its pool torn down (the only
+      way to stop a running worker) and a fresh one is started.
+    - Workers are recycled after `max_tasks_per_worker` jobs to cap the
+      memory creep from PIL/OpenCV allocator fragmentation.
+    """
+
+    def __init__(
+        self,
+        workers: int = IMAGE_WORKERS,
+        queue_size: int = IMAGE_QUEUE_SIZE,
+        job_timeout: float = IMAGE_JOB_TIMEOUT_SECONDS,
+        max_tasks_per_worker: int = IMAGE_WORKER_MAX_TASKS,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.job_timeout = job_timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+
+        self._executor: ProcessPoolExecutor | None = None
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def start(self) -> None:
+        if self._executor is None:
+            # max_tasks_per_child needs spawn (it's incompatible with fork)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=self.max_tasks_per_worker,
+            )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        _check_importable(fn)
+        if self._in_flight >= self.workers + self.queue_size:
+            raise ImagePoolBusy()
+
+        # memoryviews (see read_upload) don't pickle - ship the buffer behind them
+        args = tuple(_buffer_of(arg) if isinstance(arg, memoryview) else arg for arg in args)
+
+        self._in_flight += 1
+        try:
+            for attempt in range(2):
+                self.start()
+                executor = self._executor
+                try:
+                    future = executor.submit(fn, *args)
+                    return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.job_timeout)
+                except asyncio.TimeoutError:
+                    logger_controller.warning(f"Image job {fn.__name__} timed out after {self.job_timeout}s, recycling workers")
+                    self._recycle(executor)
+                    raise
+                except BrokenProcessPool:
+                    # A worker died (OOM, crash, or a recycle for someone
+                    # else's timeout) - retry once on a fresh pool.
+                    self._recycle(executor)
+                    if attempt:
+                        raise
+        finally:
+            self._in_flight -= 1
+
+    def _recycle(self, executor: ProcessPoolExecutor) -> None:
+        if self._executor is executor:
+            self._executor = None
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _buffer_of(view: memoryview) -> bytes | bytearray:
+    if isinstance(view.obj, (bytes, bytearray)) and view.nbytes == len(view.obj):
+        return view.obj
+    return view.tobytes()
+
+
+def _check_importable(fn: Callable) -> None:
+    # Workers get `fn` by reference (module + qualified name), which
+    # lambdas and nested functions don't have. Checked by name so nothing
+    # is pickled twice.
+    qualname = getattr(fn, "__qualname__", "")
+    if "<lambda>" in qualname or "<locals>" in qualname:
+        raise TypeError(f"{qualname} can't be run in an image worker, pass a module-level function")
+
+
+image_pool = ImageWorkerPool()
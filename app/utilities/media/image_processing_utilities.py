@@ -0,0 +1,194 @@
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from app.constants.global_constants import BLURHASH_SOURCE_SIDE, IMAGE_MAX_PIXELS, IMAGE_RENDITIONS
+from app.utilities.media.face_detection_utilities import detect_faces
+from app.utilities.media.media_utilities import blurhash_from_image
+
+# Everything in here is CPU-bound and runs inside the image worker processes
+# (see image_pool_utilities), so it has to stay importable by reference:
+# module-level functions only, plain picklable arguments and results.
+
+
+def process_image_half_and_convert_webp(content: bytes) -> tuple[bytes, int, int]:
+    half = _decode_half_size(content)
+    return _encode_webp(half), half.width, half.height
+
+def process_upload_image(content: bytes) -> tuple[bytes, int, int, str, dict[str, tuple[bytes, int]]]:
+    """
+    /upload/media and /upload/media-user in one worker round trip, all in
+    memory: half-size WebP, the renditions (see render_renditions) off the
+    same decode, and the blurhash of the smallest of those.
+    """
+    half = _decode_half_size(content)
+    width, height = half.size
+    webp_content = _encode_webp(half)
+    renditions, smallest = _render_cascade(half)
+    return webp_content, width, height, blurhash_from_image(smallest), renditions
+
+def render_renditions(image: Image.Image, sizes: dict[str, int] = IMAGE_RENDITIONS) -> dict[str, tuple[bytes, int]]:
+    """
+    name -> (WebP, longest side) for every rendition size smaller than the
+    image; larger ones are skipped, the image itself already fits them.
+    Largest first, each resized from the previous rather than from the
+    full image.
+    """
+    return _render_cascade(image, sizes)[0]
+
+def _render_cascade(image: Image.Image, sizes: dict[str, int] = IMAGE_RENDITIONS) -> tuple[dict[str, tuple[bytes, int]], Image.Image]:
+    """render_renditions, plus the smallest image it resized to (`image` itself if none)."""
+    renditions = {}
+    source = image
+    for name, side in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        if max(source.size) <= side:
+            continue
+        scale = side / max(source.size)
+        source = source.resize(
+            (max(1, round(source.width * scale)), max(1, round(source.height * scale))),
+            Image.Resampling.LANCZOS,
+        )
+        renditions[name] = (_encode_webp(source), max(source.size))
+    return renditions, source
+
+def provisional_blurhash(content: bytes) -> str | None:
+    """
+    A blurhash cheap enough to compute in the request of a deferred upload:
+    JPEGs are decoded at 1/8 scale straight from the DCT (draft mode), so
+    this costs milliseconds rather than a full decode. Other formats can't
+    be decoded partially; they get None and wait for the job's blurhash.
+    """
+    try:
+        image = open_image(content)
+        if image.format != "JPEG":
+            return None
+        image.draft(image.mode, (BLURHASH_SOURCE_SIDE, BLURHASH_SOURCE_SIDE))
+        return blurhash_from_image(image)
+    except Exception:
+        return None
+
+class InvalidImageError(ValueError):
+    """The upload couldn't be decoded as an image."""
+
+
+class ImageTooLargeError(InvalidImageError):
+    """The image has more than IMAGE_MAX_PIXELS pixels; refused before decoding."""
+
+
+def open_image(content: bytes) -> Image.Image:
+    """
+    Opens `content` without decoding it. Only the header has been read, so
+    an image over IMAGE_MAX_PIXELS is refused before a byte of pixel memory
+    is allocated, and the caller can still set a draft size (see
+    _decode_half_size).
+    """
+    try:
+        image = Image.open(BytesIO(content))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e)) from e
+    except Exception as e:
+        raise InvalidImageError(str(e)) from e
+
+    if image.width * image.height > IMAGE_MAX_PIXELS:
+        image.close()
+        raise ImageTooLargeError(f"{image.width}x{image.height} is over the {IMAGE_MAX_PIXELS} pixel limit")
+    return image
+
+def decode_image(content: bytes, reduce: int = 1) -> tuple[Image.Image, int]:
+    """
+    `content` decoded and upright. With `reduce` (2, 4 or 8) a JPEG is
+    decoded straight at 1/reduce scale; returns the image and the factor
+    actually applied, 1 for formats that can't.
+    """
+    image = open_image(content)
+    full_size = image.size
+    try:
+        if reduce > 1 and min(full_size) >= reduce:
+            image.draft(image.mode, (full_size[0] // reduce, full_size[1] // reduce))
+        image.load()
+    except Exception as e:
+        raise InvalidImageError(str(e)) from e
+    applied = reduce if image.size != full_size else 1
+    # cv2.imread honoured EXIF orientation, so face boxes did too - keep that
+    return ImageOps.exif_transpose(image), applied
+
+def find_face_box(rgb: np.ndarray, padding: int = 50) -> tuple[int, int, int, int] | None:
+    """(x1, y1, x2, y2) of the first face, padded and clamped to the image."""
+    faces = detect_faces(rgb)
+    if len(faces) == 0:
+        return None
+
+    # Take first face only
+    x, y, w, h = faces[0]
+    return (
+        max(0, x - padding),
+        max(0, y - padding),
+        min(rgb.shape[1], x + w + padding),
+        min(rgb.shape[0], y + h + padding),
+    )
+
+def process_profile_picture(
+    content: bytes, with_original_blurhash: bool = True
+) -> tuple[bytes, int, int, str, str | None, dict[str, tuple[bytes, int]]] | None:
+    """
+    The whole pfp pipeline off a single decode. Every stage reads the one
+    RGB array: face detection (grayscale view of it), the face crop (a
+    slice, no copy), the half-size WebP (encoded once, straight from
+    memory), its smaller renditions and the pfp blurhash off the smallest of
+    those. The original's blurhash comes from the decoded image itself,
+    shrunk in place once the array has been taken from it.
+
+    Returns (webp, width, height, pfp blurhash, original blurhash,
+    renditions), or None when no face is found. Raises InvalidImageError for undecodable input.
+    """
+    # The crop ends up at half size anyway, so JPEGs are decoded at half size
+    image, reduced = decode_image(content, reduce=2)
+    rgb_image = image if image.mode == "RGB" else image.convert("RGB")
+    rgb = np.asarray(rgb_image)  # a copy: rgb_image can be shrunk below
+    blurhash_original = blurhash_from_image(rgb_image) if with_original_blurhash else None
+    rgb_image.close()
+    image.close()
+
+    box = find_face_box(rgb, padding=50 // reduced)
+    if box is None:
+        return None
+
+    x1, y1, x2, y2 = box
+    face = Image.fromarray(rgb[y1:y2, x1:x2])
+    if reduced == 1:
+        face = _half_size(face)
+    webp_content = _encode_webp(face)
+    width, height = face.size
+
+    renditions, smallest = _render_cascade(face)
+    return webp_content, width, height, blurhash_from_image(smallest), blurhash_original, renditions
+
+def _half_size(image: Image.Image) -> Image.Image:
+    return image.resize((image.width // 2, image.height // 2), Image.Resampling.LANCZOS)
+
+def _decode_half_size(content: bytes) -> Image.Image:
+    """
+    `content` at half size. A JPEG is put in draft mode first, so libjpeg
+    does the halving in its IDCT and the full-resolution pixels are never
+    materialised: a quarter of the memory and a fraction of the decode time
+    for large phone photos. Other formats are decoded in full and resized.
+    """
+    image = open_image(content)
+    target = (image.width // 2, image.height // 2)
+    try:
+        if min(target) > 0:
+            image.draft(image.mode, target)
+        if image.size == target:
+            image.load()
+            return image
+        half = image.resize(target, Image.Resampling.LANCZOS)
+    except Exception as e:
+        raise InvalidImageError(str(e)) from e
+    image.close()
+    return half
+
+def _encode_webp(image: Image.Image) -> bytes:
+    webp_buffer = BytesIO()
+    image.save(webp_buffer, format="WEBP", quality=75)
+    return webp_buffer.getvalue()
@@ -2,28 +2,86 @@ import base64
 import hashlib
 import hmac
 import time
+from functools import lru_cache
 
 from app.constants.global_constants import (
     IMGPROXY_PUBLIC_URL,
     IMGPROXY_KEY,
     IMGPROXY_SALT,
     SEAWEEDFS_BUCKET,
+    SIGNED_URL_BUCKET_SECONDS,
+    SIGNED_URL_CACHE_SIZE,
 )
 
 
+# Decoded once at import rather than on every signature
+_KEY_BYTES = bytes.fromhex(IMGPROXY_KEY) if IMGPROXY_KEY else b""
+_SALT_BYTES = bytes.fromhex(IMGPROXY_SALT) if IMGPROXY_SALT else b""
+
+
 def _sign(path: str) -> str:
-    key_bytes = bytes.fromhex(IMGPROXY_KEY)
-    salt_bytes = bytes.fromhex(IMGPROXY_SALT)
-    digest = hmac.new(key_bytes, salt_bytes + path.encode(), hashlib.sha256).digest()
+    digest = hmac.new(_KEY_BYTES, _SALT_BYTES + path.encode(), hashlib.sha256).digest()
     return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
 
 
-def build_signed_url(file_key: str, expire_seconds: int = 1200) -> str:
+def bucketed_expiry(expire_seconds: int) -> int:
+    """
+    Absolute expiry rounded *up* to a SIGNED_URL_BUCKET_SECONDS boundary, so
+    every render inside one bucket gets the same URL and the URL is still
+    valid for at least `expire_seconds`. Already-expired requests are left
+    as-is.
+    """
+    expires_at = int(time.time()) + expire_seconds
+    if expire_seconds <= 0:
+        return expires_at
+    return -(-expires_at // SIGNED_URL_BUCKET_SECONDS) * SIGNED_URL_BUCKET_SECONDS
+
+
+# Stored media imgproxy can't process (voice notes) is passed through as-is
+_RAW_EXTENSIONS = (".ogg", ".opus")
+
+
+@lru_cache(maxsize=SIGNED_URL_CACHE_SIZE)
+def _build_signed_url(file_key: str, expires_at: int) -> str:
     source_url = f"s3://{SEAWEEDFS_BUCKET}/{file_key}"
     encoded_source = base64.urlsafe_b64encode(source_url.encode()).rstrip(b"=").decode()
 
-    expires_at = int(time.time()) + expire_seconds
-    path = f"/exp:{expires_at}/{encoded_source}"
+    raw = "/raw:1" if file_key.lower().endswith(_RAW_EXTENSIONS) else ""
+    path = f"{raw}/exp:{expires_at}/{encoded_source}"
 
     signature = _sign(path)
     return f"{IMGPROXY_PUBLIC_URL}/{signature}{path}"
+
+
+def rendition_key(file_key: str, name: str) -> str:
+    """Where a rendition lives: next to the image, sw/media/1/abc.webp -> sw/media/1/abc@thumb.webp."""
+    stem, dot, _ = file_key.rpartition(".")
+    return f"{stem if dot else file_key}@{name}.webp"
+
+
+def best_fit_key(file_key: str, size: int | None, renditions: dict[str, int] | None) -> str:
+    """
+    Key of the smallest stored rendition whose longest side covers `size`,
+    falling back to the image itself. `renditions` is the name -> longest
+    side map saved in the image metadata at upload; images uploaded before
+    renditions existed have none and always get the original.
+    """
+    if not size or not renditions:
+        return file_key
+    fitting = [(side, name) for name, side in renditions.items() if side >= size]
+    return rendition_key(file_key, min(fitting)[1]) if fitting else file_key
+
+
+def build_signed_url(
+    file_key: str,
+    expire_seconds: int = 1200,
+    size: int | None = None,
+    renditions: dict[str, int] | None = None,
+) -> str:
+    return _build_signed_url(best_fit_key(file_key, size, renditions), bucketed_expiry(expire_seconds))
+
+
+def build_signed_urls(file_keys, expire_seconds: int = 1200) -> dict[str, str]:
+    """Signs a whole response's keys in one pass against a single expiry bucket."""
+    expires_at = bucketed_expiry(expire_seconds)
+    return {file_key: _build_signed_url(file_key, expires_at) for file_key in file_keys}
@@ -0,0 +1,260 @@
+import ast
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable
+
+import requests
+from psycopg2.extras import Json
+
+from app.controllers import seaweedfs_controller
+from app.utilities.common.common_utilites import get_signed_imagekit
+from app.utilities.media.media_utilities import generate_signed_url
+
+# Where each kind of legacy key lives: chat media went to B2, profile
+# pictures and photos to ImageKit.
+STORE_B2 = "b2"
+STORE_IMAGEKIT = "imagekit"
+
+LEGACY_FETCH_TIMEOUT_SECONDS = 60
+
+
+def is_legacy_key(file_key: str | None) -> bool:
+    return bool(file_key) and not file_key.startswith("sw/")
+
+
+def migrated_key(file_key: str) -> str:
+    """Legacy keys keep their path under sw/, so a rerun maps to the same object."""
+    return file_key if file_key.startswith("sw/") else f"sw/{file_key.lstrip('/')}"
+
+
+def legacy_source_url(file_key: str, store: str) -> str:
+    if store == STORE_B2:
+        return generate_signed_url(file_key)
+    return get_signed_imagekit({"file_key": file_key}, expire_seconds=3600)["url"]
+
+
+class _CountingReader:
+    """Wraps a response stream so bytes can be counted as they're uploaded."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.raw.read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def copy_legacy_object(file_key: str, store: str) -> int:
+    """
+    Streams one legacy object into SeaweedFS under migrated_key(). Returns
+    bytes copied, or 0 if the target already exists (a previous run got
+    this far and died before rewriting the row).
+    """
+    target_key = migrated_key(file_key)
+    if seaweedfs_controller.object_exists(target_key):
+        return 0
+
+    with requests.get(legacy_source_url(file_key, store), stream=True, timeout=LEGACY_FETCH_TIMEOUT_SECONDS) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        reader = _CountingReader(response.raw)
+        seaweedfs_controller.upload_stream(reader, target_key, response.headers.get("Content-Type"))
+        return reader.bytes_read
+
+
+class MigrationStats:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.copied = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes_copied = 0
+        self.rows_rewritten = 0
+        self.pending = 0  # dry run: legacy objects that would be copied
+
+    def summary(self) -> str:
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        if self.pending:
+            return f"pending={self.pending} (dry run)"
+        return (
+            f"copied={self.copied} already_present={self.skipped} failed={self.failed} "
+            f"rows_rewritten={self.rows_rewritten} "
+            f"{self.bytes_copied / 1024 / 1024:.1f}MB in {elapsed:.1f}s "
+            f"({(self.copied + self.skipped) / elapsed:.1f} obj/s, {self.bytes_copied / 1024 / 1024 / elapsed:.2f} MB/s)"
+        )
+
+
+def copy_objects(
+    objects: Iterable[tuple[str, str]],
+    stats: MigrationStats,
+    concurrency: int,
+    copy: Callable[[str, str], int] = copy_legacy_object,
+) -> dict[str, str]:
+    """
+    Copies (file_key, store) pairs with at most `concurrency` transfers in
+    flight. Returns old key -> new key for the ones that made it; failures
+    are counted and left on their legacy key for the next run.
+    """
+    objects = list(dict.fromkeys(objects))
+
+    def _copy(item):
+        file_key, store = item
+        try:
+            return file_key, copy(file_key, store), None
+        except Exception as e:
+            return file_key, None, e
+
+    migrated = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for file_key, copied_bytes, error in executor.map(_copy, objects):
+            if error is not None:
+                stats.failed += 1
+                print(f"  failed to copy {file_key}: {error!r}")
+                continue
+            if copied_bytes:
+                stats.copied += 1
+                stats.bytes_copied += copied_bytes
+            else:
+                stats.skipped += 1
+            migrated[file_key] = migrated_key(file_key)
+    return migrated
+
+
+def rewrite_photos_value(value: str, migrated: dict[str, str]) -> str | None:
+    """New user_metadata 'photos' value with migrated keys, or None if nothing changed."""
+    photos = ast.literal_eval(value)
+    changed = False
+    for photo in photos:
+        new_key = migrated.get(photo.get("file_key"))
+        if new_key:
+            photo["file_key"] = new_key
+            changed = True
+    return str(photos) if changed else None
+
+
+def migrate_media_files(conn, stats: MigrationStats, batch_size: int, concurrency: int, dry_run: bool = False) -> None:
+    last_id = None
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, file_key FROM media_files
+                WHERE file_key NOT LIKE 'sw/%%' AND (%s::uuid IS NULL OR id > %s::uuid)
+                ORDER BY id
+                LIMIT %s
+                """,
+                (last_id, last_id, batch_size)
+            )
+            rows = cur.fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+
+        if dry_run:
+            stats.pending += len(rows)
+            continue
+
+        migrated = copy_objects(((file_key, STORE_B2) for _, file_key in rows), stats, concurrency)
+        with conn.cursor() as cur:
+            for row_id, file_key in rows:
+                if file_key in migrated:
+                    # Guarded on the old key so a concurrent edit is never clobbered
+                    cur.execute(
+                        "UPDATE media_files SET file_key = %s WHERE id = %s AND file_key = %s",
+                        (migrated[file_key], row_id, file_key)
+                    )
+                    stats.rows_rewritten += cur.rowcount
+        conn.commit()
+        print(f"media_files: {stats.summary()}")
+
+
+def migrate_profile_pictures(conn, stats: MigrationStats, batch_size: int, concurrency: int, dry_run: bool = False) -> None:
+    last_id = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, profile_picture->>'file_key' FROM users
+                WHERE id > %s
+                  AND profile_picture->>'file_key' IS NOT NULL
+                  AND profile_picture->>'file_key' NOT LIKE 'sw/%%'
+                ORDER BY id
+                LIMIT %s
+                """,
+                (last_id, batch_size)
+            )
+            rows = cur.fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+
+        if dry_run:
+            stats.pending += len(rows)
+            continue
+
+        migrated = copy_objects(((file_key, STORE_IMAGEKIT) for _, file_key in rows), stats, concurrency)
+        with conn.cursor() as cur:
+            for user_id, file_key in rows:
+                if file_key in migrated:
+                    cur.execute(
+                        """
+                        UPDATE users
+                        SET profile_picture = jsonb_set(profile_picture::jsonb, '{file_key}', %s)::json
+                        WHERE id = %s AND profile_picture->>'file_key' = %s
+                        """,
+                        (Json(migrated[file_key]), user_id, file_key)
+                    )
+                    stats.rows_rewritten += cur.rowcount
+        conn.commit()
+        print(f"users.profile_picture: {stats.summary()}")
+
+
+def migrate_photos(conn, stats: MigrationStats, batch_size: int, concurrency: int, dry_run: bool = False) -> None:
+    last_id = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, value FROM user_metadata
+                WHERE key = 'photos' AND id > %s
+                ORDER BY id
+                LIMIT %s
+                """,
+                (last_id, batch_size)
+            )
+            rows = cur.fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+
+        legacy_keys = []
+        for _, value in rows:
+            try:
+                legacy_keys += [photo.get("file_key") for photo in ast.literal_eval(value or "[]")]
+            except (ValueError, SyntaxError):
+                continue
+        legacy_keys = [file_key for file_key in legacy_keys if is_legacy_key(file_key)]
+        if not legacy_keys:
+            continue
+
+        if dry_run:
+            stats.pending += len(legacy_keys)
+            continue
+
+        migrated = copy_objects(((file_key, STORE_IMAGEKIT) for file_key in legacy_keys), stats, concurrency)
+        with conn.cursor() as cur:
+            for row_id, value in rows:
+                try:
+                    new_value = rewrite_photos_value(value or "[]", migrated)
+                except (ValueError, SyntaxError):
+                    continue
+                if new_value is not None:
+                    cur.execute(
+                        "UPDATE user_metadata SET value = %s WHERE id = %s AND value = %s",
+                        (new_value, row_id, value)
+                    )
+                    stats.rows_rewritten += cur.rowcount
+        conn.commit()
+        print(f"user_metadata.photos: {stats.summary()}")
@@ -0,0 +1,119 @@
+import hashlib
+import threading
+
+from psycopg2.extras import Json
+
+from app.controllers.db_controller import db_pool
+from app.controllers.logger_controller import logger_controller
+
+
+def hash_content(content: bytes | memoryview) -> bytes:
+    return hashlib.sha256(content).digest()
+
+
+class DedupStats:
+    """Upload dedup counters for this process, shown on /internal/status."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.bytes_saved = 0
+
+    def record(self, hit: bool, bytes_saved: int = 0) -> None:
+        with self._lock:
+            self.lookups += 1
+            if hit:
+                self.hits += 1
+                self.bytes_saved += bytes_saved
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+            }
+
+
+dedup_stats = DedupStats()
+
+
+def find_duplicate(user_id: int, content_hash: bytes) -> dict | None:
+    """
+    What this user's earlier upload of the same bytes was stored as
+    (file_key, width, height, blurhash, renditions, size_bytes), or None.
+    Dedup is only an optimization, so a failed lookup is logged and
+    treated as a miss.
+    """
+    try:
+        conn = db_pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT file_key, width, height, blurhash, renditions, size_bytes, stored_bytes
+                    FROM media_content_hashes
+                    WHERE user_id = %s AND content_hash = %s
+                    """,
+                    (user_id, content_hash)
+                )
+                row = cur.fetchone()
+            conn.commit()
+        finally:
+            db_pool.putconn(conn)
+    except Exception as e:
+        logger_controller.warning(f"Upload dedup lookup failed, processing normally: {e!r}")
+        return None
+
+    if row is None:
+        dedup_stats.record(hit=False)
+        return None
+
+    file_key, width, height, blurhash, renditions, size_bytes, stored_bytes = row
+    dedup_stats.record(hit=True, bytes_saved=stored_bytes)
+    return {
+        "file_key": file_key,
+        "width": width,
+        "height": height,
+        "blurhash": blurhash,
+        "renditions": renditions or {},
+        "size_bytes": size_bytes,
+    }
+
+
+def record_upload(user_id: int, content_hash: bytes, stored: dict, stored_bytes: int) -> None:
+    """Indexes a freshly stored upload (the shape find_duplicate returns) under its content hash."""
+    try:
+        conn = db_pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                # Two identical uploads racing both get processed; first one wins the index
+                cur.execute(
+                    """
+                    INSERT INTO media_content_hashes
+                        (user_id, content_hash, file_key, width, height, blurhash, renditions, size_bytes, stored_bytes)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (user_id, content_hash) DO NOTHING
+                    """,
+                    (
+                        user_id,
+                        content_hash,
+                        stored["file_key"],
+                        stored["width"],
+                        stored["height"],
+                        stored["blurhash"],
+                        Json(stored["renditions"]),
+                        stored["size_bytes"],
+                        stored_bytes,
+                    )
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            db_pool.putconn(conn)
+    except Exception as e:
+        logger_controller.warning(f"Failed to index upload for dedup: {e!r}")
@@ -0,0 +1,390 @@
+import asyncio
+import uuid
+from typing import Awaitable, Callable
+
+from psycopg2.extras import Json
+
+from app.constants.global_constants import (
+    MEDIA_JOB_MAX_ATTEMPTS,
+    MEDIA_JOB_QUEUE_SIZE,
+    MEDIA_JOB_RETRY_SECONDS,
+    MEDIA_JOB_STALE_SECONDS,
+    MEDIA_JOB_WORKERS,
+)
+from app.controllers.db_controller import db_pool
+from app.controllers.logger_controller import logger_controller
+from app.controllers.storage_controller import get_storage
+from app.utilities.media.image_pool_utilities import ImagePoolBusy
+
+
+class MediaJobQueueFull(Exception):
+    """Every job slot is taken - shed the upload rather than queue it forever."""
+
+
+# kind -> coroutine turning (job, raw upload) into the job's result dict
+MediaJobHandler = Callable[[dict, memoryview], Awaitable[dict]]
+_HANDLERS: dict[str, MediaJobHandler] = {}
+
+
+def register_media_job_handler(kind: str, handler: MediaJobHandler) -> None:
+    _HANDLERS[kind] = handler
+
+
+def create_job(job: dict) -> bool:
+    """Inserts the job; False if one with its id already exists."""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO media_jobs (id, user_id, kind, raw_key, params)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (id) DO NOTHING
+                """,
+                (job["id"], job["user_id"], job["kind"], job["raw_key"], Json(job["params"]))
+            )
+            created = cur.rowcount == 1
+        conn.commit()
+        return created
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+
+def finish_job(job_id: str, status: str, result: dict | None = None, error: str | None = None) -> bool:
+    """Records how the job ended; False if it had already been finished (by another process)."""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE media_jobs
+                SET status = %s, result = %s, error = %s, finished_at = NOW()
+                WHERE id = %s AND status = 'pending'
+                """,
+                (status, Json(result) if result is not None else None, error, job_id)
+            )
+            finished = cur.rowcount == 1
+        conn.commit()
+        return finished
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+
+def touch_jobs(job_ids: list[str]) -> list[str]:
+    """
+    Re-stamps claimed_at on the given jobs that are still pending, so no
+    other process takes them over while this one holds them. Returns the
+    ids that were still pending.
+    """
+    if not job_ids:
+        return []
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE media_jobs SET claimed_at = NOW()
+                WHERE id = ANY(%s::uuid[]) AND status = 'pending'
+                RETURNING id
+                """,
+                (job_ids,)
+            )
+            rows = cur.fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+    return [str(job_id) for job_id, in rows]
+
+
+def get_job(job_id: str, user_id: int) -> dict | None:
+    """The job as its owner may see it (id, status, result, error), or None."""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT id, status, result, error FROM media_jobs WHERE id = %s AND user_id = %s",
+                (job_id, user_id)
+            )
+            row = cur.fetchone()
+        conn.commit()
+    finally:
+        db_pool.putconn(conn)
+
+    if row is None:
+        return None
+    job_id, status, result, error = row
+    return {"job_id": str(job_id), "status": status, "result": result, "error": error}
+
+
+def claim_stale_jobs(stale_seconds: int, limit: int) -> list[dict]:
+    """
+    Pending jobs whose claim is older than `stale_seconds` - their process
+    died before finishing them. Re-stamping claimed_at in the same statement
+    means only one process takes each of them over.
+    """
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE media_jobs SET claimed_at = NOW()
+                WHERE id IN (
+                    SELECT id FROM media_jobs
+                    WHERE status = 'pending' AND claimed_at < NOW() - make_interval(secs => %s)
+                    ORDER BY claimed_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, user_id, kind, raw_key, params
+                """,
+                (stale_seconds, limit)
+            )
+            rows = cur.fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+    return [
+        {"id": str(job_id), "user_id": user_id, "kind": kind, "raw_key": raw_key, "params": params}
+        for job_id, user_id, kind, raw_key, params in rows
+    ]
+
+
+async def notify_job_owner(job: dict, status: str, data: dict) -> None:
+    # Imported here: the websocket routes import the upload routes' helpers
+    from app.routes.matches.connections_websocket_endpoints import DataModel, send_event_to_user_connection
+
+    await send_event_to_user_connection(DataModel(
+        from_=job["user_id"],
+        to=job["user_id"],
+        type="media-job",
+        sub_type=status,
+        data={"job_id": job["id"], **data},
+    ))
+
+
+class MediaJobQueue:
+    """
+    Deferred upload processing. submit() stores the raw upload and a
+    media_jobs row and returns the job id at once; `workers` tasks on the
+    event loop run the registered handler (which does its CPU work in the
+    image pool), record the result and push a "media-job" event to the
+    owner over /ws/connections. Owners that weren't connected poll
+    GET /upload/jobs/{job_id} instead.
+
+    - Bounded: at most `workers + queue_size` jobs in flight per process;
+      beyond that submit raises MediaJobQueueFull. The slot is taken before
+      anything is awaited, so concurrent submits can't overshoot it.
+    - Jobs live in Postgres and storage, not just in this process. Every
+      `stale_seconds / 3` the claim on each job held here (queued or
+      running) is renewed, and pending jobs whose claim has gone stale -
+      their process died - are taken over; start() does the latter once
+      straight away. Only a job's first outcome is recorded and told to
+      its owner, should it end up run twice.
+    - Transient failures - the image pool busy or timing out, storage
+      unavailable, anything answering 503 - are retried with exponential
+      backoff, up to `max_attempts`. Only other errors, or running out of
+      attempts, fail the job.
+    """
+
+    def __init__(
+        self,
+        workers: int = MEDIA_JOB_WORKERS,
+        queue_size: int = MEDIA_JOB_QUEUE_SIZE,
+        stale_seconds: float = MEDIA_JOB_STALE_SECONDS,
+        max_attempts: int = MEDIA_JOB_MAX_ATTEMPTS,
+        retry_seconds: float = MEDIA_JOB_RETRY_SECONDS,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+
+        self._queue: asyncio.Queue[tuple[dict, memoryview | None]] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._in_flight = 0
+        self._held: set[str] = set()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+        await self._take_over_stale()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Unfinished jobs stay pending in media_jobs; their claims go stale
+        # and another process (or the next start()) takes them over
+        self._tasks = []
+        self._queue = None
+        self._in_flight = 0
+        self._held.clear()
+
+    async def submit(self, kind: str, user_id: int, content: memoryview, params: dict) -> str:
+        await self._reserve(kind)
+
+        job_id = str(uuid.uuid4())
+        job = {
+            "id": job_id,
+            "user_id": user_id,
+            "kind": kind,
+            "raw_key": f"sw/uploads/{user_id}/{job_id}",
+            "params": params,
+        }
+        try:
+            await get_storage().put(job["raw_key"], content)
+            await asyncio.to_thread(create_job, job)
+        except Exception:
+            self._in_flight -= 1
+            raise
+
+        self._enqueue(job, content)
+        return job_id
+
+    async def submit_stored(self, job_id: str, kind: str, user_id: int, raw_key: str, params: dict) -> bool:
+        """
+        Queues a raw upload that's already in storage (a presigned direct
+        upload) as job `job_id`. Submitting the same id again is a no-op:
+        returns False and the existing job carries on.
+        """
+        await self._reserve(kind)
+
+        job = {"id": job_id, "user_id": user_id, "kind": kind, "raw_key": raw_key, "params": params}
+        try:
+            created = await asyncio.to_thread(create_job, job)
+        except Exception:
+            self._in_flight -= 1
+            raise
+        if not created:
+            self._in_flight -= 1
+            return False
+        self._enqueue(job, None)
+        return True
+
+    async def _reserve(self, kind: str) -> None:
+        """Takes a job slot; the caller gives it back if the job isn't enqueued."""
+        if kind not in _HANDLERS:
+            raise ValueError(f"No media job handler for {kind!r}")
+        if self._queue is None:
+            await self.start()
+        # No await between the check and taking the slot
+        if self._in_flight >= self.workers + self.queue_size:
+            raise MediaJobQueueFull()
+        self._in_flight += 1
+
+    def _enqueue(self, job: dict, content: memoryview | None) -> None:
+        self._held.add(job["id"])
+        self._queue.put_nowait((job, content))
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(self.stale_seconds / 3)
+            try:
+                await asyncio.to_thread(touch_jobs, list(self._held))
+            except Exception as e:
+                logger_controller.warning(f"Could not renew media job claims: {e!r}")
+            await self._take_over_stale()
+
+    async def _take_over_stale(self) -> None:
+        free = self.workers + self.queue_size - self._in_flight
+        if free <= 0:
+            return
+        # Not reserved while the claim is awaited - that would shed uploads
+        # for the whole round trip. Submits racing it can leave the queue a
+        # few jobs past its bound until they drain.
+        try:
+            stale = await asyncio.to_thread(claim_stale_jobs, self.stale_seconds, free)
+        except Exception as e:
+            logger_controller.warning(f"Could not take over stale media jobs: {e!r}")
+            return
+
+        for job in stale:
+            logger_controller.info(f"Taking over media job {job['id']} for user {job['user_id']}")
+            self._in_flight += 1
+            self._enqueue(job, None)
+
+    async def _worker(self) -> None:
+        while True:
+            job, content = await self._queue.get()
+            try:
+                await self._run(job, content)
+            except Exception as e:
+                logger_controller.error(f"Media job {job['id']} could not be finished: {e!r}")
+            finally:
+                self._in_flight -= 1
+                self._held.discard(job["id"])
+                self._queue.task_done()
+
+    async def _run(self, job: dict, content: memoryview | None) -> None:
+        # Stamp the claim as the job is picked up; a job that's no longer
+        # pending was finished by another process in the meantime
+        try:
+            still_pending = await asyncio.to_thread(touch_jobs, [job["id"]])
+        except Exception as e:
+            logger_controller.warning(f"Could not claim media job {job['id']}: {e!r}")
+        else:
+            if not still_pending:
+                logger_controller.info(f"Media job {job['id']} was already finished elsewhere")
+                return
+
+        storage = get_storage()
+        try:
+            result = await self._attempt(job, content)
+        except Exception as e:
+            # HTTPExceptions raised by the shared upload helpers carry the reason
+            error = str(getattr(e, "detail", None) or e) or type(e).__name__
+            logger_controller.warning(f"Media job {job['id']} failed: {error}")
+            if await asyncio.to_thread(finish_job, job["id"], "failed", error=error):
+                await notify_job_owner(job, "failed", {"error": error})
+        else:
+            if await asyncio.to_thread(finish_job, job["id"], "done", result=result):
+                await notify_job_owner(job, "done", result)
+
+        try:
+            await storage.delete(job["raw_key"])
+        except Exception as e:
+            logger_controller.warning(f"Could not delete raw upload {job['raw_key']}: {e!r}")
+
+    async def _attempt(self, job: dict, content: memoryview | None) -> dict:
+        """The handler's result, retrying transient failures; the last error otherwise."""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                if content is None:
+                    content = memoryview(await get_storage().get(job["raw_key"]))
+                return await _HANDLERS[job["kind"]](job, content)
+            except Exception as e:
+                if attempt == self.max_attempts or not _is_transient(e):
+                    raise
+                delay = self.retry_seconds * 2 ** (attempt - 1)
+                logger_controller.info(f"Media job {job['id']} hit a transient error ({e!r}), retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+
+
+def _is_transient(error: Exception) -> bool:
+    # The upload helpers turn a busy or timed-out image pool into a 503
+    return isinstance(error, (ImagePoolBusy, asyncio.TimeoutError)) or getattr(error, "status_code", None) == 503
+
+
+media_jobs = MediaJobQueue()
@@ -1,25 +1,128 @@
 import blurhash
-import io
+import threading
+import time
+from collections import OrderedDict
 from PIL import Image
 
+from app.constants.global_constants import (
+    B2_AUTHORIZATION_CACHE_SIZE,
+    B2_AUTHORIZATION_TTL_SECONDS,
+    BLURHASH_SOURCE_SIDE,
+    BLURHASH_X_COMPONENTS,
+    BLURHASH_Y_COMPONENTS,
+)
 from app.controllers.b2_controller import bucket
-from app.utilities.media.imgproxy_utilities import build_signed_url
+from app.utilities.media.imgproxy_utilities import build_signed_url, build_signed_urls
 
 
+class DownloadAuthorizationCache:
+    """
+    B2 download authorizations scoped to a key prefix (media/<user_id>/),
+    reused until they have less life left than the URL being signed needs.
+    Bounded LRU; refreshes are single-flight per prefix, so a chat page
+    full of one sender's legacy media costs at most one remote call even
+    when several executor threads miss at once.
+    """
+
+    def __init__(self, ttl: int = B2_AUTHORIZATION_TTL_SECONDS, max_size: int = B2_AUTHORIZATION_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()  # prefix -> (token, expires_at)
+        self._refresh_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, prefix: str, valid_duration: int) -> str:
+        token = self._lookup(prefix, valid_duration)
+        if token:
+            return token
+
+        with self._lock:
+            refresh_lock = self._refresh_locks.setdefault(prefix, threading.Lock())
+
+        with refresh_lock:
+            # Whoever held the lock before us may already have refreshed it
+            token = self._lookup(prefix, valid_duration)
+            if token:
+                return token
+
+            ttl = max(self.ttl, valid_duration)
+            token = bucket.get_download_authorization(
+                file_name_prefix=prefix,
+                valid_duration_in_seconds=ttl
+            )
+            with self._lock:
+                self._entries[prefix] = (token, time.monotonic() + ttl)
+                self._entries.move_to_end(prefix)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                self._refresh_locks.pop(prefix, None)
+            return token
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, prefix: str, valid_duration: int) -> str | None:
+        with self._lock:
+            entry = self._entries.get(prefix)
+            if entry and entry[1] - time.monotonic() >= valid_duration:
+                self._entries.move_to_end(prefix)
+                return entry[0]
+        return None
+
+
+download_authorizations = DownloadAuthorizationCache()
+
+
+def _legacy_prefix(file_key: str) -> str:
+    # media/<user_id>/<file> -> media/<user_id>/
+    return file_key.rsplit("/", 1)[0] + "/" if "/" in file_key else file_key
+
 def generate_signed_url(file_key: str, valid_duration: int = 3600) -> str:
     if file_key.startswith("sw/"):
         return build_signed_url(file_key, expire_seconds=valid_duration)
 
-    authorization_token = bucket.get_download_authorization(
-        file_name_prefix=file_key,
-        valid_duration_in_seconds=valid_duration
-    )
+    authorization_token = download_authorizations.get(_legacy_prefix(file_key), valid_duration)
 
     base_url = bucket.get_download_url(file_key)
     return f"{base_url}?Authorization={authorization_token}"
 
+def generate_signed_urls(file_keys, valid_duration: int = 3600) -> dict[str, str]:
+    """
+    Batch form of generate_signed_url for a whole response (chat page etc).
+    sw/ keys are signed in one local pass; legacy B2 keys are grouped by
+    prefix and share one (cached) download authorization per prefix
+    instead of one remote call per file.
+    """
+    file_keys = set(file_keys)
+    sw_keys = {file_key for file_key in file_keys if file_key.startswith("sw/")}
+    signed_urls = build_signed_urls(sw_keys, expire_seconds=valid_duration)
+
+    legacy_by_prefix: dict[str, list[str]] = {}
+    for file_key in file_keys - sw_keys:
+        legacy_by_prefix.setdefault(_legacy_prefix(file_key), []).append(file_key)
+
+    for prefix, keys in legacy_by_prefix.items():
+        authorization_token = download_authorizations.get(prefix, valid_duration)
+        for file_key in keys:
+            signed_urls[file_key] = f"{bucket.get_download_url(file_key)}?Authorization={authorization_token}"
+
+    return signed_urls
+
 def generate_blurhash(image_data: bytes) -> str:
-    with Image.open(io.BytesIO(image_data)) as image_file:
-        image_file.thumbnail(( 100, 100 ))
-        hash = blurhash.encode(image_file, x_components=9, y_components=9)  
-        return hash
\ No newline at end of file
+    # Imported here: image_processing_utilities imports blurhash_from_image from this module
+    from app.utilities.media.image_processing_utilities import open_image
+
+    with open_image(image_data) as image_file:
+        return blurhash_from_image(image_file)
+
+def blurhash_from_image(image: Image.Image) -> str:
+    """
+    Thumbnails `image` in place; closing it is left to the caller. Given
+    one that hasn't been decoded yet, thumbnail() puts a JPEG in draft
+    mode, so it's only ever decoded at 1/8 scale or so. Pipelines pass
+    their smallest rendition, so the cost doesn't grow with the upload.
+    """
+    image.thumbnail((BLURHASH_SOURCE_SIDE, BLURHASH_SOURCE_SIDE))
+    hash = blurhash.encode(image, x_components=BLURHASH_X_COMPONENTS, y_components=BLURHASH_Y_COMPONENTS)
+    return hash
\ No newline at end of file
@@ -0,0 +1,56 @@
+import asyncio
+
+from app.constants.global_constants import IMAGE_RENDITIONS
+from app.controllers.db_controller import db_pool
+from app.controllers.logger_controller import logger_controller
+from app.controllers.redis_controller import redis_client
+from app.controllers.storage_controller import get_storage
+from app.utilities.media.imgproxy_utilities import rendition_key
+
+
+def _latest_key(user_id: int) -> str:
+    return f"pfp:latest:{user_id}"
+
+
+def swap_latest_profile_picture(user_id: int, file_key: str) -> str | None:
+    """Records file_key as this user's latest uploaded profile picture; returns the one it replaces."""
+    previous = redis_client.getset(_latest_key(user_id), file_key)
+    return previous.decode() if previous else None
+
+
+def saved_profile_picture_key(user_id: int) -> str | None:
+    """The profile picture on the user's saved profile, which must outlive any newer upload."""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT profile_picture->>'file_key' FROM users WHERE id = %s", (user_id,))
+            row = cur.fetchone()
+        conn.commit()
+    finally:
+        db_pool.putconn(conn)
+    return row[0] if row else None
+
+
+async def delete_replaced_profile_picture(user_id: int, file_key: str) -> None:
+    """
+    Profile picture keys are versioned by content, so each new picture
+    leaves the last one (and its renditions) behind. Once file_key is
+    stored, deletes the picture this user uploaded before it, unless that
+    is the one their saved profile still points at. Only housekeeping: a
+    failure is logged and leaves the old objects in place.
+    """
+    try:
+        previous = await asyncio.to_thread(swap_latest_profile_picture, user_id, file_key)
+        if previous is None or previous == file_key:
+            return
+        if previous == await asyncio.to_thread(saved_profile_picture_key, user_id):
+            return
+
+        storage = get_storage()
+        await asyncio.gather(
+            storage.delete(previous),
+            *(storage.delete(rendition_key(previous, name)) for name in IMAGE_RENDITIONS),
+        )
+        logger_controller.info(f"Deleted replaced profile picture {previous}")
+    except Exception as e:
+        logger_controller.warning(f"Could not delete user {user_id}'s replaced profile picture: {e!r}")
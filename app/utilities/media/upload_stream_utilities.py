@@ -0,0 +1,103 @@
+import asyncio
+
+from fastapi import UploadFile
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.constants.global_constants import UPLOAD_FORM_OVERHEAD_BYTES, UPLOAD_MAX_BYTES
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class UploadSizeLimitMiddleware:
+    """
+    FastAPI parses the whole multipart body before an endpoint runs, so a
+    size check inside the endpoint comes after the upload has already been
+    received and spooled. This counts request body bytes as they arrive
+    for paths under `path_prefix` and answers 413 the moment they pass
+    `max_body_bytes` (straight away if Content-Length already says so);
+    the rest of the body is never read.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        path_prefix: str,
+        max_body_bytes: int = UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD_BYTES,
+    ):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        rejected = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    rejected = True
+                    await self._reject(scope, receive, send)
+                    # The parser sees a disconnect and gives up on the body
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            # Whatever the app makes of the cut-off body, 413 was the answer
+            if not rejected:
+                await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        max_mb = self.max_body_bytes / 1024 / 1024
+        response = JSONResponse({"detail": f"Upload too large. Max {max_mb:.0f}MB"}, status_code=413)
+        await response(scope, receive, send)
+
+
+async def read_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> memoryview:
+    """
+    Reads an upload into a single buffer sized from the parsed part, so
+    there's no chunk list to join and no second copy: the returned view
+    is what gets handed to the image pipeline and the storage upload.
+    The multipart parser keeps at most ~1MB of a part in memory and spools
+    the rest to disk, so together with UploadSizeLimitMiddleware an upload
+    costs at most max_bytes of RAM here.
+
+    Raises UploadTooLarge past `max_bytes`.
+    """
+    if file.size is None:
+        # Only UploadFiles built by hand lack a size; read one byte past
+        # the cap to tell "exactly max" from "too big"
+        content = await file.read(max_bytes + 1)
+        if len(content) > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        return memoryview(content)
+
+    if file.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+
+    buffer = bytearray(file.size)
+    await file.seek(0)
+    # readinto a disk-spooled file is blocking I/O
+    read = await asyncio.to_thread(file.file.readinto, buffer)
+    return memoryview(buffer)[:read]
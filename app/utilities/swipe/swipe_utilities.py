@@ -1,7 +1,7 @@
 import asyncio
 
 from app.controllers.logger_controller import logger_controller
-from app.utilities.common.common_utilites import get_signed_imagekit
+from app.utilities.common.common_utilites import THUMB_DISPLAY_SIZE, get_signed_imagekit
 
 
 def exists_in_queue(liker_id, liked_id, cursor):
@@ -141,7 +141,7 @@ async def process_like(liker_id: int, liked_id: int, conn) -> dict:
                 "matched_user": {
                     "id": match_user[0],
                     "username": match_user[1],
-                    "profile_picture": get_signed_imagekit(match_user[2])
+                    "profile_picture": get_signed_imagekit(match_user[2], size=THUMB_DISPLAY_SIZE)
                 },
                 "swipes_remaining": swipes_remaining
             }
@@ -0,0 +1,114 @@
+import asyncio
+import itertools
+import json
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from fastapi import WebSocket, status
+
+from app.constants.global_constants import WS_SEND_QUEUE_SIZE, WS_SEND_TIMEOUT_SECONDS
+from app.controllers.logger_controller import logger_controller
+
+
+class ConnectionSender:
+    """
+    Outbound side of a single websocket. Callers enqueue and return
+    immediately; a dedicated writer task drains the queue, so a slow client
+    only ever stalls its own writer, never the coroutine that produced the
+    event.
+
+    - `coalesce_key`: a pending event with the same key is replaced in place
+      (latest state wins, e.g. typing / seen watermarks).
+    - `ephemeral`: may be dropped when the queue is full, and is evicted
+      first to make room for durable events.
+    - A durable event that still doesn't fit means the consumer is
+      chronically slow, and the connection is closed.
+    """
+
+    def __init__(self, websocket: WebSocket, max_queue: int = WS_SEND_QUEUE_SIZE):
+        self.websocket = websocket
+        self.max_queue = max_queue
+
+        # slot key -> (text, ephemeral); insertion order is send order
+        self._queue: OrderedDict[Hashable, tuple[str, bool]] = OrderedDict()
+        self._sequence = itertools.count()
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._writer = asyncio.create_task(self._drain())
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def enqueue_text(self, text: str, coalesce_key: Optional[Hashable] = None, ephemeral: bool = False) -> bool:
+        if self._closed:
+            return False
+
+        if coalesce_key is not None:
+            slot = ("coalesce", coalesce_key)
+            if slot in self._queue:
+                self._queue[slot] = (text, ephemeral)
+                return True
+        else:
+            slot = ("event", next(self._sequence))
+
+        if len(self._queue) >= self.max_queue:
+            if ephemeral:
+                return False
+            if not self._evict_ephemeral():
+                logger_controller.warning("Outbound websocket queue overflow, disconnecting slow consumer")
+                self.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return False
+
+        self._queue[slot] = (text, ephemeral)
+        self._ready.set()
+        return True
+
+    def enqueue_json(self, data: dict, coalesce_key: Optional[Hashable] = None, ephemeral: bool = False) -> bool:
+        return self.enqueue_text(json.dumps(data), coalesce_key=coalesce_key, ephemeral=ephemeral)
+
+    def close(self, code: int = status.WS_1000_NORMAL_CLOSURE) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.clear()
+        self._writer.cancel()
+        asyncio.create_task(self._close_socket(code))
+
+    def stop(self) -> None:
+        """Stops the writer without touching the socket (it's already gone)."""
+        self._closed = True
+        self._queue.clear()
+        self._writer.cancel()
+
+    def _evict_ephemeral(self) -> bool:
+        for slot, (_, ephemeral) in self._queue.items():
+            if ephemeral:
+                del self._queue[slot]
+                return True
+        return False
+
+    async def _drain(self) -> None:
+        try:
+            while True:
+                if not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+
+                _, (text, _) = self._queue.popitem(last=False)
+                await asyncio.wait_for(self.websocket.send_text(text), timeout=WS_SEND_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger_controller.warning(f"Websocket writer stopped: {e!r}")
+            self.close(code=status.WS_1011_INTERNAL_ERROR)
+
+    async def _close_socket(self, code: int) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), timeout=WS_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
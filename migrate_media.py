@@ -0,0 +1,65 @@
+"""
+Copies legacy media (chat media on B2, profile pictures and photos on
+ImageKit) into SeaweedFS under sw/<old key>, and rewrites the rows that
+point at it - media_files.file_key, users.profile_picture and the
+user_metadata 'photos' lists - in one transaction per batch.
+
+Safe to stop and rerun at any point: rows are only rewritten after their
+object is in SeaweedFS, already-copied objects are detected and not fetched
+again, and anything that failed stays on its legacy key for the next run.
+Once a run reports nothing left, the legacy branches in get_signed_imagekit
+and generate_signed_url stop being hit.
+
+Usage: python migrate_media.py [--only media_files|profile_pictures|photos]
+                               [--batch-size 200] [--concurrency 8] [--dry-run]
+"""
+
+import argparse
+import sys
+
+import psycopg2
+
+from app.constants.db_constants import DB_HOST, DB_NAME, DB_PASSWORD, DB_PORT, DB_USER
+from app.utilities.media.legacy_migration_utilities import (
+    MigrationStats,
+    migrate_media_files,
+    migrate_photos,
+    migrate_profile_pictures,
+)
+
+STEPS = {
+    "media_files": migrate_media_files,
+    "profile_pictures": migrate_profile_pictures,
+    "photos": migrate_photos,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate legacy B2/ImageKit media to SeaweedFS.")
+    parser.add_argument("--only", choices=STEPS.keys(), action="append", help="run just these steps (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=200, help="rows per transaction")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel object copies")
+    parser.add_argument("--dry-run", action="store_true", help="count what would be migrated, change nothing")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(
+        host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD, port=DB_PORT
+    )
+    conn.autocommit = False
+    try:
+        for name in args.only or STEPS.keys():
+            print(f"Migrating {name}...")
+            stats = MigrationStats()
+            STEPS[name](conn, stats, args.batch_size, args.concurrency, dry_run=args.dry_run)
+            print(f"{name} done: {stats.summary()}")
+            if stats.failed:
+                print(f"{name}: {stats.failed} objects failed to copy, rerun to retry them.")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
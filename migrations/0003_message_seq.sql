@@ -0,0 +1,55 @@
+-- Per-chat monotonic sequence numbers for messages. chats.last_seq is the
+-- counter, bumped under the chat row lock by a BEFORE INSERT trigger so
+-- every insert path gets a gap-free seq. History paging, seen watermarks
+-- (chat_participants.last_seen_seq) and reconnect sync all work in seq
+-- ranges on (chat_id, seq). Idempotent: safe to run against a DB that
+-- already has some or all of this applied.
+
+ALTER TABLE chats ADD COLUMN IF NOT EXISTS last_seq BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS seq BIGINT;
+ALTER TABLE chat_participants ADD COLUMN IF NOT EXISTS last_seen_seq BIGINT NOT NULL DEFAULT 0;
+
+-- Backfill existing history in its current (timestamp, id) order.
+UPDATE messages m
+SET seq = numbered.rn
+FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY chat_id ORDER BY timestamp, id) AS rn
+    FROM messages
+) AS numbered
+WHERE m.id = numbered.id AND m.seq IS NULL;
+
+UPDATE chats
+SET last_seq = COALESCE((SELECT MAX(seq) FROM messages WHERE messages.chat_id = chats.id), 0);
+
+-- Seen watermark: the newest message covered by either legacy marker.
+UPDATE chat_participants cp
+SET last_seen_seq = COALESCE((
+    SELECT MAX(m.seq) FROM messages m
+    WHERE m.chat_id = cp.chat_id
+      AND (m.id = cp.last_seen_message_id OR m.timestamp <= cp.last_seen_at)
+), 0)
+WHERE cp.last_seen_seq = 0;
+
+ALTER TABLE messages ALTER COLUMN seq SET NOT NULL;
+
+CREATE OR REPLACE FUNCTION assign_message_seq()
+RETURNS trigger AS $$
+BEGIN
+   UPDATE chats SET last_seq = last_seq + 1
+   WHERE id = NEW.chat_id
+   RETURNING last_seq INTO NEW.seq;
+   RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_messages_assign_seq ON messages;
+CREATE TRIGGER trg_messages_assign_seq
+BEFORE INSERT ON messages
+FOR EACH ROW EXECUTE FUNCTION assign_message_seq();
+
+-- (chat_id, seq) is the history index. It also serves every chat_id lookup
+-- the single-column index did, so that one goes - only now, since the
+-- backfill above still leans on it. sender_id is included so the "last
+-- message" lookup in /chats/get/chat is index-only.
+CREATE UNIQUE INDEX IF NOT EXISTS uq_messages_chat_seq ON messages (chat_id, seq) INCLUDE (sender_id);
+DROP INDEX IF EXISTS idx_messages_chat_id;
@@ -0,0 +1,6 @@
+-- Indexes behind /chats/sync. chat_participants is keyed (chat_id, user_id),
+-- so "every chat this user is in" had no index to use; media_files is
+-- joined on message_id by every history/sync query.
+
+CREATE INDEX IF NOT EXISTS idx_chat_participants_user_id ON chat_participants(user_id);
+CREATE INDEX IF NOT EXISTS idx_media_files_message_id ON media_files(message_id);
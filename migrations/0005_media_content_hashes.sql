@@ -0,0 +1,20 @@
+-- Content-addressed upload dedup: sha256 of the raw upload -> the image it
+-- was processed into, per user. A repeat upload of the same bytes (retry,
+-- profile edit, same photo sent to several chats) reuses the stored key,
+-- size and blurhash instead of being processed and stored again. Scoped
+-- per user so an upload never confirms what anyone else has uploaded.
+-- Idempotent.
+
+CREATE TABLE IF NOT EXISTS media_content_hashes (
+   user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+   content_hash BYTEA NOT NULL,
+   file_key TEXT NOT NULL,
+   width INT NOT NULL,
+   height INT NOT NULL,
+   blurhash TEXT,
+   renditions JSONB,
+   size_bytes INT NOT NULL,
+   stored_bytes BIGINT NOT NULL,           -- main image + renditions, i.e. what a hit avoids writing
+   created_at TIMESTAMP DEFAULT NOW(),
+   PRIMARY KEY (user_id, content_hash)
+);
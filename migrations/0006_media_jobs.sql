@@ -0,0 +1,21 @@
+-- Deferred upload processing. The raw upload is stored under raw_key and a
+-- row is written here; a worker turns it into the final image and records
+-- the result (or error). claimed_at is bumped when a worker picks a job up,
+-- and renewed while it is held, so a pending job whose claim has gone stale
+-- (its process died) can be taken over by another process. Idempotent.
+
+CREATE TABLE IF NOT EXISTS media_jobs (
+   id UUID PRIMARY KEY,
+   user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+   kind TEXT NOT NULL,
+   raw_key TEXT NOT NULL,
+   params JSONB NOT NULL DEFAULT '{}',
+   status TEXT NOT NULL DEFAULT 'pending',   -- pending | done | failed
+   result JSONB,
+   error TEXT,
+   created_at TIMESTAMP DEFAULT NOW(),
+   claimed_at TIMESTAMP DEFAULT NOW(),
+   finished_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_media_jobs_pending ON media_jobs(claimed_at) WHERE status = 'pending';
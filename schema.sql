@@ -67,7 +67,8 @@ CREATE TABLE messages (
    sender_id INTEGER NOT NULL,
    message TEXT NOT NULL,
    timestamp TIMESTAMP DEFAULT NOW(),
-   reply_id UUID REFERENCES messages(id) ON DELETE SET NULL
+   reply_id UUID REFERENCES messages(id) ON DELETE SET NULL,
+   seq BIGINT NOT NULL                    -- per-chat sequence number, assigned by trg_messages_assign_seq
 );
 
 
@@ -77,7 +78,8 @@ CREATE TABLE chats (
    group_name VARCHAR, -- NULL for 1-1 chats
    created_at TIMESTAMP DEFAULT NOW(),
    last_message_media_type VARCHAR,
-   last_message_id UUID REFERENCES messages(id) ON DELETE SET NULL
+   last_message_id UUID REFERENCES messages(id) ON DELETE SET NULL,
+   last_seq BIGINT NOT NULL DEFAULT 0     -- highest messages.seq handed out in this chat
 );
 
 
@@ -87,10 +89,28 @@ ADD CONSTRAINT fk_chat_id FOREIGN KEY (chat_id) REFERENCES chats(id) ON DELETE C
 ADD CONSTRAINT fk_sender_id FOREIGN KEY (sender_id) REFERENCES users(id) ON DELETE CASCADE;
 
 
-CREATE INDEX idx_messages_chat_id ON messages(chat_id);
+CREATE UNIQUE INDEX uq_messages_chat_seq ON messages (chat_id, seq) INCLUDE (sender_id);
 CREATE INDEX idx_messages_sender_id ON messages(sender_id);
 
 
+-- Per-chat message sequence: bumps chats.last_seq under the chat row lock,
+-- so concurrent inserts into one chat get distinct, gap-free seqs.
+CREATE OR REPLACE FUNCTION assign_message_seq()
+RETURNS trigger AS $$
+BEGIN
+   UPDATE chats SET last_seq = last_seq + 1
+   WHERE id = NEW.chat_id
+   RETURNING last_seq INTO NEW.seq;
+   RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE TRIGGER trg_messages_assign_seq
+BEFORE INSERT ON messages
+FOR EACH ROW EXECUTE FUNCTION assign_message_seq();
+
+
 -- CHAT PARTICIPANTS (handles n-participant model, unseen counters etc.)
 CREATE TABLE chat_participants (
    chat_id INT REFERENCES chats(id) ON DELETE CASCADE,
@@ -98,10 +118,14 @@ CREATE TABLE chat_participants (
    unseen_count INT DEFAULT 0,
    last_seen_message_id UUID,
    last_seen_at TIMESTAMP,
+   last_seen_seq BIGINT NOT NULL DEFAULT 0, -- seen watermark: every message with seq <= this is seen
    PRIMARY KEY (chat_id, user_id)
 );
 
 
+CREATE INDEX idx_chat_participants_user_id ON chat_participants(user_id);
+
+
 CREATE TABLE media_files (
    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
    message_id UUID REFERENCES messages(id) ON DELETE CASCADE,
@@ -114,6 +138,41 @@ CREATE TABLE media_files (
 );
 
 
+CREATE INDEX idx_media_files_message_id ON media_files(message_id);
+
+-- Upload dedup index: sha256 of a user's raw upload -> what it was stored as
+CREATE TABLE media_content_hashes (
+   user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+   content_hash BYTEA NOT NULL,
+   file_key TEXT NOT NULL,
+   width INT NOT NULL,
+   height INT NOT NULL,
+   blurhash TEXT,
+   renditions JSONB,
+   size_bytes INT NOT NULL,
+   stored_bytes BIGINT NOT NULL,
+   created_at TIMESTAMP DEFAULT NOW(),
+   PRIMARY KEY (user_id, content_hash)
+);
+
+-- Deferred upload jobs: raw upload in storage, processed by a worker
+CREATE TABLE media_jobs (
+   id UUID PRIMARY KEY,
+   user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+   kind TEXT NOT NULL,
+   raw_key TEXT NOT NULL,
+   params JSONB NOT NULL DEFAULT '{}',
+   status TEXT NOT NULL DEFAULT 'pending',   -- pending | done | failed
+   result JSONB,
+   error TEXT,
+   created_at TIMESTAMP DEFAULT NOW(),
+   claimed_at TIMESTAMP DEFAULT NOW(),
+   finished_at TIMESTAMP
+);
+
+CREATE INDEX idx_media_jobs_pending ON media_jobs(claimed_at) WHERE status = 'pending';
+
+
 -- LIKES
 CREATE TABLE likes (
    id SERIAL PRIMARY KEY,
@@ -0,0 +1,19 @@
+"""In-memory test audio, like image_factory: a WAV tone that gets louder
+over its length, so its waveform should rise.
+"""
+import io
+import wave
+
+import numpy as np
+
+
+def wav_bytes(seconds: float, rate: int = 44100) -> bytes:
+    t = np.arange(int(seconds * rate)) / rate
+    samples = (np.sin(2 * np.pi * 440 * t) * np.linspace(1000, 20000, t.size)).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(samples.tobytes())
+    return buf.getvalue()
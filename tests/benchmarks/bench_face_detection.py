@@ -0,0 +1,71 @@
+"""
+Face detection latency: the old path (new CascadeClassifier per call,
+detection at full resolution) against the cached detector with downscaled
+detection, on the image_factory fixtures at a few sizes.
+
+Not collected by pytest. Run from the repo root:
+    python tests/benchmarks/bench_face_detection.py [--repeat 5]
+"""
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import image_factory as imf  # noqa: E402
+from app.utilities.media.face_detection_utilities import detect_faces, get_face_detector  # noqa: E402
+
+
+def _rgb(content: bytes, side: int | None = None) -> np.ndarray:
+    image = Image.open(io.BytesIO(content)).convert("RGB")
+    if side:
+        image = image.resize((side, side), Image.Resampling.LANCZOS)
+    return np.asarray(image)
+
+
+def detect_uncached_full_resolution(rgb: np.ndarray):
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    return cascade.detectMultiScale(cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY), scaleFactor=1.1, minNeighbors=5)
+
+
+def detect_cached_downscaled(rgb: np.ndarray):
+    return detect_faces(rgb)
+
+
+def _time(fn, rgb, repeat):
+    fn(rgb)  # warm up (and load the cached detector)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        faces = fn(rgb)
+    return (time.perf_counter() - started) / repeat * 1000, len(faces)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    get_face_detector()
+    cases = [
+        ("face 1000px", _rgb(imf.face_image_bytes())),
+        ("face 2000px", _rgb(imf.face_image_bytes(), 2000)),
+        ("face 4000px", _rgb(imf.face_image_bytes(), 4000)),
+        ("no face 500px", _rgb(imf.no_face_image_bytes())),
+    ]
+
+    print(f"{'image':<16}{'uncached full-res':>22}{'cached downscaled':>22}{'speedup':>10}")
+    for name, rgb in cases:
+        old_ms, old_faces = _time(detect_uncached_full_resolution, rgb, args.repeat)
+        new_ms, new_faces = _time(detect_cached_downscaled, rgb, args.repeat)
+        print(f"{name:<16}{old_ms:>15.1f}ms ({old_faces}){new_ms:>15.1f}ms ({new_faces}){old_ms / new_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
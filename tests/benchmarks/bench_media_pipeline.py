@@ -0,0 +1,239 @@
+"""
+Media pipeline throughput: images/sec and peak RSS for each stage of the
+upload path, over a matrix of image sizes and formats, compared against a
+stored baseline.
+
+Stages:
+    half_webp       process_image_half_and_convert_webp
+    blurhash        generate_blurhash
+    upload_image    process_upload_image (what /upload/media runs in the pool)
+    face_crop       process_profile_picture (face detection + crop)
+    endpoint_media  POST /upload/media, end to end
+    endpoint_pfp    POST /upload/media-user-pfp, end to end
+
+Every (stage, image) case runs in a fresh process, so its peak RSS is its
+own: `peak_rss_mb` is the process peak (image pool workers included for the
+endpoints), `stage_rss_mb` how far the stage pushed it past the imports.
+The endpoints write to a fake S3 (tests/fake_s3.py) through the real S3
+backend, and skip the dedup index, blurhash cache and old profile picture
+cleanup - every iteration uploads the same bytes and must pay for them.
+Images are the face fixture resized and re-encoded, so they compress like
+photos rather than like flat synthetic fills.
+
+Not collected by pytest. Run from the repo root:
+    python tests/benchmarks/bench_media_pipeline.py [--repeat 10] [--stages half_webp,blurhash]
+    python tests/benchmarks/bench_media_pipeline.py --save-baseline
+Exits non-zero when a case's images/sec falls more than --max-regression
+(default 20%) below the baseline. Throughput only compares on like
+hardware, so when the baseline was recorded on a different machine (python,
+platform or CPU count) the changes are still shown but the gate is skipped;
+re-save the baseline on the machine that runs the gate.
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import image_factory as imf  # noqa: E402
+
+SIZES = (640, 1280, 2560)
+FORMATS = ("JPEG", "PNG", "WEBP")
+STAGES = ("half_webp", "blurhash", "upload_image", "face_crop", "endpoint_media", "endpoint_pfp")
+ENDPOINTS = {
+    "endpoint_media": "/api/v1/upload/media",
+    "endpoint_pfp": "/api/v1/upload/media-user-pfp",
+}
+BASELINE_PATH = Path(__file__).with_name("baseline_media_pipeline.json")
+
+
+def source_image(side: int, format: str) -> bytes:
+    with Image.open(io.BytesIO(imf.face_image_bytes())) as image:
+        image = image.convert("RGB")
+        image.thumbnail((side, side), Image.Resampling.LANCZOS)
+        if max(image.size) < side:
+            scale = side / max(image.size)
+            image = image.resize((round(image.width * scale), round(image.height * scale)), Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        image.save(buf, format=format, **({"quality": 90} if format in ("JPEG", "WEBP") else {}))
+    return buf.getvalue()
+
+
+def _stage_call(stage: str, content: bytes, format: str):
+    from app.utilities.media.image_processing_utilities import (
+        process_image_half_and_convert_webp,
+        process_profile_picture,
+        process_upload_image,
+    )
+    from app.utilities.media.media_utilities import generate_blurhash
+
+    if stage in ENDPOINTS:
+        return _endpoint_call(ENDPOINTS[stage], content, format)
+
+    fn = {
+        "half_webp": process_image_half_and_convert_webp,
+        "blurhash": generate_blurhash,
+        "upload_image": process_upload_image,
+        "face_crop": process_profile_picture,
+    }[stage]
+    return lambda: fn(content)
+
+
+def _endpoint_call(path: str, content: bytes, format: str):
+    import httpx
+
+    from app.constants.global_constants import STORAGE_BACKEND
+    from app.controllers.logger_controller import logger_controller
+    from app.controllers.storage_controller import register_storage_backend
+    from app.main import app
+    from app.routes.common import common_endpoints
+    from app.utilities.token.token_utilities import create_access_token
+    from fake_s3 import FakeS3, s3_backend
+
+    logger_controller.setLevel("WARNING")  # per-upload timing lines
+    register_storage_backend(STORAGE_BACKEND, lambda: s3_backend(FakeS3()))
+    common_endpoints.find_duplicate = lambda user_id, content_hash: None
+    common_endpoints.record_upload = lambda user_id, content_hash, stored, stored_bytes: None
+    common_endpoints.get_cached_blurhash = lambda user_id, content_hash: None
+    common_endpoints.cache_blurhash = lambda user_id, content_hash, blurhash: None
+
+    async def keep_replaced_profile_picture(user_id, file_key):
+        pass
+
+    common_endpoints.delete_replaced_profile_picture = keep_replaced_profile_picture
+
+    token = create_access_token(data={"id": 1, "email": "bench@example.com"})
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    async def post():
+        response = await client.post(
+            path,
+            headers={"Authorization": f"Bearer {token}"},
+            files={"file": (f"bench.{format.lower()}", content, f"image/{format.lower()}")},
+            data={"media_type": "image"},
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} answered {response.status_code}: {response.text}")
+
+    return lambda: loop.run_until_complete(post())
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux; children only count once they're reaped
+    usage = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return usage / 1024
+
+
+def measure(stage: str, content: bytes, format: str, repeat: int) -> dict:
+    """Runs in a fresh process: times `repeat` calls of the stage after a warm-up."""
+    call = _stage_call(stage, content, format)
+    rss_before = _peak_rss_mb()
+    call()  # warm up (imports, cached detector, image pool workers)
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    elapsed = time.perf_counter() - started
+
+    if stage in ENDPOINTS:
+        from app.utilities.media.image_pool_utilities import image_pool
+
+        image_pool.shutdown()
+        for process in multiprocessing.active_children():
+            process.join()
+
+    peak = _peak_rss_mb()
+    return {
+        "images_per_sec": round(repeat / elapsed, 2),
+        "peak_rss_mb": round(peak, 1),
+        "stage_rss_mb": round(peak - rss_before, 1),
+    }
+
+
+def run_case(stage: str, content: bytes, format: str, repeat: int) -> dict:
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(measure, stage, content, format, repeat).result()
+
+
+def machine() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": multiprocessing.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    from app.constants.global_constants import UPLOAD_MAX_BYTES
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    baseline = stored.get("results", {})
+    same_machine = stored.get("machine") == machine()
+    if baseline and not same_machine:
+        print(f"Baseline was recorded on {stored.get('machine')}, this is {machine()}: not gating on it")
+    results = {}
+    regressions = []
+
+    print(f"{'stage':<16}{'image':<12}{'img/s':>9}{'baseline':>10}{'change':>9}{'peak RSS':>11}{'stage RSS':>11}")
+    for side in map(int, args.sizes.split(",")):
+        for format in args.formats.split(","):
+            content = source_image(side, format)
+            image = f"{side}px {format}"
+            for stage in args.stages.split(","):
+                if stage in ENDPOINTS and len(content) > UPLOAD_MAX_BYTES:
+                    print(f"{stage:<16}{image:<12}{'skipped, over the upload cap':>50}")
+                    continue
+
+                case = f"{stage} {image}"
+                result = results[case] = run_case(stage, content, format, args.repeat)
+                before = baseline.get(case, {}).get("images_per_sec")
+                change = ""
+                if before:
+                    ratio = result["images_per_sec"] / before - 1
+                    change = f"{ratio:+.0%}"
+                    if ratio < -args.max_regression:
+                        regressions.append(case)
+                        change += " !"
+                print(
+                    f"{stage:<16}{image:<12}{result['images_per_sec']:>9.2f}{before or '-':>10}{change:>9}"
+                    f"{result['peak_rss_mb']:>9.1f}MB{result['stage_rss_mb']:>9.1f}MB"
+                )
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({"machine": machine(), "results": results}, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} case(s) more than {args.max_regression:.0%} slower than the baseline:")
+        for case in regressions:
+            print(f"  {case}")
+        if same_machine:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
+import asyncio
 import json
+import threading
+import time
 import uuid
 from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import boto3
 import psycopg2
@@ -16,7 +20,11 @@ from app.constants.global_constants import (
     SEAWEEDFS_SECRET_KEY,
 )
 from app.main import app
+from app.constants import global_constants
+from app.utilities.common import common_utilites
+from app.utilities.media import imgproxy_utilities, media_utilities
 from app.utilities.token.token_utilities import create_access_token
+from stub_http import StubRoute
 
 
 @pytest.fixture(scope="session")
@@ -108,6 +116,28 @@ def client():
     return TestClient(app)
 
 
+@pytest.fixture
+def inline_image_pool(monkeypatch):
+    """Runs the upload endpoints' image jobs in this process, so tests can patch the job functions with closures."""
+    import app.routes.common.common_endpoints as endpoints_module
+
+    class InlinePool:
+        async def run(self, fn, *args):
+            return await asyncio.to_thread(fn, *args)
+
+    monkeypatch.setattr(endpoints_module, "image_pool", InlinePool())
+
+
+@pytest.fixture(autouse=True)
+def clear_signed_url_caches():
+    """Signed URLs (and legacy B2 authorizations) are cached - keep tests
+    that monkeypatch the signers from seeing each other's cached values.
+    """
+    imgproxy_utilities._build_signed_url.cache_clear()
+    common_utilites._signed_imagekit_url.cache_clear()
+    media_utilities.download_authorizations.clear()
+
+
 @pytest.fixture(scope="session")
 def s3_client():
     return boto3.client(
@@ -131,3 +161,53 @@ def seaweed_object(s3_client):
 
     for key in created_keys:
         s3_client.delete_object(Bucket=SEAWEEDFS_BUCKET, Key=key)
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    """Local HTTP server for remote-fetch tests. Register routes with
+    `stub_server.routes["/path"] = StubRoute(...)` and build URLs with
+    `stub_server.url("/path")`. Private-host blocking is lifted so the
+    fetcher may talk to 127.0.0.1.
+    """
+    routes: dict[str, StubRoute] = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            route = routes.get(self.path)
+            if route is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            route.hosts.append(self.headers["Host"])
+            time.sleep(route.delay)
+            self.send_response(route.status)
+            for name, value in route.headers.items():
+                self.send_header(name, value)
+            if route.chunks is None and "Content-Length" not in route.headers:
+                self.send_header("Content-Length", str(len(route.body)))
+            self.end_headers()
+            try:
+                for chunk in route.chunks or [route.body]:
+                    self.wfile.write(chunk)
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    server.routes = routes
+    server.url = lambda path: f"http://127.0.0.1:{server.server_port}{path}"
+    monkeypatch.setattr(global_constants, "REMOTE_FETCH_ALLOW_PRIVATE_HOSTS", True)
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,83 @@
+"""A fake S3 endpoint for S3StorageBackend, served as an httpx transport:
+used by the storage tests and as the local S3 stand-in for benchmarks.
+"""
+import asyncio
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import httpx
+
+from app.controllers.storage_controller import S3StorageBackend
+
+
+class FakeS3:
+    """Just enough of the S3 API for S3StorageBackend, as an httpx transport."""
+
+    def __init__(self, fail_part: int | None = None):
+        self.buckets: set[str] = set()
+        self.objects: dict[str, bytes] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.aborted: list[str] = []
+        self.fail_part = fail_part
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert request.headers["authorization"].startswith("AWS4-HMAC-SHA256 ")
+        url = urlsplit(str(request.url))
+        bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+        query = parse_qs(url.query, keep_blank_values=True)
+        body = await request.aread()
+
+        if not key:
+            if request.method == "HEAD":
+                return httpx.Response(200 if bucket in self.buckets else 404)
+            self.buckets.add(bucket)
+            return httpx.Response(200)
+        if bucket not in self.buckets:
+            return httpx.Response(404)
+
+        if request.method == "POST" and "uploads" in query:
+            upload_id = f"upload-{len(self.uploads)}"
+            self.uploads[upload_id] = {}
+            return httpx.Response(200, content=f"<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>".encode())
+        if request.method == "PUT" and "partNumber" in query:
+            number = int(query["partNumber"][0])
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            if number == self.fail_part:
+                return httpx.Response(500)
+            self.uploads[query["uploadId"][0]][number] = body
+            return httpx.Response(200, headers={"ETag": f'"etag-{number}"'})
+        if request.method == "POST" and "uploadId" in query:
+            parts = self.uploads.pop(query["uploadId"][0])
+            self.objects[key] = b"".join(parts[number] for number in sorted(parts))
+            return httpx.Response(200, content=b"<CompleteMultipartUploadResult/>")
+        if request.method == "DELETE" and "uploadId" in query:
+            self.aborted.append(query["uploadId"][0])
+            return httpx.Response(204)
+        if request.method == "PUT":
+            self.objects[key] = body
+            return httpx.Response(200)
+        if request.method == "DELETE":
+            self.objects.pop(key, None)
+            return httpx.Response(204)
+        if request.method in ("GET", "HEAD"):
+            if key not in self.objects:
+                return httpx.Response(404)
+            if request.method == "HEAD":
+                return httpx.Response(200, headers={"Content-Length": str(len(self.objects[key]))})
+            return httpx.Response(200, content=self.objects[key])
+        return httpx.Response(405)
+
+
+def s3_backend(fake: FakeS3, **kwargs) -> S3StorageBackend:
+    return S3StorageBackend(
+        endpoint="http://seaweedfs:8333",
+        bucket="linkup-media",
+        access_key="key",
+        secret_key="secret",
+        transport=httpx.MockTransport(fake),
+        **kwargs,
+    )
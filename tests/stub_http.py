@@ -0,0 +1,11 @@
+"""Route description for the `stub_server` fixture (see conftest.py)."""
+
+
+class StubRoute:
+    def __init__(self, status=200, body=b"", headers=None, delay=0.0, chunks=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        self.delay = delay
+        self.chunks = chunks  # stream these without a Content-Length
+        self.hosts = []  # Host header of each request served
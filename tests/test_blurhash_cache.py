@@ -0,0 +1,75 @@
+"""Blurhashes are small (4x3 components off a 32px thumbnail by default) and
+cached per user under the upload's content hash, so a user's repeat bytes
+never pay for one.
+"""
+import blurhash
+import pytest
+
+import image_factory as imf
+from app.constants.global_constants import BLURHASH_X_COMPONENTS, BLURHASH_Y_COMPONENTS
+from app.utilities.media import blurhash_cache_utilities
+from app.utilities.media.blurhash_cache_utilities import cache_blurhash, get_cached_blurhash
+from app.utilities.media.image_processing_utilities import process_profile_picture, process_upload_image
+from app.utilities.media.media_dedup_utilities import hash_content
+
+
+class DictRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value.encode()
+
+
+class DownRedis:
+    def get(self, key):
+        raise ConnectionError("redis is down")
+
+    def setex(self, key, ttl, value):
+        raise ConnectionError("redis is down")
+
+
+def components(hash: str) -> tuple[int, int]:
+    size_flag = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~".index(hash[0])
+    return size_flag % 9 + 1, size_flag // 9 + 1
+
+
+@pytest.mark.parametrize("size", [(400, 300), (3000, 2000)])
+def test_pipeline_blurhash_has_the_configured_components(size):
+    _, _, _, hash, _ = process_upload_image(imf.make_image_bytes(size=size))
+
+    assert blurhash.is_valid_blurhash(hash)
+    assert components(hash) == (BLURHASH_X_COMPONENTS, BLURHASH_Y_COMPONENTS)
+
+
+def test_pfp_blurhashes_have_the_configured_components():
+    _, _, _, blurhash_pfp, blurhash_original, _ = process_profile_picture(imf.face_image_bytes())
+
+    assert components(blurhash_pfp) == components(blurhash_original) == (BLURHASH_X_COMPONENTS, BLURHASH_Y_COMPONENTS)
+
+
+def test_cache_round_trip_by_user_and_content_hash(monkeypatch):
+    redis = DictRedis()
+    monkeypatch.setattr(blurhash_cache_utilities, "redis_client", redis)
+    content_hash = hash_content(b"some upload")
+
+    assert get_cached_blurhash(1, content_hash) is None
+    cache_blurhash(1, content_hash, "LKO2?U%2Tw=w")
+
+    assert get_cached_blurhash(1, content_hash) == "LKO2?U%2Tw=w"
+    assert get_cached_blurhash(1, hash_content(b"other upload")) is None
+    # Another user's upload of the same bytes doesn't show through
+    assert get_cached_blurhash(2, content_hash) is None
+    [key] = redis.values
+    assert f"{BLURHASH_X_COMPONENTS}x{BLURHASH_Y_COMPONENTS}" in key
+
+
+def test_cache_failures_are_misses(monkeypatch):
+    monkeypatch.setattr(blurhash_cache_utilities, "redis_client", DownRedis())
+    content_hash = hash_content(b"some upload")
+
+    cache_blurhash(1, content_hash, "LKO2?U%2Tw=w")
+    assert get_cached_blurhash(1, content_hash) is None
@@ -0,0 +1,71 @@
+"""Chat history / sync cursors: opaque to clients, lossless round trip,
+and anything we didn't issue is rejected instead of silently paging or
+syncing from the wrong place. Sync state is kept server-side, so its
+cursor stays the same size however many chats the user is in.
+"""
+import uuid
+
+import pytest
+
+from app.utilities.chat.chat_utilities import (
+    decode_message_cursor,
+    decode_sync_state,
+    encode_message_cursor,
+    encode_sync_state,
+    load_sync_state,
+    save_sync_state,
+)
+from app.utilities.chat import chat_utilities
+
+
+def test_message_cursor_round_trips():
+    cursor = encode_message_cursor(4821)
+
+    assert "4821" not in cursor
+    assert decode_message_cursor(cursor) == 4821
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["", "not-a-cursor", str(uuid.uuid4()), "eyJzZXEiOjB9", "eyJzZXEiOiIxMCJ9"],  # last two: seq 0, seq "10"
+)
+def test_message_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_message_cursor(cursor)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value.encode()
+
+    def get(self, key):
+        return self.values.get(key)
+
+
+def test_sync_state_round_trips():
+    state = {12: (40, 38, 40), 7: (3, 0, 1)}
+
+    assert decode_sync_state(encode_sync_state(state)) == state
+    with pytest.raises(ValueError):
+        decode_sync_state('{"c": {"1": [1, 2]}}')
+
+
+def test_sync_cursor_is_fixed_size_and_scoped_to_its_user(monkeypatch):
+    monkeypatch.setattr(chat_utilities, "redis_client", FakeRedis())
+    state = {chat_id: (chat_id, 0, 0) for chat_id in range(1, 2001)}
+
+    cursor = save_sync_state(5, state)
+
+    assert len(cursor) == 22
+    assert load_sync_state(5, cursor) == state
+    assert load_sync_state(6, cursor) is None
+    assert load_sync_state(5, save_sync_state(5, {})) == {}
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", encode_message_cursor(5)])
+def test_sync_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        load_sync_state(5, cursor)
@@ -0,0 +1,64 @@
+"""Face detector: one cached instance per process, detection on a
+downscaled copy mapped back to full-size coordinates, pluggable backends.
+"""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import image_factory as imf
+from app.utilities.media import face_detection_utilities as fdu
+
+
+def _face_rgb(side: int) -> np.ndarray:
+    image = Image.open(io.BytesIO(imf.face_image_bytes())).convert("RGB")
+    return np.asarray(image.resize((side, side)))
+
+
+def test_detector_is_built_once():
+    assert fdu.get_face_detector("haar") is fdu.get_face_detector("haar")
+
+
+def test_downscaled_boxes_map_back_to_full_resolution():
+    rgb = _face_rgb(2000)
+
+    (x, y, w, h), *_ = fdu.detect_faces(rgb, max_side=500)
+    (fx, fy, fw, fh), *_ = fdu.detect_faces(rgb, max_side=0)
+
+    # Same face, in full-size coordinates, within a few downscaled pixels
+    tolerance = 2000 / 500 * 8
+    assert abs(x - fx) <= tolerance and abs(y - fy) <= tolerance
+    assert abs(w - fw) <= 2 * tolerance and abs(h - fh) <= 2 * tolerance
+    assert x + w <= 2000 and y + h <= 2000
+
+
+def test_custom_backend_receives_downscaled_gray(monkeypatch):
+    seen = {}
+
+    class FixedDetector(fdu.FaceDetector):
+        def detect(self, gray):
+            seen["shape"] = gray.shape
+            return [(10, 20, 30, 40)]
+
+    monkeypatch.setattr(fdu, "_BACKENDS", dict(fdu._BACKENDS))
+    fdu.register_face_detector("fixed", FixedDetector)
+
+    faces = fdu.detect_faces(np.zeros((1000, 2000, 3), dtype=np.uint8), max_side=500, detector=fdu.get_face_detector("fixed"))
+
+    assert seen["shape"] == (250, 500)
+    assert faces == [(40, 80, 120, 160)]
+    fdu.get_face_detector.cache_clear()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        fdu.get_face_detector("does-not-exist")
+
+
+def test_backend_without_detect_fails_when_created():
+    class Incomplete(fdu.FaceDetector):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
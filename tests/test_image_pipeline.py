@@ -0,0 +1,84 @@
+"""Decode-once image pipeline: one decode feeds validation, face crop,
+the WebP rendition and both blurhashes.
+"""
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import image_factory as imf
+from app.utilities.media import image_processing_utilities
+from app.utilities.media.image_processing_utilities import (
+    ImageTooLargeError,
+    InvalidImageError,
+    decode_image,
+    process_upload_image,
+    process_profile_picture,
+    render_renditions,
+)
+
+
+def test_profile_picture_pipeline_produces_every_output():
+    webp_content, width, height, blurhash_pfp, blurhash_original, renditions = process_profile_picture(imf.face_image_bytes())
+
+    assert webp_content[:4] == b"RIFF" and webp_content[8:12] == b"WEBP"
+    assert width > 0 and height > 0
+    assert blurhash_pfp and blurhash_original and blurhash_pfp != blurhash_original
+    assert all(side < max(width, height) for _, side in renditions.values())
+
+
+def test_profile_picture_pipeline_can_skip_original_blurhash():
+    assert process_profile_picture(imf.face_image_bytes(), False)[4] is None
+
+
+def test_profile_picture_pipeline_no_face():
+    assert process_profile_picture(imf.no_face_image_bytes()) is None
+
+
+def test_profile_picture_pipeline_rejects_corrupt_input():
+    with pytest.raises(InvalidImageError):
+        process_profile_picture(imf.corrupt_bytes())
+
+
+@pytest.mark.parametrize("fmt,mode", [("JPEG", "RGB"), ("PNG", "RGBA"), ("GIF", "RGB"), ("JPEG", "L")])
+def test_upload_image_pipeline_halves_and_hashes(fmt, mode):
+    webp_content, width, height, blurhash, renditions = process_upload_image(imf.make_image_bytes(format=fmt, mode=mode, size=(400, 300)))
+
+    assert webp_content[8:12] == b"WEBP"
+    assert (width, height) == (200, 150)
+    assert blurhash
+    assert set(renditions) == {"thumb"}  # 200px: card/full would be upscales
+
+
+def test_renditions_are_smaller_than_the_image_and_keep_aspect():
+    image = Image.new("RGB", (1000, 500), "red")
+    renditions = render_renditions(image, {"thumb": 100, "card": 400, "full": 1200})
+
+    assert {name: side for name, (_, side) in renditions.items()} == {"thumb": 100, "card": 400}
+    assert Image.open(BytesIO(renditions["thumb"][0])).size == (100, 50)
+    assert Image.open(BytesIO(renditions["card"][0])).size == (400, 200)
+
+
+@pytest.mark.parametrize("fmt,reduced", [("JPEG", 2), ("PNG", 1)])
+def test_jpegs_are_decoded_at_reduced_size(fmt, reduced):
+    image, applied = decode_image(imf.make_image_bytes(format=fmt, size=(800, 600)), reduce=2)
+
+    assert applied == reduced
+    assert image.size == (800 // reduced, 600 // reduced)
+
+
+def test_large_jpeg_halves_in_the_decoder_to_the_same_size():
+    webp_content, width, height, _, _ = process_upload_image(imf.make_image_bytes(size=(2001, 1501)))
+
+    assert (width, height) == (1000, 750)
+    assert Image.open(BytesIO(webp_content)).size == (1000, 750)
+
+
+def test_pixel_limit_is_checked_before_decoding(monkeypatch):
+    monkeypatch.setattr(image_processing_utilities, "IMAGE_MAX_PIXELS", 100_000)
+    content = imf.make_image_bytes(format="PNG", size=(400, 300))
+
+    with pytest.raises(ImageTooLargeError):
+        process_upload_image(content)
+    with pytest.raises(ImageTooLargeError):
+        process_profile_picture(content)
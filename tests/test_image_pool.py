@@ -0,0 +1,66 @@
+"""Image worker pool: jobs run in worker processes, the in-flight bound sheds
+load instead of queueing forever, and an overrunning job gets its workers
+recycled without taking the pool down for the next upload.
+"""
+import asyncio
+import os
+import time
+
+import pytest
+
+import image_factory as imf
+from app.utilities.media.image_pool_utilities import ImagePoolBusy, ImageWorkerPool
+from app.utilities.media.image_processing_utilities import process_upload_image
+
+
+@pytest.fixture
+def pool():
+    pool = ImageWorkerPool(workers=1, queue_size=0, job_timeout=5, max_tasks_per_worker=10)
+    yield pool
+    pool.shutdown()
+
+
+async def test_job_runs_in_a_worker_process(pool):
+    assert await pool.run(os.getpid) != os.getpid()
+
+    webp_content, width, height, blurhash, _ = await pool.run(process_upload_image, imf.make_image_bytes(size=(400, 200)))
+    assert webp_content[:4] == b"RIFF"
+    assert (width, height) == (200, 100)
+    assert blurhash
+
+
+async def test_memoryview_arguments_are_shipped_to_the_worker(pool):
+    content = memoryview(bytearray(imf.make_image_bytes(size=(400, 200))))
+
+    webp_content, width, height, _, _ = await pool.run(process_upload_image, content)
+    assert webp_content[:4] == b"RIFF"
+    assert (width, height) == (200, 100)
+
+
+async def test_functions_workers_cannot_import_are_refused(pool):
+    with pytest.raises(TypeError):
+        await pool.run(lambda: os.getpid())
+    assert pool.in_flight == 0
+
+
+async def test_full_pool_sheds_load(pool):
+    await pool.run(os.getpid)  # warm the worker so the sleep below is the only job
+
+    first = asyncio.create_task(pool.run(time.sleep, 0.5))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(ImagePoolBusy):
+        await pool.run(time.sleep, 0)
+    await first
+    assert pool.in_flight == 0
+
+
+async def test_timed_out_job_recycles_workers(pool):
+    pool.job_timeout = 0.5
+    worker_pid = await pool.run(os.getpid)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await pool.run(time.sleep, 10)
+
+    pool.job_timeout = 5  # leave room for the replacement worker to spawn
+    assert await pool.run(os.getpid) != worker_pid
@@ -0,0 +1,109 @@
+"""Lazy external clients: nothing connects at import, first use builds the
+client once (even under concurrency), failures are reported in health and
+retried after a back-off, and attribute access passes straight through.
+"""
+import json
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app.controllers import client_controller
+from app.controllers.client_controller import LazyClient, clients_health, warm_up_clients
+
+
+@pytest.fixture(autouse=True)
+def isolated_registry(monkeypatch):
+    monkeypatch.setattr(client_controller, "_registry", [])
+
+
+def test_importing_the_app_builds_no_clients():
+    # A fresh interpreter, since other tests in this session may have used the clients
+    script = (
+        "import json, app.main\n"
+        "from app.controllers import b2_controller, db_controller, seaweedfs_controller\n"
+        "from app.controllers.client_controller import clients_health\n"
+        "print(json.dumps({name: h['status'] for name, h in clients_health().items()}))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=60,
+    )
+    statuses = json.loads(out.stdout.strip().splitlines()[-1])
+
+    assert {"b2", "postgres", "seaweedfs"} <= statuses.keys()
+    assert set(statuses.values()) == {"uninitialized"}
+
+
+def test_first_use_builds_once_and_proxies_attributes():
+    built = []
+    release = threading.Event()
+
+    def factory():
+        built.append(1)
+        release.wait(timeout=1)
+        return SimpleNamespace(ping=lambda: "pong")
+
+    client = LazyClient("svc", factory)
+    assert clients_health() == {"svc": {"status": "uninitialized", "error": None, "init_seconds": None}}
+
+    threads = [threading.Thread(target=client.get_client) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert built == [1]
+    assert client.ping() == "pong"
+    assert clients_health()["svc"]["status"] == "ready"
+
+
+def test_failed_init_is_reported_and_retried_after_backoff():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("offline")
+        return SimpleNamespace(ok=True)
+
+    client = LazyClient("svc", factory, retry_after=0)
+    with pytest.raises(ConnectionError):
+        client.get_client()
+    assert client.client_health()["status"] == "error"
+
+    assert client.ok is True
+    assert client.client_health()["status"] == "ready"
+
+
+def test_failed_init_is_not_retried_inside_backoff():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        raise ConnectionError("offline")
+
+    client = LazyClient("svc", factory, retry_after=60)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            client.get_client()
+
+    assert len(attempts) == 1
+
+
+async def test_warm_up_survives_offline_clients():
+    LazyClient("up", lambda: object())
+    LazyClient("down", lambda: (_ for _ in ()).throw(ConnectionError("offline")))
+
+    health = await warm_up_clients(timeout=1)
+
+    assert health["up"]["status"] == "ready"
+    assert health["down"]["status"] == "error"
@@ -0,0 +1,71 @@
+"""Legacy -> SeaweedFS migration: key mapping is stable across reruns, copy
+failures stay on their legacy key, and photo lists are rewritten in place.
+"""
+import threading
+
+from app.utilities.media.legacy_migration_utilities import (
+    STORE_B2,
+    MigrationStats,
+    copy_objects,
+    migrated_key,
+    rewrite_photos_value,
+)
+
+
+def test_migrated_key_is_stable_and_idempotent():
+    assert migrated_key("media/1/a.webp") == "sw/media/1/a.webp"
+    assert migrated_key("/profile_pictures/1/pfp.webp") == "sw/profile_pictures/1/pfp.webp"
+    assert migrated_key("sw/media/1/a.webp") == "sw/media/1/a.webp"
+
+
+def test_copy_objects_counts_and_leaves_failures_on_legacy_key():
+    def fake_copy(file_key, store):
+        if file_key == "media/1/broken.webp":
+            raise ConnectionError("source gone")
+        return 0 if file_key == "media/1/already.webp" else 100
+
+    stats = MigrationStats()
+    migrated = copy_objects(
+        [("media/1/a.webp", STORE_B2), ("media/1/already.webp", STORE_B2), ("media/1/broken.webp", STORE_B2), ("media/1/a.webp", STORE_B2)],
+        stats,
+        concurrency=2,
+        copy=fake_copy,
+    )
+
+    assert migrated == {"media/1/a.webp": "sw/media/1/a.webp", "media/1/already.webp": "sw/media/1/already.webp"}
+    assert (stats.copied, stats.skipped, stats.failed, stats.bytes_copied) == (1, 1, 1, 100)
+
+
+def test_copy_objects_bounds_concurrency():
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+
+    def fake_copy(file_key, store):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        threading.Event().wait(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return 1
+
+    copy_objects([(f"media/1/{i}.webp", STORE_B2) for i in range(20)], MigrationStats(), concurrency=3, copy=fake_copy)
+
+    assert peak[0] <= 3
+
+
+def test_rewrite_photos_value_only_touches_migrated_keys():
+    value = str([
+        {"file_key": "photos/1/a.webp", "blurhash": "x"},
+        {"file_key": "sw/media/1/b.webp", "blurhash": "y"},
+        {"file_key": "photos/1/failed.webp", "blurhash": "z"},
+    ])
+
+    new_value = rewrite_photos_value(value, {"photos/1/a.webp": "sw/photos/1/a.webp"})
+
+    assert new_value == str([
+        {"file_key": "sw/photos/1/a.webp", "blurhash": "x"},
+        {"file_key": "sw/media/1/b.webp", "blurhash": "y"},
+        {"file_key": "photos/1/failed.webp", "blurhash": "z"},
+    ])
+    assert rewrite_photos_value(value, {}) is None
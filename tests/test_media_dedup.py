@@ -0,0 +1,81 @@
+"""Content-addressed upload dedup: a user re-uploading the same bytes gets
+their earlier image back without another image job or storage write.
+"""
+import image_factory as imf
+from app.utilities.media import media_dedup_utilities
+from app.utilities.media.media_dedup_utilities import DedupStats
+
+UPLOAD_MEDIA = "/api/v1/upload/media"
+UPLOAD_MEDIA_USER = "/api/v1/upload/media-user"
+
+
+def test_dedup_stats_hit_rate_and_bytes_saved():
+    stats = DedupStats()
+    assert stats.snapshot()["hit_rate"] == 0.0
+
+    stats.record(hit=False)
+    stats.record(hit=True, bytes_saved=1000)
+    stats.record(hit=True, bytes_saved=500)
+    stats.record(hit=False)
+
+    assert stats.snapshot() == {"lookups": 4, "hits": 2, "hit_rate": 0.5, "bytes_saved": 1500}
+
+
+def counting_process(monkeypatch):
+    import app.routes.common.common_endpoints as endpoints_module
+
+    calls = []
+    real_process = endpoints_module.process_upload_image
+
+    def process(content):
+        calls.append(len(content))
+        return real_process(content)
+
+    monkeypatch.setattr(endpoints_module, "process_upload_image", process)
+    return calls
+
+
+def test_repeat_upload_reuses_the_stored_image(client, make_user, auth_header, seaweed_object, monkeypatch, inline_image_pool):
+    calls = counting_process(monkeypatch)
+    stats = DedupStats()
+    monkeypatch.setattr(media_dedup_utilities, "dedup_stats", stats)
+    content = imf.make_image_bytes(size=(400, 300))
+
+    user_id = make_user()
+    responses = [
+        client.post(
+            endpoint,
+            headers=auth_header(user_id),
+            files={"file": ("a.jpg", content, "image/jpeg")},
+            data={"media_type": "image"},
+        )
+        for endpoint in (UPLOAD_MEDIA, UPLOAD_MEDIA, UPLOAD_MEDIA_USER)
+    ]
+
+    assert all(resp.status_code == 200 for resp in responses), [resp.text for resp in responses]
+    first_key = seaweed_object(responses[0].json()["file_key"])
+    assert responses[1].json()["file_key"] == first_key
+    assert responses[2].json()["metadata"]["file_key"] == first_key
+    assert responses[1].json()["metadata"]["blurhash"] == responses[0].json()["metadata"]["blurhash"]
+
+    assert len(calls) == 1
+    snapshot = stats.snapshot()
+    assert snapshot["hits"] == 2
+    assert snapshot["bytes_saved"] >= 2 * responses[0].json()["metadata"]["size_bytes"]
+
+
+def test_dedup_is_per_user(client, make_user, auth_header, seaweed_object):
+    content = imf.make_image_bytes(size=(400, 300))
+
+    keys = []
+    for user_id in (make_user(), make_user()):
+        resp = client.post(
+            UPLOAD_MEDIA,
+            headers=auth_header(user_id),
+            files={"file": ("a.jpg", content, "image/jpeg")},
+            data={"media_type": "image"},
+        )
+        assert resp.status_code == 200, resp.text
+        keys.append(seaweed_object(resp.json()["file_key"]))
+
+    assert keys[0] != keys[1]
@@ -0,0 +1,362 @@
+"""Deferred uploads: jobs are stored and answered for at once, processed by
+the queue's workers, and their owner is told how they ended.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import image_factory as imf
+from app.controllers.storage_controller import MemoryStorageBackend
+from app.utilities.media import media_job_utilities
+from app.utilities.media.image_processing_utilities import provisional_blurhash
+from app.utilities.media.media_job_utilities import MediaJobQueue, MediaJobQueueFull, register_media_job_handler
+
+
+@pytest.fixture
+def job_env(monkeypatch):
+    """Memory storage, and media_jobs rows / pushed events kept in dicts instead of Postgres and websockets."""
+    storage = MemoryStorageBackend()
+    rows = {}
+    events = []
+
+    def create_job(job):
+        if job["id"] in rows:
+            return False
+        rows[job["id"]] = {**job, "status": "pending"}
+        return True
+
+    def finish_job(job_id, status, result=None, error=None):
+        if rows[job_id]["status"] != "pending":
+            return False
+        rows[job_id].update(status=status, result=result, error=error)
+        return True
+
+    def touch_jobs(job_ids):
+        return [job_id for job_id in job_ids if rows[job_id]["status"] == "pending"]
+
+    async def notify_job_owner(job, status, data):
+        events.append((job["user_id"], status, data))
+
+    monkeypatch.setattr(media_job_utilities, "get_storage", lambda: storage)
+    monkeypatch.setattr(media_job_utilities, "create_job", create_job)
+    monkeypatch.setattr(media_job_utilities, "finish_job", finish_job)
+    monkeypatch.setattr(media_job_utilities, "notify_job_owner", notify_job_owner)
+    monkeypatch.setattr(media_job_utilities, "touch_jobs", touch_jobs)
+    monkeypatch.setattr(media_job_utilities, "claim_stale_jobs", lambda stale_seconds, limit: [])
+    return storage, rows, events
+
+
+async def drain(queue: MediaJobQueue) -> None:
+    await queue._queue.join()
+
+
+async def test_job_is_processed_and_its_owner_told(job_env):
+    storage, rows, events = job_env
+
+    async def handler(job, content):
+        return {"length": len(content), "file_key": job["params"]["file_key"]}
+
+    register_media_job_handler("test-ok", handler)
+    queue = MediaJobQueue(workers=2, queue_size=4)
+    await queue.start()
+    try:
+        job_id = await queue.submit("test-ok", 7, memoryview(b"raw-upload"), {"file_key": "sw/media/7/a.webp"})
+        assert rows[job_id]["status"] == "pending"
+        assert await storage.exists(f"sw/uploads/7/{job_id}")
+
+        await drain(queue)
+    finally:
+        await queue.stop()
+
+    assert rows[job_id]["status"] == "done"
+    assert rows[job_id]["result"] == {"length": 10, "file_key": "sw/media/7/a.webp"}
+    assert events == [(7, "done", {"length": 10, "file_key": "sw/media/7/a.webp"})]
+    assert not await storage.exists(f"sw/uploads/7/{job_id}")
+    assert queue.in_flight == 0
+
+
+async def test_failed_job_records_the_reason(job_env):
+    _, rows, events = job_env
+
+    async def handler(job, content):
+        raise ValueError("cannot identify image file")
+
+    register_media_job_handler("test-fail", handler)
+    queue = MediaJobQueue(workers=1, queue_size=4)
+    await queue.start()
+    try:
+        job_id = await queue.submit("test-fail", 7, memoryview(b"not an image"), {})
+        await drain(queue)
+    finally:
+        await queue.stop()
+
+    assert rows[job_id]["status"] == "failed"
+    assert rows[job_id]["error"] == "cannot identify image file"
+    assert events == [(7, "failed", {"error": "cannot identify image file"})]
+
+
+async def test_busy_image_pool_is_retried_rather_than_failed(job_env):
+    _, rows, events = job_env
+    calls = []
+
+    async def handler(job, content):
+        calls.append(bytes(content))
+        if len(calls) < 3:
+            raise HTTPException(503, "Image processing is busy, try again shortly.")
+        return {"file_key": "sw/media/1/ok.webp"}
+
+    register_media_job_handler("test-busy", handler)
+    queue = MediaJobQueue(workers=1, queue_size=4, max_attempts=3, retry_seconds=0)
+    await queue.start()
+    try:
+        job_id = await queue.submit("test-busy", 7, memoryview(b"raw"), {})
+        await drain(queue)
+    finally:
+        await queue.stop()
+
+    assert calls == [b"raw"] * 3
+    assert rows[job_id]["status"] == "done"
+    assert events == [(7, "done", {"file_key": "sw/media/1/ok.webp"})]
+
+
+async def test_job_fails_once_retries_run_out(job_env):
+    _, rows, events = job_env
+    calls = []
+
+    async def handler(job, content):
+        calls.append(job["id"])
+        raise asyncio.TimeoutError()
+
+    register_media_job_handler("test-timeout", handler)
+    queue = MediaJobQueue(workers=1, queue_size=4, max_attempts=2, retry_seconds=0)
+    await queue.start()
+    try:
+        job_id = await queue.submit("test-timeout", 7, memoryview(b"raw"), {})
+        await drain(queue)
+    finally:
+        await queue.stop()
+
+    assert len(calls) == 2
+    assert rows[job_id]["status"] == "failed"
+    assert [status for _, status, _ in events] == ["failed"]
+
+
+async def test_submit_sheds_load_past_the_bound(job_env):
+    release = asyncio.Event()
+
+    async def handler(job, content):
+        await release.wait()
+        return {}
+
+    register_media_job_handler("test-slow", handler)
+    queue = MediaJobQueue(workers=1, queue_size=1)
+    await queue.start()
+    try:
+        await queue.submit("test-slow", 7, memoryview(b"a"), {})
+        await queue.submit("test-slow", 7, memoryview(b"b"), {})
+        with pytest.raises(MediaJobQueueFull):
+            await queue.submit("test-slow", 7, memoryview(b"c"), {})
+
+        release.set()
+        await drain(queue)
+        await queue.submit("test-slow", 7, memoryview(b"d"), {})
+        await drain(queue)
+    finally:
+        await queue.stop()
+
+
+async def test_stale_jobs_are_taken_over_from_storage_on_start(job_env, monkeypatch):
+    storage, rows, events = job_env
+    await storage.put("sw/uploads/7/old", b"left-behind")
+    rows["old"] = {"status": "pending"}
+    stale = {"id": "old", "user_id": 7, "kind": "test-resume", "raw_key": "sw/uploads/7/old", "params": {}}
+    monkeypatch.setattr(media_job_utilities, "claim_stale_jobs", lambda stale_seconds, limit: [stale])
+
+    async def handler(job, content):
+        return {"content": content.tobytes().decode()}
+
+    register_media_job_handler("test-resume", handler)
+    queue = MediaJobQueue(workers=1, queue_size=4)
+    await queue.start()
+    try:
+        await drain(queue)
+    finally:
+        await queue.stop()
+
+    assert rows["old"]["status"] == "done"
+    assert events == [(7, "done", {"content": "left-behind"})]
+
+
+async def test_concurrent_submits_stay_within_the_bound(job_env):
+    release = asyncio.Event()
+
+    async def handler(job, content):
+        await release.wait()
+        return {}
+
+    register_media_job_handler("test-burst", handler)
+    queue = MediaJobQueue(workers=1, queue_size=1)
+    try:
+        outcomes = await asyncio.gather(
+            *(queue.submit("test-burst", 7, memoryview(b"x"), {}) for _ in range(5)), return_exceptions=True
+        )
+        assert sum(isinstance(outcome, MediaJobQueueFull) for outcome in outcomes) == 3
+        assert queue.in_flight == 2
+        release.set()
+        await drain(queue)
+    finally:
+        await queue.stop()
+
+
+async def test_job_finished_elsewhere_is_reported_once(job_env):
+    storage, rows, events = job_env
+
+    async def handler(job, content):
+        # Another process got there first
+        rows[job["id"]].update(status="done", result={"by": "other"})
+        return {"by": "this"}
+
+    register_media_job_handler("test-race", handler)
+    queue = MediaJobQueue(workers=1, queue_size=4)
+    await queue.start()
+    try:
+        raced = await queue.submit("test-race", 7, memoryview(b"a"), {})
+        await drain(queue)
+
+        # Finished before a worker got to it: not run at all
+        await storage.put("sw/uploads/7/done", b"b")
+        rows["done"] = {"status": "done"}
+        queue._in_flight += 1
+        queue._enqueue({"id": "done", "user_id": 7, "kind": "test-race", "raw_key": "sw/uploads/7/done", "params": {}}, None)
+        await drain(queue)
+    finally:
+        await queue.stop()
+
+    assert rows[raced]["result"] == {"by": "other"}
+    assert events == []
+    assert await storage.exists("sw/uploads/7/done")
+
+
+async def test_claims_are_renewed_and_stale_jobs_taken_over_while_running(job_env, monkeypatch):
+    storage, rows, events = job_env
+    release = asyncio.Event()
+    touched, sweeps = [], []
+    await storage.put("sw/uploads/8/orphan", b"orphaned")
+    rows["orphan"] = {"status": "pending"}
+    orphan = {"id": "orphan", "user_id": 8, "kind": "test-held", "raw_key": "sw/uploads/8/orphan", "params": {}}
+
+    def claim_stale_jobs(stale_seconds, limit):
+        sweeps.append(limit)
+        # Its process dies only after this one has started
+        return [orphan] if len(sweeps) == 2 else []
+
+    def touch_jobs(job_ids):
+        touched.append(sorted(job_ids))
+        return [job_id for job_id in job_ids if rows[job_id]["status"] == "pending"]
+
+    monkeypatch.setattr(media_job_utilities, "claim_stale_jobs", claim_stale_jobs)
+    monkeypatch.setattr(media_job_utilities, "touch_jobs", touch_jobs)
+
+    async def handler(job, content):
+        if job["id"] != "orphan":
+            await release.wait()
+        return {}
+
+    register_media_job_handler("test-held", handler)
+    queue = MediaJobQueue(workers=1, queue_size=4, stale_seconds=0.03)
+    await queue.start()
+    try:
+        held = await queue.submit("test-held", 7, memoryview(b"a"), {})
+        await asyncio.sleep(0.05)
+        assert [held] in touched[1:]
+        release.set()
+        await drain(queue)
+    finally:
+        await queue.stop()
+
+    assert rows["orphan"]["status"] == "done"
+    assert (8, "done", {}) in events
+
+
+def test_provisional_blurhash_only_for_jpeg():
+    assert isinstance(provisional_blurhash(imf.make_image_bytes(size=(1600, 1200))), str)
+    assert provisional_blurhash(imf.make_image_bytes(format="PNG")) is None
+    assert provisional_blurhash(b"not an image") is None
+
+
+async def test_stored_upload_is_queued_once(job_env):
+    storage, rows, events = job_env
+    await storage.put("sw/media/7/raw/up-1", b"direct-upload")
+
+    async def handler(job, content):
+        return {"content": content.tobytes().decode()}
+
+    register_media_job_handler("test-stored", handler)
+    queue = MediaJobQueue(workers=1, queue_size=4)
+    await queue.start()
+    try:
+        assert await queue.submit_stored("up-1", "test-stored", 7, "sw/media/7/raw/up-1", {})
+        assert not await queue.submit_stored("up-1", "test-stored", 7, "sw/media/7/raw/up-1", {})
+        await drain(queue)
+    finally:
+        await queue.stop()
+
+    assert rows["up-1"]["status"] == "done"
+    assert events == [(7, "done", {"content": "direct-upload"})]
+    assert not await storage.exists("sw/media/7/raw/up-1")
+
+
+def test_presigned_upload_is_scoped_to_the_user_and_queued_on_completion(client, auth_header, monkeypatch):
+    import app.routes.common.common_endpoints as endpoints_module
+    from fake_s3 import FakeS3, s3_backend
+
+    fake = FakeS3()
+    monkeypatch.setattr(endpoints_module, "get_storage", lambda: s3_backend(fake))
+    submitted = []
+
+    class Queue:
+        async def submit_stored(self, job_id, kind, user_id, raw_key, params):
+            submitted.append((job_id, kind, user_id, raw_key))
+            return True
+
+    monkeypatch.setattr(endpoints_module, "media_jobs", Queue())
+    jobs = {}
+    monkeypatch.setattr(endpoints_module, "get_job", lambda job_id, user_id: jobs.get((job_id, user_id)))
+
+    resp = client.post(
+        "/api/v1/upload/presign",
+        headers=auth_header(7),
+        data={"media_type": "image", "content_type": "image/jpeg", "size_bytes": "5"},
+    )
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    upload_id = body["upload_id"]
+    assert f"/sw/media/7/raw/{upload_id}?" in body["upload_url"]
+    assert body["method"] == "PUT" and body["headers"]["Content-Length"] == "5"
+
+    complete = f"/api/v1/upload/presign/{upload_id}/complete"
+    assert client.post(complete, headers=auth_header(7), data={"media_type": "image"}).status_code == 404
+
+    fake.objects[f"sw/media/7/raw/{upload_id}"] = b"12345"
+    # Another user's token resolves to their own prefix, where nothing was uploaded
+    assert client.post(complete, headers=auth_header(8), data={"media_type": "image"}).status_code == 404
+    resp = client.post(complete, headers=auth_header(7), data={"media_type": "image"})
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["status"] == "pending"
+    assert submitted == [(upload_id, "presigned_image", 7, f"sw/media/7/raw/{upload_id}")]
+
+    # Retried after processing has finished and deleted the uploaded object
+    del fake.objects[f"sw/media/7/raw/{upload_id}"]
+    jobs[(upload_id, 7)] = {"job_id": upload_id, "status": "done", "result": {"file_key": "sw/media/7/a.webp"}, "error": None}
+    resp = client.post(complete, headers=auth_header(7), data={"media_type": "image"})
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["status"] == "done" and resp.json()["result"]["file_url"].startswith("http")
+    assert len(submitted) == 1
+
+    too_big = client.post(
+        "/api/v1/upload/presign",
+        headers=auth_header(7),
+        data={"media_type": "image", "content_type": "image/jpeg", "size_bytes": str(endpoints_module.MAX_FILE_SIZE_BYTES + 1)},
+    )
+    assert too_big.status_code == 413
@@ -0,0 +1,60 @@
+"""Profile picture keys are versioned by content, so a new picture deletes
+the one uploaded before it and its renditions - never the saved one.
+"""
+import pytest
+
+from app.constants.global_constants import IMAGE_RENDITIONS
+from app.controllers.storage_controller import MemoryStorageBackend
+from app.utilities.media import profile_picture_utilities
+from app.utilities.media.imgproxy_utilities import rendition_key
+from app.utilities.media.profile_picture_utilities import delete_replaced_profile_picture
+
+
+class DictRedis:
+    def __init__(self):
+        self.values = {}
+
+    def getset(self, key, value):
+        previous = self.values.get(key)
+        self.values[key] = value.encode()
+        return previous
+
+
+@pytest.fixture
+def pfp_env(monkeypatch):
+    storage = MemoryStorageBackend()
+    saved = {}
+    monkeypatch.setattr(profile_picture_utilities, "get_storage", lambda: storage)
+    monkeypatch.setattr(profile_picture_utilities, "redis_client", DictRedis())
+    monkeypatch.setattr(profile_picture_utilities, "saved_profile_picture_key", lambda user_id: saved.get(user_id))
+    return storage, saved
+
+
+async def store_pfp(storage, file_key):
+    await storage.put(file_key, b"webp")
+    for name in IMAGE_RENDITIONS:
+        await storage.put(rendition_key(file_key, name), b"webp")
+
+
+async def test_new_picture_deletes_the_previous_one_and_its_renditions(pfp_env):
+    storage, _ = pfp_env
+    old, new = "sw/profile_pictures/1/pfp-aaaa.webp", "sw/profile_pictures/1/pfp-bbbb.webp"
+
+    await store_pfp(storage, old)
+    await delete_replaced_profile_picture(1, old)
+    await store_pfp(storage, new)
+    await delete_replaced_profile_picture(1, new)
+
+    assert sorted(storage.objects) == sorted([new] + [rendition_key(new, name) for name in IMAGE_RENDITIONS])
+
+
+async def test_saved_and_reuploaded_pictures_are_kept(pfp_env):
+    storage, saved = pfp_env
+    first, second = "sw/profile_pictures/1/pfp-aaaa.webp", "sw/profile_pictures/1/pfp-bbbb.webp"
+    saved[1] = first
+
+    for file_key in (first, first, second):
+        await store_pfp(storage, file_key)
+        await delete_replaced_profile_picture(1, file_key)
+
+    assert first in storage.objects and second in storage.objects
@@ -5,6 +5,7 @@ both new (sw/) and legacy keys.
 """
 import json
 import uuid
+from types import SimpleNamespace
 
 import pytest
 from psycopg2.extras import Json
@@ -42,7 +43,7 @@ def test_build_user_model_signs_sw_profile_picture_and_photos():
 def test_build_user_model_signs_legacy_profile_picture(monkeypatch):
     from app.utilities.common import common_utilites
 
-    monkeypatch.setattr(common_utilites.imagekit, "url", lambda opts: "https://imagekit/legacy")
+    monkeypatch.setattr(common_utilites, "imagekit", SimpleNamespace(url=lambda opts: "https://imagekit/legacy"))
 
     core_data = [1, "a@example.com", "alice", "Female", 1, json.dumps(LEGACY_PROFILE_PICTURE)]
     model = build_user_model([], core_data, hashed_password="x", user_preferences=[])
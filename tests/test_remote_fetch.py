@@ -0,0 +1,94 @@
+"""Remote image fetch for /upload/media-user-pfp-from-url, against a local
+stub server: size caps (declared and streamed), timeouts, and redirects.
+"""
+import pytest
+
+import image_factory as imf
+from app.constants import global_constants
+from app.utilities.media import remote_fetch_utilities
+from app.utilities.media.remote_fetch_utilities import RemoteFetchError, fetch_remote_image
+from stub_http import StubRoute
+
+
+async def test_fetches_image(stub_server):
+    stub_server.routes["/face.jpg"] = StubRoute(body=imf.face_image_bytes())
+
+    assert await fetch_remote_image(stub_server.url("/face.jpg")) == imf.face_image_bytes()
+
+
+async def test_follows_relative_redirect(stub_server):
+    stub_server.routes["/face.jpg"] = StubRoute(body=b"img")
+    stub_server.routes["/avatar"] = StubRoute(status=302, headers={"Location": "/face.jpg", "Content-Length": "0"})
+
+    assert await fetch_remote_image(stub_server.url("/avatar")) == b"img"
+
+
+async def test_redirect_loop_is_cut_off(stub_server):
+    stub_server.routes["/loop"] = StubRoute(status=302, headers={"Location": "/loop", "Content-Length": "0"})
+
+    with pytest.raises(RemoteFetchError, match="redirects"):
+        await fetch_remote_image(stub_server.url("/loop"))
+
+
+async def test_redirect_to_non_http_scheme_is_refused(stub_server):
+    stub_server.routes["/sneaky"] = StubRoute(status=302, headers={"Location": "file:///etc/passwd", "Content-Length": "0"})
+
+    with pytest.raises(RemoteFetchError, match="http"):
+        await fetch_remote_image(stub_server.url("/sneaky"))
+
+
+async def test_declared_oversize_is_rejected_before_reading(stub_server):
+    stub_server.routes["/big"] = StubRoute(body=b"x" * 10, headers={"Content-Length": "999999999"})
+
+    with pytest.raises(RemoteFetchError) as exc:
+        await fetch_remote_image(stub_server.url("/big"), max_bytes=1000)
+    assert exc.value.status_code == 413
+
+
+async def test_streamed_oversize_is_cut_off(stub_server):
+    stub_server.routes["/chunked"] = StubRoute(chunks=[b"x" * 600] * 5)
+
+    with pytest.raises(RemoteFetchError) as exc:
+        await fetch_remote_image(stub_server.url("/chunked"), max_bytes=1000)
+    assert exc.value.status_code == 413
+
+
+async def test_slow_host_times_out(stub_server, monkeypatch):
+    monkeypatch.setattr(remote_fetch_utilities, "REMOTE_FETCH_READ_TIMEOUT_SECONDS", 0.2)
+    stub_server.routes["/slow"] = StubRoute(body=b"img", delay=1)
+
+    with pytest.raises(RemoteFetchError, match="Timed out"):
+        await fetch_remote_image(stub_server.url("/slow"))
+
+
+async def test_error_status_is_reported(stub_server):
+    with pytest.raises(RemoteFetchError) as exc:
+        await fetch_remote_image(stub_server.url("/missing.jpg"))
+    assert exc.value.status_code == 400
+
+
+async def test_private_hosts_are_refused_by_default(stub_server, monkeypatch):
+    monkeypatch.setattr(global_constants, "REMOTE_FETCH_ALLOW_PRIVATE_HOSTS", False)
+    stub_server.routes["/face.jpg"] = StubRoute(body=b"img")
+
+    with pytest.raises(RemoteFetchError, match="private"):
+        await fetch_remote_image(stub_server.url("/face.jpg"))
+
+
+async def test_fetch_connects_to_the_checked_address(stub_server, monkeypatch):
+    # Only the check can resolve this host; a second lookup (a DNS rebind) would fail
+    monkeypatch.setattr(global_constants, "REMOTE_FETCH_ALLOW_PRIVATE_HOSTS", False)
+    lookups = []
+
+    async def resolve(host, port):
+        lookups.append(host)
+        return ["127.0.0.1"]
+
+    monkeypatch.setattr(remote_fetch_utilities, "_resolve", resolve)
+    monkeypatch.setattr(remote_fetch_utilities, "_is_public", lambda address: True)
+    route = stub_server.routes["/face.jpg"] = StubRoute(body=b"img")
+    url = f"http://images.invalid:{stub_server.server_port}/face.jpg"
+
+    assert await fetch_remote_image(url) == b"img"
+    assert lookups == ["images.invalid"]
+    assert route.hosts == [f"images.invalid:{stub_server.server_port}"]
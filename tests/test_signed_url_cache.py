@@ -0,0 +1,83 @@
+"""Signed-URL caching: expiries are rounded up to fixed buckets, so repeat
+renders inside a bucket return byte-identical (CDN-cacheable) URLs without
+re-signing, and a URL is never valid for less than was asked for.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.constants.global_constants import SIGNED_URL_BUCKET_SECONDS
+from app.utilities.common import common_utilites
+from app.utilities.media import imgproxy_utilities
+
+BUCKET_START = 1_700_000_000 - 1_700_000_000 % SIGNED_URL_BUCKET_SECONDS
+
+
+def _freeze(monkeypatch, now):
+    monkeypatch.setattr(imgproxy_utilities.time, "time", lambda: now)
+
+
+def test_same_bucket_returns_identical_url_from_cache(monkeypatch):
+    _freeze(monkeypatch, BUCKET_START + 1)
+    first = imgproxy_utilities.build_signed_url("sw/media/1/a.webp", expire_seconds=1200)
+
+    _freeze(monkeypatch, BUCKET_START + SIGNED_URL_BUCKET_SECONDS - 1)
+    second = imgproxy_utilities.build_signed_url("sw/media/1/a.webp", expire_seconds=1200)
+
+    assert first == second
+    assert imgproxy_utilities._build_signed_url.cache_info().hits == 1
+
+
+def test_next_bucket_gets_a_new_url(monkeypatch):
+    _freeze(monkeypatch, BUCKET_START + 1)
+    first = imgproxy_utilities.build_signed_url("sw/media/1/a.webp", expire_seconds=1200)
+
+    _freeze(monkeypatch, BUCKET_START + SIGNED_URL_BUCKET_SECONDS + 1)
+    second = imgproxy_utilities.build_signed_url("sw/media/1/a.webp", expire_seconds=1200)
+
+    assert first != second
+
+
+@pytest.mark.parametrize("offset", [0, 1, SIGNED_URL_BUCKET_SECONDS // 2, SIGNED_URL_BUCKET_SECONDS - 1])
+def test_bucketed_expiry_is_never_shorter_than_requested(monkeypatch, offset):
+    now = BUCKET_START + offset
+    _freeze(monkeypatch, now)
+
+    expires_at = imgproxy_utilities.bucketed_expiry(1200)
+
+    assert now + 1200 <= expires_at < now + 1200 + SIGNED_URL_BUCKET_SECONDS
+    assert expires_at % SIGNED_URL_BUCKET_SECONDS == 0
+
+
+def test_already_expired_requests_are_not_extended(monkeypatch):
+    _freeze(monkeypatch, BUCKET_START + 1)
+    assert imgproxy_utilities.bucketed_expiry(-10) == BUCKET_START - 9
+
+
+def test_legacy_imagekit_urls_are_memoized(monkeypatch):
+    calls = []
+
+    def fake_url(opts):
+        calls.append(opts)
+        return f"https://imagekit/{opts['path']}?exp={opts['expire_seconds']}"
+
+    monkeypatch.setattr(common_utilites, "imagekit", SimpleNamespace(url=fake_url))
+    _freeze(monkeypatch, BUCKET_START + 1)
+
+    first = common_utilites.get_signed_imagekit({"file_key": "profile_pictures/1/pfp.webp"})["url"]
+    second = common_utilites.get_signed_imagekit({"file_key": "profile_pictures/1/pfp.webp"})["url"]
+
+    assert first == second
+    assert len(calls) == 1
+
+
+def test_new_profile_picture_gets_a_new_url(monkeypatch):
+    from app.routes.common.common_endpoints import profile_picture_key
+
+    _freeze(monkeypatch, BUCKET_START + 1)
+    old_key, new_key = profile_picture_key(1, b"old-webp"), profile_picture_key(1, b"new-webp")
+
+    assert old_key.startswith("sw/profile_pictures/1/pfp-") and old_key.endswith(".webp")
+    assert profile_picture_key(1, b"old-webp") == old_key
+    assert imgproxy_utilities.build_signed_url(old_key) != imgproxy_utilities.build_signed_url(new_key)
+    assert imgproxy_utilities.rendition_key(old_key, "thumb") != imgproxy_utilities.rendition_key(new_key, "thumb")
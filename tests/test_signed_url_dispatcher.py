@@ -2,8 +2,11 @@
 signed-URL functions, so both the new and old code paths stay wired up
 correctly regardless of live external credentials.
 """
+import threading
+from types import SimpleNamespace
+
 from app.utilities.common import common_utilites
-from app.utilities.media import media_utilities
+from app.utilities.media import imgproxy_utilities, media_utilities
 
 
 def test_generate_signed_url_dispatches_new_keys_to_imgproxy(monkeypatch):
@@ -14,7 +17,9 @@ def test_generate_signed_url_dispatches_new_keys_to_imgproxy(monkeypatch):
         return "https://imgproxy/x"
 
     monkeypatch.setattr(media_utilities, "build_signed_url", fake_build_signed_url)
-    monkeypatch.setattr(media_utilities.bucket, "get_download_authorization", lambda **kw: (_ for _ in ()).throw(AssertionError("should not call legacy B2")))
+    monkeypatch.setattr(media_utilities, "bucket", SimpleNamespace(
+        get_download_authorization=lambda **kw: (_ for _ in ()).throw(AssertionError("should not call legacy B2"))
+    ))
 
     result = media_utilities.generate_signed_url("sw/media/1/x.webp", valid_duration=600)
 
@@ -24,8 +29,10 @@ def test_generate_signed_url_dispatches_new_keys_to_imgproxy(monkeypatch):
 
 def test_generate_signed_url_dispatches_legacy_keys_to_b2(monkeypatch):
     monkeypatch.setattr(media_utilities, "build_signed_url", lambda *a, **kw: (_ for _ in ()).throw(AssertionError("should not call imgproxy for legacy key")))
-    monkeypatch.setattr(media_utilities.bucket, "get_download_authorization", lambda **kw: "authtoken")
-    monkeypatch.setattr(media_utilities.bucket, "get_download_url", lambda key: "https://b2/legacy")
+    monkeypatch.setattr(media_utilities, "bucket", SimpleNamespace(
+        get_download_authorization=lambda **kw: "authtoken",
+        get_download_url=lambda key: "https://b2/legacy",
+    ))
 
     result = media_utilities.generate_signed_url("media/1/x.webp")
 
@@ -38,7 +45,7 @@ def test_get_signed_imagekit_dispatches_new_keys_to_imgproxy(monkeypatch):
         "build_signed_url",
         lambda file_key, expire_seconds=7200: "https://imgproxy/y",
     )
-    monkeypatch.setattr(common_utilites.imagekit, "url", lambda opts: (_ for _ in ()).throw(AssertionError("should not call legacy ImageKit")))
+    monkeypatch.setattr(common_utilites, "imagekit", SimpleNamespace(url=lambda opts: (_ for _ in ()).throw(AssertionError("should not call legacy ImageKit"))))
 
     result = common_utilites.get_signed_imagekit({"file_key": "sw/profile_pictures/1/pfp.webp"})
 
@@ -47,8 +54,115 @@ def test_get_signed_imagekit_dispatches_new_keys_to_imgproxy(monkeypatch):
 
 def test_get_signed_imagekit_dispatches_legacy_keys_to_imagekit(monkeypatch):
     monkeypatch.setattr(common_utilites, "build_signed_url", lambda *a, **kw: (_ for _ in ()).throw(AssertionError("should not call imgproxy for legacy key")))
-    monkeypatch.setattr(common_utilites.imagekit, "url", lambda opts: "https://imagekit/legacy")
+    monkeypatch.setattr(common_utilites, "imagekit", SimpleNamespace(url=lambda opts: "https://imagekit/legacy"))
 
     result = common_utilites.get_signed_imagekit({"file_key": "profile_pictures/1/pfp.webp"})
 
     assert result["url"] == "https://imagekit/legacy"
+
+
+def test_generate_signed_urls_batches_legacy_keys_per_prefix(monkeypatch):
+    prefixes = []
+
+    def fake_authorization(file_name_prefix, valid_duration_in_seconds):
+        prefixes.append(file_name_prefix)
+        return f"token-{file_name_prefix}"
+
+    monkeypatch.setattr(media_utilities, "bucket", SimpleNamespace(
+        get_download_authorization=fake_authorization,
+        get_download_url=lambda key: f"https://b2/{key}",
+    ))
+
+    result = media_utilities.generate_signed_urls(
+        ["media/1/a.webp", "media/1/b.webp", "media/2/c.webp", "sw/media/1/d.webp"]
+    )
+
+    assert sorted(prefixes) == ["media/1/", "media/2/"]
+    assert result["media/1/b.webp"] == "https://b2/media/1/b.webp?Authorization=token-media/1/"
+    assert result["sw/media/1/d.webp"].startswith("http")
+    assert "b2" not in result["sw/media/1/d.webp"]
+
+
+def test_get_signed_imagekit_batch_signs_mixed_keys(monkeypatch):
+    monkeypatch.setattr(common_utilites, "imagekit", SimpleNamespace(url=lambda opts: f"https://imagekit/{opts['path']}"))
+
+    images = common_utilites.get_signed_imagekit_batch(
+        [{"file_key": "sw/media/1/a.webp"}, {"file_key": "profile_pictures/1/pfp.webp"}]
+    )
+
+    assert images[0]["url"].startswith("http") and "imagekit" not in images[0]["url"]
+    assert images[1]["url"] == "https://imagekit/profile_pictures/1/pfp.webp"
+
+
+def test_b2_authorization_is_reused_per_prefix_until_near_expiry(monkeypatch):
+    calls = []
+
+    def fake_authorization(file_name_prefix, valid_duration_in_seconds):
+        calls.append((file_name_prefix, valid_duration_in_seconds))
+        return f"token-{len(calls)}"
+
+    monkeypatch.setattr(media_utilities, "bucket", SimpleNamespace(
+        get_download_authorization=fake_authorization,
+        get_download_url=lambda key: f"https://b2/{key}",
+    ))
+    cache = media_utilities.download_authorizations
+    monkeypatch.setattr(cache, "ttl", 7200)
+
+    media_utilities.generate_signed_url("media/1/a.webp")
+    media_utilities.generate_signed_urls(["media/1/b.webp"])
+    assert calls == [("media/1/", 7200)]
+
+    # A URL that must outlive what's left on the cached token forces a refresh
+    assert media_utilities.generate_signed_url("media/1/a.webp", valid_duration=7200).endswith("token-2")
+    assert len(calls) == 2
+
+
+def test_b2_authorization_refresh_is_single_flight(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def slow_authorization(file_name_prefix, valid_duration_in_seconds):
+        calls.append(file_name_prefix)
+        release.wait(timeout=1)
+        return "token"
+
+    monkeypatch.setattr(media_utilities, "bucket", SimpleNamespace(get_download_authorization=slow_authorization))
+    cache = media_utilities.DownloadAuthorizationCache(ttl=3600, max_size=8)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("media/1/", 60))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["media/1/"]
+    assert results == ["token"] * 5
+
+
+def test_best_fit_rendition_is_the_smallest_that_covers_the_size():
+    renditions = {"thumb": 160, "card": 640, "full": 1280}
+
+    assert imgproxy_utilities.best_fit_key("sw/media/1/a.webp", 100, renditions) == "sw/media/1/a@thumb.webp"
+    assert imgproxy_utilities.best_fit_key("sw/media/1/a.webp", 500, renditions) == "sw/media/1/a@card.webp"
+    assert imgproxy_utilities.best_fit_key("sw/media/1/a.webp", 2000, renditions) == "sw/media/1/a.webp"
+    # Uploaded before renditions existed, or no size asked for
+    assert imgproxy_utilities.best_fit_key("sw/media/1/a.webp", 100, None) == "sw/media/1/a.webp"
+    assert imgproxy_utilities.best_fit_key("sw/media/1/a.webp", None, renditions) == "sw/media/1/a.webp"
+
+
+def test_get_signed_imagekit_batch_signs_best_fit_renditions(monkeypatch):
+    signed = []
+    monkeypatch.setattr(common_utilites, "build_signed_urls", lambda keys, expire_seconds: {k: signed.append(k) or f"https://imgproxy/{k}" for k in keys})
+
+    images = common_utilites.get_signed_imagekit_batch(
+        [
+            {"file_key": "sw/profile_pictures/1/pfp.webp", "renditions": {"thumb": 160, "card": 640}},
+            {"file_key": "sw/media/1/old.webp"},
+        ],
+        size=common_utilites.THUMB_DISPLAY_SIZE,
+    )
+
+    assert images[0]["url"] == "https://imgproxy/sw/profile_pictures/1/pfp@thumb.webp"
+    assert images[1]["url"] == "https://imgproxy/sw/media/1/old.webp"
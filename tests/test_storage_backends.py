@@ -0,0 +1,115 @@
+"""Storage backends: the in-memory and local-filesystem ones used in tests
+and dev, and the async S3 backend (signing, bucket bootstrap, parallel
+multipart with abort on failure, presigned PUTs) against a fake S3 transport.
+"""
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.controllers.storage_controller import LocalFileStorageBackend, MemoryStorageBackend, StorageBackend, StorageError
+from fake_s3 import FakeS3, s3_backend
+
+
+async def test_memory_backend_round_trip_and_metrics():
+    storage = MemoryStorageBackend()
+
+    await storage.put("sw/media/1/a.webp", memoryview(bytearray(b"webp-bytes")), "image/webp")
+
+    assert await storage.exists("sw/media/1/a.webp")
+    assert not await storage.exists("sw/media/1/b.webp")
+    assert await storage.get("sw/media/1/a.webp") == b"webp-bytes"
+    metrics = storage.metrics.snapshot()["put"]
+    assert metrics["count"] == 1 and metrics["bytes"] == 10 and metrics["errors"] == 0
+
+
+async def test_local_backend_writes_under_root(tmp_path):
+    storage = LocalFileStorageBackend(tmp_path)
+
+    await storage.put("sw/media/1/a.webp", b"webp-bytes")
+
+    assert (tmp_path / "sw/media/1/a.webp").read_bytes() == b"webp-bytes"
+    assert await storage.get("sw/media/1/a.webp") == b"webp-bytes"
+    assert not list(tmp_path.rglob("*.partial"))
+    with pytest.raises(StorageError):
+        await storage.put("../outside.webp", b"x")
+
+
+async def test_s3_backend_creates_the_bucket_once_and_puts():
+    fake = FakeS3()
+    storage = s3_backend(fake)
+
+    await storage.put("sw/media/1/a b.webp", b"small", "image/webp")
+    await storage.put("sw/media/1/c.webp", memoryview(bytearray(b"other")))
+
+    assert fake.buckets == {"linkup-media"}
+    assert fake.objects == {"sw/media/1/a b.webp": b"small", "sw/media/1/c.webp": b"other"}
+    assert await storage.exists("sw/media/1/c.webp")
+    assert await storage.get("sw/media/1/a b.webp") == b"small"
+    await storage.close()
+
+
+async def test_s3_backend_uploads_large_objects_as_parallel_parts():
+    fake = FakeS3()
+    storage = s3_backend(fake, multipart_threshold=100, part_size=40, concurrency=2)
+    content = bytes(range(256)) * 2
+
+    await storage.put("sw/media/1/big.webp", content)
+
+    assert fake.objects["sw/media/1/big.webp"] == content
+    assert fake.max_in_flight == 2
+    assert storage.metrics.snapshot()["part"]["count"] == 13
+    await storage.close()
+
+
+async def test_s3_backend_aborts_a_failed_multipart_upload():
+    fake = FakeS3(fail_part=3)
+    storage = s3_backend(fake, multipart_threshold=100, part_size=40, concurrency=2)
+
+    with pytest.raises(StorageError):
+        await storage.put("sw/media/1/big.webp", b"x" * 400)
+
+    assert fake.aborted == ["upload-0"]
+    assert "sw/media/1/big.webp" not in fake.objects
+    assert storage.metrics.snapshot()["put"]["errors"] == 1
+    await storage.close()
+
+
+async def test_s3_backend_presigns_puts_for_the_public_endpoint():
+    fake = FakeS3()
+    storage = s3_backend(fake, public_endpoint="https://media.example.com")
+
+    url, headers = await storage.presign_put("sw/media/1/raw/abc", "image/jpeg", 1234, 600)
+
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    assert (parts.scheme, parts.netloc, parts.path) == ("https", "media.example.com", "/linkup-media/sw/media/1/raw/abc")
+    assert query["X-Amz-Expires"] == ["600"]
+    assert query["X-Amz-SignedHeaders"] == ["content-length;content-type;host"]
+    assert len(query["X-Amz-Signature"][0]) == 64
+    assert headers == {"Content-Type": "image/jpeg", "Content-Length": "1234"}
+    # The client PUTs straight into the bucket, so it has to exist already
+    assert fake.buckets == {"linkup-media"}
+    await storage.close()
+
+
+async def test_size_of_stored_objects():
+    fake = FakeS3()
+    s3 = s3_backend(fake)
+    memory = MemoryStorageBackend()
+    for storage in (s3, memory):
+        await storage.put("sw/media/1/a.webp", b"12345")
+        assert await storage.size("sw/media/1/a.webp") == 5
+        assert await storage.size("sw/media/1/missing.webp") is None
+    await s3.close()
+
+    with pytest.raises(StorageError):
+        await memory.presign_put("sw/media/1/raw/abc", "image/jpeg", 5, 600)
+
+
+def test_incomplete_backend_fails_when_created():
+    class WriteOnly(StorageBackend):
+        async def _put(self, file_key, content, content_type):
+            pass
+
+    with pytest.raises(TypeError):
+        WriteOnly()
@@ -0,0 +1,81 @@
+"""Typing-indicator throttling: bursts collapse to a start event plus
+periodic keep-alives, and typing state resets once the sender goes idle or
+actually sends the message.
+"""
+import pytest
+
+from app.utilities.chat.typing_utilities import TypingAggregator, typing_chat_room_id
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _aggregator(clock):
+    return TypingAggregator(min_interval=3, idle_timeout=5, clock=clock)
+
+
+def test_burst_forwards_start_then_keepalives_only():
+    clock = FakeClock()
+    aggregator = _aggregator(clock)
+
+    forwarded = 0
+    # 30 events/sec for 6 seconds
+    for _ in range(180):
+        forwarded += aggregator.should_forward(1, 2)
+        clock.now += 1 / 30
+
+    assert forwarded == 2  # start + one keep-alive at 3s
+    assert aggregator.suppressed == 178
+
+
+def test_keys_are_independent_per_chat_and_sender():
+    clock = FakeClock()
+    aggregator = _aggregator(clock)
+
+    assert aggregator.should_forward(1, 2)
+    assert aggregator.should_forward(1, 3)
+    assert aggregator.should_forward(4, 2)
+    assert not aggregator.should_forward(1, 2)
+
+
+def test_idle_gap_restarts_typing():
+    clock = FakeClock()
+    aggregator = _aggregator(clock)
+
+    assert aggregator.should_forward(1, 2)
+    clock.now += 1
+    assert not aggregator.should_forward(1, 2)
+    clock.now += 5
+    assert aggregator.should_forward(1, 2)
+
+
+def test_sent_message_stops_typing():
+    clock = FakeClock()
+    aggregator = _aggregator(clock)
+
+    assert aggregator.should_forward(1, 2)
+    aggregator.stop(1, 2)
+    clock.now += 0.5
+    assert aggregator.should_forward(1, 2)
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        ({"chats_type": "typing", "chat_room_id": 12}, 12),
+        ({"chats_type": "typing", "chat_room_id": "12"}, 12),
+        ({"chats_type": "typing", "chat_room_id": [1, 2]}, None),
+        ({"chats_type": "typing", "chat_room_id": {"a": 1}}, None),
+        ({"chats_type": "typing", "chat_room_id": True}, None),
+        ({"chats_type": "typing"}, None),
+        ({"chats_type": "seen", "chat_room_id": 12}, None),
+        (["chats_type", "typing"], None),
+    ],
+)
+def test_only_well_formed_typing_events_reach_the_throttle(data, expected):
+    assert typing_chat_room_id(data) == expected
@@ -1,9 +1,13 @@
 """Covers every upload endpoint the frontend can hit, across the image
 format/mode/size/error matrix, against the new SeaweedFS + imgproxy stack.
 """
+import shutil
+
 import pytest
 
 import image_factory as imf
+from audio_factory import wav_bytes
+from stub_http import StubRoute
 
 UPLOAD_MEDIA = "/api/v1/upload/media"
 UPLOAD_MEDIA_USER = "/api/v1/upload/media-user"
@@ -87,13 +91,10 @@ def test_upload_media_chat_rejects_oversized_original(client, make_user, auth_he
     assert resp.status_code == 413
 
 
-def test_upload_media_user_does_not_reject_oversized_original(client, make_user, auth_header, seaweed_object):
-    """Known/documented asymmetry (pre-existing, not introduced by this
-    migration): unlike /upload/media, /upload/media-user has no upfront
-    raw-size check - it only rejects based on the *converted* webp size. A
-    large-but-valid original that compresses well after resize+webp still
-    goes through. Flagging this explicitly so it isn't silently "fixed" or
-    regressed without a deliberate decision.
+def test_upload_media_user_rejects_oversized_original(client, make_user, auth_header):
+    """/upload/media-user used to accept any original and only check the
+    converted webp size. Uploads are now capped while they stream in, on
+    every upload endpoint alike (deliberate change).
     """
     user_id = make_user()
     resp = client.post(
@@ -102,20 +103,19 @@ def test_upload_media_user_does_not_reject_oversized_original(client, make_user,
         files={"file": ("big.jpg", imf.oversized_image_bytes(), "image/jpeg")},
         data={"media_type": "image"},
     )
-    assert resp.status_code == 200, resp.text
-    seaweed_object(resp.json()["metadata"]["file_key"])
+    assert resp.status_code == 413
 
 
-def test_upload_media_user_rejects_oversized_converted_output(client, make_user, auth_header, monkeypatch):
+def test_upload_media_user_rejects_oversized_converted_output(client, make_user, auth_header, monkeypatch, inline_image_pool):
     """Force the post-conversion size check to trip, without needing an
     adversarial image that survives webp compression above 5MB.
     """
     import app.routes.common.common_endpoints as endpoints_module
 
     def fake_process(content):
-        return "/tmp/fake.webp", b"x" * (endpoints_module.MAX_FILE_SIZE_BYTES + 1), 100, 100
+        return b"x" * (endpoints_module.MAX_FILE_SIZE_BYTES + 1), 100, 100, "blurhash", {}
 
-    monkeypatch.setattr(endpoints_module, "process_image_to_webp_file", fake_process)
+    monkeypatch.setattr(endpoints_module, "process_upload_image", fake_process)
 
     user_id = make_user()
     resp = client.post(
@@ -173,11 +173,14 @@ def test_upload_media_rejects_invalid_token(client):
 
 
 # ---------------------------------------------------------------------------
-# Known pre-existing issue: media_type=VOICE still runs image processing.
-# Documented here so it's a deliberate decision if it ever changes.
+# Voice notes - /upload/media with media_type=voice (transcoded by ffmpeg)
 # ---------------------------------------------------------------------------
 
-def test_upload_media_voice_type_currently_runs_image_pipeline(client, make_user, auth_header):
+needs_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+
+@needs_ffmpeg
+def test_upload_media_voice_rejects_non_audio(client, make_user, auth_header):
     user_id = make_user()
     resp = client.post(
         UPLOAD_MEDIA,
@@ -185,8 +188,24 @@ def test_upload_media_voice_type_currently_runs_image_pipeline(client, make_user
         files={"file": ("voice.ogg", b"not actually audio bytes either way", "audio/ogg")},
         data={"media_type": "voice"},
     )
-    # A real voice upload (non-image bytes) blows up in the image pipeline.
-    assert resp.status_code == 500
+    assert resp.status_code == 400
+
+
+@needs_ffmpeg
+def test_upload_media_voice_returns_duration_and_waveform(client, make_user, auth_header, seaweed_object):
+    user_id = make_user()
+    resp = client.post(
+        UPLOAD_MEDIA,
+        headers=auth_header(user_id),
+        files={"file": ("voice.wav", wav_bytes(1.5), "audio/wav")},
+        data={"media_type": "voice"},
+    )
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    seaweed_object(body["file_key"])
+    assert body["file_key"].endswith(".ogg")
+    assert body["metadata"]["duration"] == pytest.approx(1.5, abs=0.05)
+    assert len(body["metadata"]["waveform"]) == 64
 
 
 # ---------------------------------------------------------------------------
@@ -235,20 +254,14 @@ def test_upload_media_user_pfp_invalid_image(client, make_user, auth_header):
     assert resp.status_code == 400
 
 
-def test_upload_media_user_pfp_from_url(client, make_user, auth_header, seaweed_object, monkeypatch):
-    import app.routes.common.common_endpoints as endpoints_module
-
-    class FakeResponse:
-        status_code = 200
-        content = imf.face_image_bytes()
-
-    monkeypatch.setattr(endpoints_module.requests, "get", lambda url: FakeResponse())
+def test_upload_media_user_pfp_from_url(client, make_user, auth_header, seaweed_object, stub_server):
+    stub_server.routes["/avatar.jpg"] = StubRoute(body=imf.face_image_bytes())
 
     user_id = make_user()
     resp = client.post(
         UPLOAD_PFP_FROM_URL,
         headers=auth_header(user_id),
-        data={"image_url": "https://example.com/avatar.jpg"},
+        data={"image_url": stub_server.url("/avatar.jpg")},
     )
     assert resp.status_code == 200, resp.text
     body = resp.json()
@@ -258,37 +271,35 @@ def test_upload_media_user_pfp_from_url(client, make_user, auth_header, seaweed_
     assert body["profile_picture_url"].startswith("http")
 
 
-def test_upload_media_user_pfp_from_url_unreachable(client, make_user, auth_header, monkeypatch):
-    import app.routes.common.common_endpoints as endpoints_module
-
-    class FakeResponse:
-        status_code = 404
-        content = b""
-
-    monkeypatch.setattr(endpoints_module.requests, "get", lambda url: FakeResponse())
-
+def test_upload_media_user_pfp_from_url_unreachable(client, make_user, auth_header, stub_server):
     user_id = make_user()
     resp = client.post(
         UPLOAD_PFP_FROM_URL,
         headers=auth_header(user_id),
-        data={"image_url": "https://example.com/missing.jpg"},
+        data={"image_url": stub_server.url("/missing.jpg")},
     )
     assert resp.status_code == 400
 
 
-def test_upload_media_user_pfp_from_url_no_face(client, make_user, auth_header, monkeypatch):
-    import app.routes.common.common_endpoints as endpoints_module
+def test_upload_media_user_pfp_from_url_no_face(client, make_user, auth_header, stub_server):
+    stub_server.routes["/noface.jpg"] = StubRoute(body=imf.no_face_image_bytes())
+
+    user_id = make_user()
+    resp = client.post(
+        UPLOAD_PFP_FROM_URL,
+        headers=auth_header(user_id),
+        data={"image_url": stub_server.url("/noface.jpg")},
+    )
+    assert resp.status_code == 422
 
-    class FakeResponse:
-        status_code = 200
-        content = imf.no_face_image_bytes()
 
-    monkeypatch.setattr(endpoints_module.requests, "get", lambda url: FakeResponse())
+def test_upload_media_user_pfp_from_url_too_large(client, make_user, auth_header, stub_server):
+    stub_server.routes["/huge.jpg"] = StubRoute(body=b"x", headers={"Content-Length": str(1024 * 1024 * 1024)})
 
     user_id = make_user()
     resp = client.post(
         UPLOAD_PFP_FROM_URL,
         headers=auth_header(user_id),
-        data={"image_url": "https://example.com/noface.jpg"},
+        data={"image_url": stub_server.url("/huge.jpg")},
     )
-    assert resp.status_code == 422
+    assert resp.status_code == 413
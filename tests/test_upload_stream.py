@@ -0,0 +1,105 @@
+"""Streaming upload limits: oversized bodies are cut off while they're still
+arriving, and accepted uploads are read into a single buffer.
+"""
+from io import BytesIO
+
+import pytest
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from app.utilities.media.upload_stream_utilities import UploadSizeLimitMiddleware, UploadTooLarge, read_upload
+
+
+class RecordingApp:
+    """Drains the request body the way the multipart parser would, then answers 200."""
+
+    def __init__(self):
+        self.called = False
+        self.body = b""
+
+    async def __call__(self, scope, receive, send):
+        self.called = True
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            self.body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def call(middleware, chunks, content_length=None, path="/api/v1/upload/media"):
+    headers = [(b"content-length", str(content_length).encode())] if content_length is not None else []
+    scope = {"type": "http", "method": "POST", "path": path, "headers": headers}
+    pending = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return pending.pop(0) if pending else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware(scope, receive, send)
+    return sent, pending
+
+
+async def test_content_length_over_the_cap_is_rejected_before_reading():
+    app = RecordingApp()
+    middleware = UploadSizeLimitMiddleware(app, path_prefix="/api/v1/upload", max_body_bytes=100)
+
+    sent, pending = await call(middleware, [b"x" * 50] * 4, content_length=200)
+
+    assert sent[0]["status"] == 413
+    assert not app.called
+    assert len(pending) == 4
+
+
+async def test_streamed_body_is_cut_off_past_the_cap():
+    app = RecordingApp()
+    middleware = UploadSizeLimitMiddleware(app, path_prefix="/api/v1/upload", max_body_bytes=100)
+
+    sent, pending = await call(middleware, [b"x" * 40] * 10)
+
+    assert [m["status"] for m in sent if m["type"] == "http.response.start"] == [413]
+    assert len(app.body) == 80  # the chunk that crossed the cap never reached the app
+    assert len(pending) == 7
+
+
+async def test_bodies_within_the_cap_and_other_paths_pass_through():
+    app = RecordingApp()
+    middleware = UploadSizeLimitMiddleware(app, path_prefix="/api/v1/upload", max_body_bytes=100)
+
+    sent, _ = await call(middleware, [b"x" * 40, b"x" * 40], content_length=80)
+    assert sent[0]["status"] == 200
+
+    sent, _ = await call(middleware, [b"x" * 400], content_length=400, path="/api/v1/user/me")
+    assert sent[0]["status"] == 200
+
+
+def upload(content: bytes, size: int | None) -> UploadFile:
+    return UploadFile(BytesIO(content), size=size, filename="x.jpg", headers=Headers({"content-type": "image/jpeg"}))
+
+
+async def test_read_upload_returns_one_exact_buffer():
+    view = await read_upload(upload(b"abcdef", size=6), max_bytes=10)
+
+    assert isinstance(view, memoryview)
+    assert view.tobytes() == b"abcdef"
+    assert len(view.obj) == 6
+
+
+@pytest.mark.parametrize("size", [11, None])
+async def test_read_upload_rejects_past_the_cap(size):
+    with pytest.raises(UploadTooLarge):
+        await read_upload(upload(b"x" * 11, size=size), max_bytes=10)
+
+
+async def test_read_upload_accepts_exactly_the_cap_without_a_size():
+    view = await read_upload(upload(b"x" * 10, size=None), max_bytes=10)
+    assert len(view) == 10
@@ -0,0 +1,111 @@
+"""Voice notes: transcoded to Opus off a single decode, with duration and a
+waveform envelope for drawing, and served through imgproxy untouched.
+"""
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from audio_factory import wav_bytes
+
+from app.controllers.storage_controller import MemoryStorageBackend
+from app.utilities.media import audio_processing_utilities
+from app.utilities.media.audio_processing_utilities import (
+    AudioTooLongError,
+    AudioUnavailableError,
+    InvalidAudioError,
+    process_voice_note,
+    waveform_envelope,
+)
+from app.utilities.media.imgproxy_utilities import build_signed_url
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+
+def test_waveform_envelope_is_relative_rms_per_bar():
+    quiet, loud = np.full(1000, 100, dtype="<i2"), np.full(1000, -400, dtype="<i2")
+
+    assert waveform_envelope(np.concatenate([quiet, loud]), bars=4) == [25, 25, 100, 100]
+    assert waveform_envelope(np.zeros(500, dtype="<i2"), bars=3) == [0, 0, 0]
+    assert waveform_envelope(np.array([], dtype="<i2"), bars=3) == [0, 0, 0]
+    assert len(waveform_envelope(np.array([5, 10], dtype="<i2"), bars=8)) == 8
+
+
+def test_voice_notes_are_served_raw_through_imgproxy():
+    assert "/raw:1/" in build_signed_url("sw/media/1/note.ogg")
+    assert "/raw:1/" not in build_signed_url("sw/media/1/photo.webp")
+
+
+@pytest.mark.parametrize("error", [FileNotFoundError("ffmpeg"), subprocess.TimeoutExpired("ffmpeg", 60)])
+def test_missing_or_stuck_ffmpeg_is_not_blamed_on_the_upload(monkeypatch, error):
+    def run(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(audio_processing_utilities.subprocess, "run", run)
+    with pytest.raises(AudioUnavailableError):
+        process_voice_note(wav_bytes(0.5))
+
+
+@needs_ffmpeg
+def test_voice_note_becomes_opus_with_duration_and_waveform():
+    opus, duration, waveform = process_voice_note(wav_bytes(2.0))
+
+    assert opus[:4] == b"OggS" and b"OpusHead" in opus[:100]
+    assert duration == pytest.approx(2.0, abs=0.05)
+    assert len(waveform) == 64 and max(waveform) == 100
+    assert waveform[-1] > waveform[0]
+
+
+@needs_ffmpeg
+def test_voice_note_past_the_limit_is_refused(monkeypatch):
+    monkeypatch.setattr(audio_processing_utilities, "VOICE_MAX_SECONDS", 1)
+    with pytest.raises(AudioTooLongError):
+        process_voice_note(wav_bytes(3.0))
+
+
+@needs_ffmpeg
+def test_non_audio_is_refused():
+    with pytest.raises(InvalidAudioError):
+        process_voice_note(b"definitely not audio")
+
+
+@needs_ffmpeg
+def test_upload_voice_note(client, auth_header, monkeypatch):
+    import app.routes.common.common_endpoints as endpoints_module
+
+    storage = MemoryStorageBackend()
+    monkeypatch.setattr(endpoints_module, "get_storage", lambda: storage)
+
+    resp = client.post(
+        "/api/v1/upload/media",
+        headers=auth_header(1),
+        files={"file": ("note.wav", wav_bytes(1.5), "audio/wav")},
+        data={"media_type": "voice"},
+    )
+
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert body["file_key"].endswith(".ogg")
+    assert body["metadata"]["format"] == "opus"
+    assert body["metadata"]["duration"] == pytest.approx(1.5, abs=0.05)
+    assert len(body["metadata"]["waveform"]) == 64
+    assert storage.objects[body["file_key"]][1] == "audio/ogg"
+
+
+def test_upload_voice_note_without_ffmpeg_is_503(client, auth_header, monkeypatch):
+    import app.routes.common.common_endpoints as endpoints_module
+
+    async def run_image_job(fn, *args):
+        raise AudioUnavailableError("ffmpeg is not installed")
+
+    monkeypatch.setattr(endpoints_module, "run_image_job", run_image_job)
+
+    resp = client.post(
+        "/api/v1/upload/media",
+        headers=auth_header(1),
+        files={"file": ("note.wav", wav_bytes(0.5), "audio/wav")},
+        data={"media_type": "voice"},
+    )
+
+    assert resp.status_code == 503
@@ -0,0 +1,100 @@
+"""Outbound websocket queue: producers never block on a slow client, typing
+is coalesced/dropped under pressure, and a consumer that can't keep up with
+durable events gets disconnected.
+"""
+import asyncio
+
+from fastapi import status
+
+from app.utilities.websocket.websocket_utilities import ConnectionSender
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+async def _flush():
+    await asyncio.sleep(0.01)
+
+
+async def test_events_are_sent_in_order():
+    ws = FakeWebSocket()
+    sender = ConnectionSender(ws, max_queue=8)
+
+    for i in range(3):
+        assert sender.enqueue_text(f"m{i}")
+    await _flush()
+
+    assert ws.sent == ["m0", "m1", "m2"]
+    sender.stop()
+    await _flush()
+
+
+async def test_pending_typing_events_coalesce_to_latest():
+    ws = FakeWebSocket()
+    ws.gate.clear()
+    sender = ConnectionSender(ws, max_queue=8)
+
+    sender.enqueue_text("blocker")
+    await _flush()
+    for i in range(10):
+        sender.enqueue_text(f"typing-{i}", coalesce_key=("typing", 1, 2), ephemeral=True)
+
+    assert len(sender) == 1
+    ws.gate.set()
+    await _flush()
+
+    assert ws.sent == ["blocker", "typing-9"]
+    sender.stop()
+    await _flush()
+
+
+async def test_full_queue_drops_ephemeral_and_evicts_it_for_durable():
+    ws = FakeWebSocket()
+    ws.gate.clear()
+    sender = ConnectionSender(ws, max_queue=2)
+
+    sender.enqueue_text("blocker")
+    await _flush()
+    sender.enqueue_text("typing", coalesce_key="t", ephemeral=True)
+    sender.enqueue_text("m1")
+
+    assert sender.enqueue_text("typing-other", coalesce_key="u", ephemeral=True) is False
+    assert sender.enqueue_text("m2") is True  # evicts the queued typing event
+
+    ws.gate.set()
+    await _flush()
+
+    assert ws.sent == ["blocker", "m1", "m2"]
+    assert ws.closed_with is None
+    sender.stop()
+    await _flush()
+
+
+async def test_durable_overflow_disconnects_slow_consumer():
+    ws = FakeWebSocket()
+    ws.gate.clear()
+    sender = ConnectionSender(ws, max_queue=2)
+
+    sender.enqueue_text("blocker")
+    await _flush()
+    sender.enqueue_text("m1")
+    sender.enqueue_text("m2")
+
+    assert sender.enqueue_text("m3") is False
+    await _flush()
+
+    assert sender.closed
+    assert ws.closed_with == status.WS_1013_TRY_AGAIN_LATER
+    assert sender.enqueue_text("m4") is False